@@ -0,0 +1,198 @@
+"""Response cache for read-mostly endpoints, keyed on table write counters.
+
+A cached view names the tables its response is built from. The cache key is the
+request's full path plus those tables' table_version counters (App.versions), which
+every write through the session bumps in its own transaction, whichever worker and
+whichever code path (controllers, importer, Flask-Admin) makes it. A write therefore
+changes the key at once in every worker, and entries built from older data are never
+served again; they simply age out.
+
+Backends (CACHE_BACKEND):
+- 'lru'    in-process LRU, one per worker (default)
+- 'sqlite' shared by every worker on the host through a SQLite file (CACHE_PATH);
+           stands in for a networked cache behind the same interface
+- 'null'   caching disabled
+"""
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, make_response, request
+
+from App.versions import request_table_versions
+
+DEFAULT_TTL = 300
+DEFAULT_MAX_ENTRIES = 1024
+_EXPIRE_EVERY = 100
+
+
+class CacheBackend(ABC):
+    """A key/value store with expiry."""
+
+    @abstractmethod
+    def get(self, key):
+        """The stored value, or None when missing or expired."""
+
+    @abstractmethod
+    def set(self, key, value, ttl):
+        """Store `value` for `ttl` seconds (forever when falsy)."""
+
+    @abstractmethod
+    def clear(self):
+        """Drop every entry."""
+
+    def close(self):
+        """Release any connection the backend holds."""
+
+
+class NullCache(CacheBackend):
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def clear(self):
+        pass
+
+
+class LRUCache(CacheBackend):
+    """Per-process cache holding at most `max_entries` values, least recently used evicted first."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache(CacheBackend):
+    """Cache in a SQLite file, so every worker process on the host shares entries.
+
+    A worker uses one connection, serialized by a lock: each statement is a short
+    local lookup, and under gevent a per-greenlet connection would mean one per
+    request. WAL mode lets readers in other workers proceed while one worker writes.
+    """
+
+    def __init__(self, path, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sets = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS cache_entry (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)')
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value FROM cache_entry WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl):
+        expires = time.time() + ttl if ttl else None
+        value = json.dumps(value)
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO cache_entry (key, value, expires) VALUES (?, ?, ?)',
+                               (key, value, expires))
+            self._sets += 1
+            if self._sets % _EXPIRE_EVERY == 0:
+                self._conn.execute('DELETE FROM cache_entry WHERE expires IS NOT NULL AND expires <= ?', (time.time(),))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM cache_entry')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_backend = LRUCache()
+_settings = {'ttl': DEFAULT_TTL}
+
+
+def init_cache(app):
+    """Pick the backend from CACHE_BACKEND; CACHE_TTL (seconds), CACHE_MAX_ENTRIES and CACHE_PATH tune it."""
+    global _backend
+    kind = app.config.get('CACHE_BACKEND', 'lru')
+    _backend.close()
+    if kind == 'lru':
+        _backend = LRUCache(app.config.get('CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+    elif kind == 'sqlite':
+        _backend = SQLiteCache(app.config.get('CACHE_PATH') or os.path.join(app.instance_path, 'response-cache.sqlite'))
+    elif kind == 'null':
+        _backend = NullCache()
+    else:
+        raise RuntimeError(f'unknown CACHE_BACKEND {kind!r}')
+    _settings['ttl'] = app.config.get('CACHE_TTL', DEFAULT_TTL)
+
+
+@atexit.register
+def _close_backend():
+    _backend.close()
+
+
+def get_backend():
+    return _backend
+
+
+def clear_cache():
+    """Drop every cached response, e.g. after the tables (and their counters) were recreated."""
+    _backend.clear()
+
+
+def cached(*tables, ttl=None):
+    """Cache a GET view's 200 responses per full path and current versions of `tables`, for up to `ttl`.
+
+    Like conditional, stack it under replica_reads on a view that reads the replica.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = request_table_versions(tables)
+            key = f'{request.full_path}|{",".join(f"{name}={versions[name]}" for name in sorted(versions))}'
+            hit = _backend.get(key)
+            if hit is not None:
+                return Response(hit['body'], status=200, mimetype=hit['mimetype'])
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                _backend.set(key, {'body': response.get_data(as_text=True), 'mimetype': response.mimetype},
+                             _settings['ttl'] if ttl is None else ttl)
+            return response
+        return wrapper
+    return decorator
@@ -9,9 +9,12 @@ from . import resident as _resident
 from . import driver as _driver
 from . import initialize as _initialize
 from . import admin as _admin
+from . import importer as _importer
+from . import identity as _identity
+from . import notification as _notification
 
 _SUBMODULES: List[ModuleType] = [
-    _user, _auth, _resident, _driver, _initialize, _admin
+    _user, _auth, _resident, _driver, _initialize, _admin, _importer, _identity, _notification
 ]
 
 def _find_attr_in_submodules(name: str):
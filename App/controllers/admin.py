@@ -1,81 +1,134 @@
-from App.database import db
-from App.models import User, Driver, Drive, Resident, StopRequest
+from functools import lru_cache
 
-# Optional pretty printing with rich if available
-try:
-    from rich.console import Console
-    from rich.table import Table
-    _RICH_AVAILABLE = True
-    _CONSOLE = Console()
-except Exception:
-    _RICH_AVAILABLE = False
+from App.database import db, replica_reads
+from App.models import User, Driver, Drive, Resident, StopRequest
 
 
-def list_all_data():
+@lru_cache(maxsize=None)
+def _rich():
+    """Optional pretty printing: (console, Table) from rich, imported on first print; None without rich."""
+    try:
+        from rich.console import Console
+        from rich.table import Table
+    except Exception:
+        return None
+    return Console(), Table
+
+
+class DataSnapshot:
+    """Per-table, JSON-serializable view of the database built on first access.
+
+    Each table is loaded by one column-projection query the first time it is read
+    and memoized for the lifetime of the snapshot, so one snapshot should be shared
+    across everything a single request or CLI invocation prints or returns.
+    """
+
+    TABLES = ('users', 'drivers', 'drives', 'residents', 'stop_requests')
+
+    def __init__(self):
+        self._tables = {}
+
+    def __getitem__(self, table):
+        if table not in self.TABLES:
+            raise KeyError(table)
+        if table not in self._tables:
+            self._tables[table] = getattr(self, f'_build_{table}')()
+        return self._tables[table]
+
+    def get(self, table, default=None):
+        try:
+            return self[table]
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        return {table: self[table] for table in self.TABLES}
+
+    def _build_users(self):
+        users = db.session.execute(db.select(User.id, User.username).order_by(User.id)).all()
+        return [{'id': u.id, 'username': u.username} for u in users]
+
+    def _build_drivers(self):
+        drivers = db.session.execute(
+            db.select(Driver.id, Driver.username, Driver.status).order_by(Driver.id)
+        ).all()
+        return [{'id': d.id, 'username': d.username, 'status': d.status} for d in drivers]
+
+    def _build_drives(self):
+        # Reuse stop request rows if they are already loaded, otherwise fetch only
+        # the (drive_id, id) pairs needed to group stop ids per drive.
+        stops_by_drive = {}
+        if 'stop_requests' in self._tables:
+            pairs = ((s['drive_id'], s['id']) for s in self._tables['stop_requests'])
+        else:
+            pairs = db.session.execute(
+                db.select(StopRequest.drive_id, StopRequest.id).order_by(StopRequest.id)
+            ).all()
+        for drive_id, stop_id in pairs:
+            stops_by_drive.setdefault(drive_id, []).append(stop_id)
+
+        drives = db.session.execute(
+            db.select(Drive.id, Drive.datetime, Drive.driver_id).order_by(Drive.id)
+        ).all()
+        return [
+            {
+                'id': dr.id,
+                'datetime': dr.datetime.isoformat() if dr.datetime is not None else None,
+                'driver_id': dr.driver_id,
+                'stops': stops_by_drive.get(dr.id, [])
+            }
+            for dr in drives
+        ]
+
+    def _build_residents(self):
+        residents = db.session.execute(
+            db.select(Resident.id, Resident.username, Resident.name, Resident.street).order_by(Resident.id)
+        ).all()
+        return [
+            {'id': r.id, 'username': r.username, 'name': r.name, 'street': r.street}
+            for r in residents
+        ]
+
+    def _build_stop_requests(self):
+        srs = db.session.execute(
+            db.select(
+                StopRequest.id, StopRequest.drive_id, StopRequest.street_name,
+                StopRequest.requestee_id, StopRequest.created_at
+            ).order_by(StopRequest.id)
+        ).all()
+        return [
+            {
+                'id': s.id,
+                'drive_id': s.drive_id,
+                'street_name': s.street_name,
+                'requestee_id': s.requestee_id,
+                'created_at': s.created_at.isoformat() if s.created_at else None
+            }
+            for s in srs
+        ]
+
+
+@replica_reads
+def list_all_data(snapshot=None):
     """Return a dict containing all rows for each model in JSON-serializable form."""
-    data = {}
-
-    # Users - use existing get_json if available
-    users = db.session.scalars(db.select(User)).all()
-    data['users'] = [u.get_json() if hasattr(u, 'get_json') else {'id': u.id, 'username': getattr(u, 'username', None)} for u in users]
-
-    # Drivers
-    drivers = db.session.scalars(db.select(Driver)).all()
-    data['drivers'] = []
-    for d in drivers:
-        if not hasattr(d, 'status'):  # safety guard
-            continue
-        data['drivers'].append({
-            'id': d.id,
-            'username': getattr(d, 'username', None),
-            'status': d.status
-        })
-    '''drivers = db.session.scalars(db.select(Driver)).all()
-    data['drivers'] = [{'id': d.id, 'status': d.status} for d in drivers]
-'''
-    # Drives
-    drives = db.session.scalars(db.select(Drive)).all()
-    def drive_to_dict(dr):
-        return {
-            'id': dr.id,
-            'datetime': dr.datetime.isoformat() if getattr(dr, 'datetime', None) is not None else None,
-            'driver_id': dr.driver_id,
-            'stops': [s.id for s in getattr(dr, 'stops', [])]
-        }
-    data['drives'] = [drive_to_dict(dr) for dr in drives]
-
-    # Residents
-    # Use safe attribute access (getattr) and include username so callers don't accidentally
-    # try to access attributes on a plain User object if polymorphic loading is not applied.
-    residents = db.session.scalars(db.select(Resident)).all()
-    data['residents'] = [
-        {
-            'id': getattr(r, 'id', None),
-            'username': getattr(r, 'username', None),
-            'name': getattr(r, 'name', None),
-            'street': getattr(r, 'street', None)
-        }
-        for r in residents
-    ]
-
-    # StopRequests (now reference street_name)
-    srs = db.session.scalars(db.select(StopRequest)).all()
-    data['stop_requests'] = [{'id': s.id, 'drive_id': s.drive_id, 'street_name': s.street_name, 'requestee_id': s.requestee_id,
-                               'created_at': s.created_at.isoformat() if getattr(s, 'created_at', None) else None} for s in srs]
-
-    return data
+    snapshot = snapshot or DataSnapshot()
+    # stop requests first so the drives builder can group stop ids without a query
+    snapshot['stop_requests']
+    return snapshot.to_dict()
 
 
 def _render_table(title, rows):
+    rich = _rich()
     if not rows:
-        if _RICH_AVAILABLE:
-            _CONSOLE.print(f"\n[bold]{title}[/bold] (empty)")
+        if rich:
+            rich[0].print(f"\n[bold]{title}[/bold] (empty)")
         else:
             print(f"\n=== {title} === (empty)")
         return
 
     # If rows are dict-like, take keys as columns. For simple lists, show single column.
-    if _RICH_AVAILABLE:
+    if rich:
+        console, Table = rich
         # normalize rows to list of dicts
         if isinstance(rows, (list, tuple)) and rows and isinstance(rows[0], dict):
             columns = []
@@ -98,48 +151,49 @@ def _render_table(title, rows):
                 row = [str(r)]
             table.add_row(*row)
 
-        _CONSOLE.print(table)
+        console.print(table)
     else:
         print(f"\n=== {title} ===")
         for r in rows:
             print(r)
 
-def print_users():
+def print_users(snapshot=None):
     """Pretty-print only the users table."""
-    data = list_all_data()
-    _render_table('USERS', data.get('users', []))
-    return data['users']
+    rows = (snapshot or DataSnapshot())['users']
+    _render_table('USERS', rows)
+    return rows
 
-def print_drivers():
+def print_drivers(snapshot=None):
     """Pretty-print only the drivers table."""
-    data = list_all_data()
-    _render_table('DRIVERS', data.get('drivers', []))
-    return data['drivers']
+    rows = (snapshot or DataSnapshot())['drivers']
+    _render_table('DRIVERS', rows)
+    return rows
 
-def print_drives():
+def print_drives(snapshot=None):
     """Pretty-print only the drives table."""
-    data = list_all_data()
-    _render_table('DRIVES', data.get('drives', []))
-    return data['drives']
+    rows = (snapshot or DataSnapshot())['drives']
+    _render_table('DRIVES', rows)
+    return rows
 
-def print_residents():
+def print_residents(snapshot=None):
     """Pretty-print only the residents table."""
-    data = list_all_data()
-    _render_table('RESIDENTS', data.get('residents', []))
-    return data['residents']
+    rows = (snapshot or DataSnapshot())['residents']
+    _render_table('RESIDENTS', rows)
+    return rows
 
-def print_stop_requests():
+def print_stop_requests(snapshot=None):
     """Pretty-print only the stop requests table."""
-    data = list_all_data()
-    _render_table('STOP REQUESTS', data.get('stop_requests', []))
-    return data['stop_requests']
-
-def print_all_data():
-    """Pretty-print all tables to stdout for CLI usage."""
-    data = list_all_data()
-    print_users()
-    print_drivers()
-    print_drives()
-    print_residents()
-    print_stop_requests()
-    return data
\ No newline at end of file
+    rows = (snapshot or DataSnapshot())['stop_requests']
+    _render_table('STOP REQUESTS', rows)
+    return rows
+
+def print_all_data(snapshot=None):
+    """Pretty-print all tables to stdout for CLI usage, reading each table once."""
+    snapshot = snapshot or DataSnapshot()
+    data = list_all_data(snapshot)
+    print_users(snapshot)
+    print_drivers(snapshot)
+    print_drives(snapshot)
+    print_residents(snapshot)
+    print_stop_requests(snapshot)
+    return data
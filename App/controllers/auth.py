@@ -1,19 +1,114 @@
-from flask_jwt_extended import create_access_token, jwt_required, JWTManager, get_jwt_identity, verify_jwt_in_request
+import json
+from functools import wraps
+
+from flask import current_app, g, request, jsonify
+from flask_jwt_extended import create_access_token, jwt_required, JWTManager, get_current_user, verify_jwt_in_request
+from werkzeug.local import LocalProxy
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+
+from .identity import configure_identity_cache, load_identity
+from .user import get_user_by_username
+
+ROLES = ('user', 'driver', 'resident')
 
-from App.models import User
-from App.database import db
 
 def login(username, password):
-  result = db.session.execute(db.select(User).filter_by(username=username))
-  user = result.scalar_one_or_none()
+  user = get_user_by_username(username)
   if user and user.check_password(password):
-    # Store ONLY the user id as a string in JWT 'sub'
-    return create_access_token(identity=str(user.id))
+    # 'sub' holds the user id as a string; the role travels as its own claim
+    return create_access_token(identity=user)
   return None
 
 
+def parse_subject(sub):
+  """Return (user_id, role) from a JWT subject.
+
+  Current tokens carry a plain id; older ones issued by wsgi.py carry a JSON
+  {"id", "role"} object, which is still accepted.
+  """
+  try:
+    return int(sub), None
+  except (TypeError, ValueError):
+    pass
+  try:
+    identity = json.loads(sub)
+    return int(identity.get("id")), identity.get("role")
+  except (TypeError, ValueError, AttributeError):
+    return None, None
+
+
+class Principal:
+  """The caller as described by the token's claims; no database access.
+
+  id and role are read straight from the JWT. Any other attribute (username,
+  status, street, ...) loads the cached UserRecord on first use.
+  """
+
+  __slots__ = ('id', 'role', '_record')
+
+  def __init__(self, id, role):
+    self.id = id
+    self.role = role
+    self._record = None
+
+  @property
+  def record(self):
+    if self._record is None:
+      self._record = load_identity(self.role or 'user', self.id)
+      if self._record is not None and self.role is None:
+        self.role = self._record.role
+    return self._record
+
+  def __getattr__(self, name):
+    record = self.record
+    if record is None:
+      raise AttributeError(name)
+    return getattr(record, name)
+
+  def __repr__(self):
+    return f"<Principal id={self.id} role={self.role}>"
+
+
+def principal_from_claims(jwt_data):
+  user_id, role = parse_subject(jwt_data.get("sub"))
+  if user_id is None:
+    return None
+  return Principal(user_id, jwt_data.get("role") or role)
+
+
+# The user lookup loader below returns the Principal, so flask_jwt_extended keeps one
+# per request; use this inside @jwt_required / @role_required views.
+current_principal = LocalProxy(get_current_user)
+
+
+def role_required(*roles):
+  """jwt_required() plus a role check against the token's claims, without loading the user."""
+  def decorator(fn):
+    @wraps(fn)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+      principal = current_principal._get_current_object()
+      if principal is None:
+        return jsonify({"error": "Invalid token subject"}), 401
+      role = principal.role
+      if role is None:
+        # legacy token without a role claim: one cached lookup
+        role = getattr(principal.record, 'role', None)
+      if role not in roles:
+        return jsonify({"error": f"Only {' or '.join(r + 's' for r in roles)} can access this endpoint"}), 403
+      return fn(*args, **kwargs)
+    return wrapper
+  return decorator
+
+
+driver_required = role_required('driver')
+resident_required = role_required('resident')
+
+
 def setup_jwt(app):
   jwt = JWTManager(app)
+  configure_identity_cache(app)
 
   # Always store a string user id in the JWT identity (sub),
   # whether a User object or a raw id is passed.
@@ -22,31 +117,60 @@ def setup_jwt(app):
     user_id = getattr(identity, "id", identity)
     return str(user_id) if user_id is not None else None
 
+  # First-class role claim when a user (or UserRecord) is passed as the identity.
+  @jwt.additional_claims_loader
+  def add_role_claim(identity):
+    role = getattr(identity, "role", None)
+    return {"role": role} if role in ROLES else {}
+
+  # Resolved lazily: flask_jwt_extended calls this on every verified request, so
+  # it only builds a Principal from the claims; profile fields load on demand.
   @jwt.user_lookup_loader
   def user_lookup_callback(_jwt_header, jwt_data):
-    identity = jwt_data["sub"]
-    # Cast back to int primary key
-    try:
-      user_id = int(identity)
-    except (TypeError, ValueError):
-      return None
-    return db.session.get(User, user_id)
+    return principal_from_claims(jwt_data)
 
   return jwt
 
 
+_AUTH_USER = 'request_auth_user'
+
+
+def _has_token():
+  """Cheap check for a JWT cookie or Authorization header, so anonymous requests skip decoding."""
+  return bool(
+    request.cookies.get(current_app.config.get('JWT_ACCESS_COOKIE_NAME', 'access_token'))
+    or request.headers.get('Authorization')
+  )
+
+
+def get_request_user():
+  """Resolve the caller at most once per request and memoize it on g.
+
+  Verifies the token (if any) through flask_jwt_extended's public API; invalid or
+  missing tokens mean anonymous.
+  """
+  if _AUTH_USER in g:
+    return g.get(_AUTH_USER)
+  user = None
+  if _has_token():
+    try:
+      verify_jwt_in_request(optional=True)
+      user = get_current_user()
+    except (JWTExtendedException, PyJWTError):
+      user = None
+  setattr(g, _AUTH_USER, user)
+  return user
+
+
 # Context processor to make 'is_authenticated' available to all templates
 def add_auth_context(app):
+  @app.before_request
+  def reset_auth_context():
+    # create_app pushes a long-lived app context, so g outlives a single request;
+    # drop the previous request's resolved user.
+    g.pop(_AUTH_USER, None)
+
   @app.context_processor
   def inject_user():
-      try:
-          verify_jwt_in_request()
-          identity = get_jwt_identity()
-          user_id = int(identity) if identity is not None else None
-          current_user = db.session.get(User, user_id) if user_id is not None else None
-          is_authenticated = current_user is not None
-      except Exception as e:
-          print(e)
-          is_authenticated = False
-          current_user = None
-      return dict(is_authenticated=is_authenticated, current_user=current_user)
\ No newline at end of file
+    current_user = get_request_user()
+    return dict(is_authenticated=current_user is not None, current_user=current_user)
@@ -1,6 +1,27 @@
-from datetime import datetime
-from App.models import Driver
-from App.database import db
+from datetime import date, datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from App.models import Driver, Drive, DriveRecurrence, DriveOccurrence, StopRequest, StreetLocation, parse_occurrence_key
+from App.database import db, replica_reads
+from App.geo import candidate_cell_ranges, validate_position, within_radius
+from App.hashing import offload
+from App.route_optimizer import DEFAULT_TIME_BUDGET, optimize_path
+from .pagination import keyset_page, clamp_limit
+
+# How far ahead recurring drives are expanded when no window end is given
+DEFAULT_SCHEDULE_HORIZON = timedelta(days=14)
+
+DEFAULT_NEARBY_RADIUS_KM = 1.0
+MAX_NEARBY_RADIUS_KM = 50.0
+
+# The 2-opt search runs on the shared native thread pool (App.hashing); keep each job short
+MAX_OPTIMIZE_TIME_BUDGET = 0.25
+# The distance matrix is n x n float64 (2 MB at 500 stops)
+MAX_OPTIMIZE_STOPS = 500
+
+
+class TooManyStops(Exception):
+    """Raised by optimize_drive for a drive with more than MAX_OPTIMIZE_STOPS stops."""
+
 
 def create_driver(username, password, status=None):
     d = Driver(username=username, password=password, status=status)
@@ -11,14 +32,251 @@ def create_driver(username, password, status=None):
 def get_driver(id):
     return db.session.get(Driver, id)
 
-def create_drive(driver_id, when=None, current_location=None):
+def create_drive(driver_id, when=None, current_location=None, latitude=None, longitude=None):
+    driver = get_driver(driver_id)
+    if not driver:
+        return None
+    return driver.add_drive(when=when, current_location=current_location, latitude=latitude, longitude=longitude)
+
+def set_driver_status(driver_id, status):
     driver = get_driver(driver_id)
     if not driver:
         return None
-    return driver.add_drive(when=when, current_location=current_location)
+    driver.status = status
+    db.session.commit()
+    return driver
+
+def get_drive(id):
+    return db.session.get(Drive, id)
 
-def get_driver_schedule(driver_id):
+def create_recurrence(driver_id, weekdays, at, current_location=None, starts_on=None, ends_on=None):
     driver = get_driver(driver_id)
     if not driver:
-        return []
-    return list(driver.schedule)
+        return None
+    if isinstance(starts_on, str):
+        starts_on = date.fromisoformat(starts_on)
+    if isinstance(ends_on, str):
+        ends_on = date.fromisoformat(ends_on)
+    return driver.add_recurrence(weekdays, at, current_location=current_location,
+                                 starts_on=starts_on, ends_on=ends_on)
+
+@replica_reads
+def get_driver_schedule(driver_id, start=None, end=None):
+    """Return the driver's drives in [start, end), ordered by time.
+
+    Stored drives are read with one windowed query; recurring drives are expanded in
+    memory into DriveOccurrence objects (id None, `key` set) unless that occurrence
+    has already been materialized. Without a window, stored drives are unbounded and
+    recurrences are expanded from now over DEFAULT_SCHEDULE_HORIZON. `start`/`end`
+    may be datetimes or ISO strings (ValueError if unparseable).
+    """
+    if isinstance(start, str):
+        start = datetime.fromisoformat(start)
+    if isinstance(end, str):
+        end = datetime.fromisoformat(end)
+
+    stmt = db.select(Drive).where(Drive.driver_id == driver_id)
+    if start is not None:
+        stmt = stmt.where(Drive.datetime >= start)
+    if end is not None:
+        stmt = stmt.where(Drive.datetime < end)
+    drives = list(db.session.scalars(stmt.order_by(Drive.datetime, Drive.id)))
+
+    rules = db.session.scalars(db.select(DriveRecurrence).where(DriveRecurrence.driver_id == driver_id)).all()
+    if rules:
+        expand_from = start or datetime.now().replace(second=0, microsecond=0)
+        expand_to = end or expand_from + DEFAULT_SCHEDULE_HORIZON
+        # occurrences already backed by a Drive row, even if that drive has been moved
+        materialized = {(r.recurrence_id, r.occurrence) for r in db.session.execute(
+            db.select(Drive.recurrence_id, Drive.occurrence).where(
+                Drive.recurrence_id.in_([rule.id for rule in rules]),
+                Drive.occurrence >= expand_from, Drive.occurrence < expand_to
+            )
+        )}
+        for rule in rules:
+            for when in rule.occurrences(expand_from, expand_to):
+                if (rule.id, when) not in materialized:
+                    drives.append(DriveOccurrence(rule, when))
+        drives.sort(key=lambda d: d.datetime)
+    return drives
+
+def materialize_occurrence(key):
+    """Return the Drive row for an occurrence key, creating (and flushing) it if needed.
+
+    Returns None if the key does not name an occurrence of an existing rule. The caller
+    commits; a concurrent materialization of the same occurrence is resolved through
+    the (recurrence_id, occurrence) unique constraint.
+    """
+    parsed = parse_occurrence_key(key)
+    if parsed is None:
+        return None
+    rule_id, when = parsed
+    existing = db.select(Drive).where(Drive.recurrence_id == rule_id, Drive.occurrence == when)
+    drive = db.session.scalars(existing).first()
+    if drive is not None:
+        return drive
+    rule = db.session.get(DriveRecurrence, rule_id)
+    if rule is None or not rule.occurs_at(when):
+        return None
+    driver = rule.driver
+    try:
+        # the savepoint keeps a lost race from rolling back the caller's transaction
+        with db.session.begin_nested():
+            drive = Drive(datetime=when, current_location=rule.current_location, driver=driver)
+            drive.recurrence_id = rule.id
+            drive.occurrence = when
+            db.session.add(drive)
+    except IntegrityError:
+        drive = db.session.scalars(existing).first()
+    return drive
+
+def resolve_drive(ref):
+    """Look up a drive by id, or by occurrence key (materializing it)."""
+    if isinstance(ref, Drive):
+        return ref
+    try:
+        return db.session.get(Drive, int(ref))
+    except (TypeError, ValueError):
+        return materialize_occurrence(ref)
+
+def list_drivers(limit=None, after_id=None, status=None):
+    """Return one keyset page of drivers as {'items': [...], 'next_cursor': id|None}."""
+    stmt = db.select(Driver.id, Driver.username, Driver.status)
+    if status is not None:
+        stmt = stmt.where(Driver.status == status)
+    rows, next_cursor = keyset_page(stmt, Driver.id, limit, after_id)
+    return {
+        'items': [{'id': r.id, 'username': r.username, 'status': r.status} for r in rows],
+        'next_cursor': next_cursor
+    }
+
+def list_drives(limit=None, after_id=None, driver_id=None):
+    """Return one keyset page of drives, optionally for a single driver."""
+    stmt = db.select(Drive.id, Drive.datetime, Drive.driver_id, Drive.current_location)
+    if driver_id is not None:
+        stmt = stmt.where(Drive.driver_id == driver_id)
+    rows, next_cursor = keyset_page(stmt, Drive.id, limit, after_id)
+    return {
+        'items': [
+            {
+                'id': r.id,
+                'datetime': r.datetime.isoformat() if r.datetime is not None else None,
+                'driver_id': r.driver_id,
+                'current_location': r.current_location
+            }
+            for r in rows
+        ],
+        'next_cursor': next_cursor
+    }
+
+def nearby_rows(model, columns, lat, lon, radius_km, extra=()):
+    """Rows of `model` within radius_km of (lat, lon), nearest first, as (distance_km, row).
+
+    Only the grid cells overlapping the radius are read (one indexed query of cell-id
+    ranges); the exact distance filter then runs over those candidates in App.geo.
+    """
+    lat, lon = validate_position(lat, lon)
+    radius_km = float(radius_km)
+    if not 0 < radius_km <= MAX_NEARBY_RADIUS_KM:
+        raise ValueError(f'radius must be in (0, {MAX_NEARBY_RADIUS_KM}] km')
+    ranges = candidate_cell_ranges(lat, lon, radius_km)
+    stmt = db.select(*columns, model.latitude, model.longitude).where(
+        db.or_(*(model.grid_cell.between(lo, hi) for lo, hi in ranges)), *extra
+    )
+    return within_radius(lat, lon, radius_km, db.session.execute(stmt).all())
+
+def find_nearby_drives(lat, lon, radius_km=DEFAULT_NEARBY_RADIUS_KM, limit=None, since=None):
+    """Drives positioned within radius_km of (lat, lon), nearest first (ValueError on bad input)."""
+    if isinstance(since, str):
+        since = datetime.fromisoformat(since)
+    extra = (Drive.datetime >= since,) if since is not None else ()
+    hits = nearby_rows(Drive, (Drive.id, Drive.datetime, Drive.driver_id, Drive.current_location),
+                       lat, lon, radius_km, extra)
+    return [
+        {
+            'id': r.id,
+            'datetime': r.datetime.isoformat() if r.datetime is not None else None,
+            'driver_id': r.driver_id,
+            'current_location': r.current_location,
+            'lat': r.latitude,
+            'lon': r.longitude,
+            'distance_km': round(distance, 3)
+        }
+        for distance, r in hits[:clamp_limit(limit)]
+    ]
+
+def set_street_location(name, latitude, longitude):
+    """Add or move a street in the local geocoding table (ValueError when out of range)."""
+    latitude, longitude = validate_position(latitude, longitude)
+    street = db.session.merge(StreetLocation(name, latitude, longitude))
+    db.session.commit()
+    return street
+
+def geocode_streets(names):
+    """Map street names to (lat, lon) from the street_location table; unknown names are left out."""
+    names = {n for n in names if n}
+    if not names:
+        return {}
+    rows = db.session.execute(
+        db.select(StreetLocation.name, StreetLocation.latitude, StreetLocation.longitude)
+        .where(StreetLocation.name.in_(names))
+    )
+    return {r.name: (r.latitude, r.longitude) for r in rows}
+
+def optimize_drive(drive_id, time_budget=DEFAULT_TIME_BUDGET):
+    """Order a drive's stops (nearest neighbour + 2-opt, see App.route_optimizer) and store it in StopRequest.sequence.
+
+    A stop is placed at its own lat/lon, else at its street from the street_location
+    table. The route starts at the drive's position (or its current_location street),
+    falling back to the first locatable stop. Stops that cannot be placed keep their
+    request order after the routed ones and are listed under 'unlocated'. Returns
+    None if the drive does not exist. The search itself runs on the hashing pool, so
+    a full pool raises HashingPoolBusy.
+    """
+    drive = db.session.execute(
+        db.select(Drive.id, Drive.latitude, Drive.longitude, Drive.current_location).where(Drive.id == drive_id)
+    ).first()
+    if drive is None:
+        return None
+    time_budget = min(max(float(time_budget), 0.0), MAX_OPTIMIZE_TIME_BUDGET)
+    stops = db.session.execute(
+        db.select(StopRequest.id, StopRequest.street_name, StopRequest.latitude, StopRequest.longitude)
+        .where(StopRequest.drive_id == drive_id).order_by(StopRequest.id).limit(MAX_OPTIMIZE_STOPS + 1)
+    ).all()
+    if len(stops) > MAX_OPTIMIZE_STOPS:
+        raise TooManyStops(f'drive {drive_id} has more than {MAX_OPTIMIZE_STOPS} stops')
+    known = geocode_streets([s.street_name for s in stops if s.latitude is None] + [drive.current_location])
+
+    located, points, unlocated = [], [], []
+    for s in stops:
+        if s.latitude is not None and s.longitude is not None:
+            point = (s.latitude, s.longitude)
+        else:
+            point = known.get(s.street_name)
+        if point is None:
+            unlocated.append(s.id)
+        else:
+            located.append(s.id)
+            points.append(point)
+
+    if drive.latitude is not None and drive.longitude is not None:
+        start = (drive.latitude, drive.longitude)
+    else:
+        start = known.get(drive.current_location)
+    if start is not None:
+        lats, lons = [start[0]] + [p[0] for p in points], [start[1]] + [p[1] for p in points]
+        order, stats = offload(optimize_path, lats, lons, time_budget)
+        ordered = [located[i - 1] for i in order]
+    elif located:
+        order, stats = offload(optimize_path, [p[0] for p in points], [p[1] for p in points], time_budget)
+        ordered = [located[0]] + [located[i] for i in order]
+    else:
+        ordered, stats = [], optimize_path([], [])[1]
+
+    sequence = ordered + unlocated
+    if sequence:
+        db.session.execute(db.update(StopRequest), [
+            {'id': stop_id, 'sequence': position} for position, stop_id in enumerate(sequence, start=1)
+        ])
+        db.session.commit()
+    return dict(stats, drive_id=drive_id, stops=sequence, unlocated=unlocated)
@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+
+from App.models import User, Driver, Resident
+from App.database import db
+
+DEFAULT_IDENTITY_CACHE_SIZE = 1024
+DEFAULT_IDENTITY_CACHE_TTL = 60
+
+
+class UserRecord:
+    """Read-only snapshot of the columns views need to know who the caller is."""
+
+    __slots__ = ('id', 'username', 'role', 'status', 'name', 'street')
+
+    def __init__(self, id, username, role, status=None, name=None, street=None):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.status = status
+        self.name = name
+        self.street = street
+
+    def get_json(self):
+        return {'id': self.id, 'username': self.username}
+
+    def __repr__(self):
+        return f"<UserRecord id={self.id} username={self.username} role={self.role}>"
+
+
+class IdentityCache:
+    """Bounded LRU of UserRecords keyed by (role, id), each entry expiring after `ttl` seconds."""
+
+    def __init__(self, maxsize=DEFAULT_IDENTITY_CACHE_SIZE, ttl=DEFAULT_IDENTITY_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, record):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, record)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            for key in [k for k in self._entries if k[1] == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'maxsize': self.maxsize, 'ttl': self.ttl,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+_cache = IdentityCache()
+
+
+def configure_identity_cache(app):
+    """Size the per-worker cache from IDENTITY_CACHE_SIZE / IDENTITY_CACHE_TTL (seconds)."""
+    global _cache
+    _cache = IdentityCache(
+        app.config.get('IDENTITY_CACHE_SIZE', DEFAULT_IDENTITY_CACHE_SIZE),
+        app.config.get('IDENTITY_CACHE_TTL', DEFAULT_IDENTITY_CACHE_TTL)
+    )
+
+
+def _fetch_record(role, user_id):
+    if role == 'driver':
+        row = db.session.execute(
+            db.select(Driver.id, Driver.username, Driver.status).where(Driver.id == user_id)
+        ).first()
+        return UserRecord(row.id, row.username, role, status=row.status) if row else None
+    if role == 'resident':
+        row = db.session.execute(
+            db.select(Resident.id, Resident.username, Resident.name, Resident.street).where(Resident.id == user_id)
+        ).first()
+        return UserRecord(row.id, row.username, role, name=row.name, street=row.street) if row else None
+    row = db.session.execute(
+        db.select(User.id, User.username, User.role).where(User.id == user_id)
+    ).first()
+    return UserRecord(row.id, row.username, row.role) if row else None
+
+
+def load_identity(role, user_id):
+    """Return the cached UserRecord for (role, user_id), querying only on a miss or expiry."""
+    key = (role, user_id)
+    record = _cache.get(key)
+    if record is None:
+        record = _fetch_record(role, user_id)
+        if record is not None:
+            _cache.put(key, record)
+    return record
+
+
+def invalidate_identity(user_id):
+    _cache.invalidate(user_id)
+
+
+def identity_cache_stats():
+    return _cache.stats()
+
+
+# Any ORM update or delete of a user (update_user, status changes, deletes) drops its
+# cached records. Propagates to Driver and Resident.
+@event.listens_for(User, 'after_update', propagate=True)
+@event.listens_for(User, 'after_delete', propagate=True)
+def _invalidate_on_write(mapper, connection, target):
+    invalidate_identity(target.id)
@@ -0,0 +1,221 @@
+import csv
+import json
+import os
+import time
+from datetime import datetime
+from itertools import islice
+
+from App.hashing import hash_passwords
+from App.models import User, Driver, Drive, Resident, StopRequest
+from App.database import db
+
+DEFAULT_BATCH_SIZE = 5000
+
+_USER = User.__table__
+_DRIVER = Driver.__table__
+_RESIDENT = Resident.__table__
+_DRIVE = Drive.__table__
+_STOP_REQUEST = StopRequest.__table__
+
+
+def iter_rows(path, fmt=None):
+    """Stream dict rows from a CSV (header row) or NDJSON file without loading it whole."""
+    if fmt is None:
+        ext = os.path.splitext(path)[1].lower()
+        fmt = 'ndjson' if ext in ('.ndjson', '.jsonl', '.json') else 'csv'
+    with open(path, newline='', encoding='utf-8') as fh:
+        if fmt == 'csv':
+            for row in csv.DictReader(fh):
+                yield {k: (v if v != '' else None) for k, v in row.items()}
+        else:
+            for line in fh:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def _batched(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _parse_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def _as_int(value):
+    return int(value) if value not in (None, '') else None
+
+
+class _IdMaps:
+    """In-memory foreign-key lookups, seeded from the database and grown as rows are inserted."""
+
+    def __init__(self):
+        self.drivers = dict(db.session.execute(
+            db.select(Driver.username, Driver.id)
+        ).all())
+        self.driver_ids = set(self.drivers.values())
+        self.residents = {}
+        self.resident_streets = {}
+        for r in db.session.execute(db.select(Resident.id, Resident.username, Resident.street)):
+            self.residents[r.username] = r.id
+            self.resident_streets[r.id] = r.street
+        self.drive_ids = set(db.session.scalars(db.select(Drive.id)))
+        self.drive_refs = {}
+
+    def driver_id(self, row):
+        if row.get('driver') is not None:
+            return self.drivers.get(row['driver'])
+        driver_id = _as_int(row.get('driver_id'))
+        return driver_id if driver_id in self.driver_ids else None
+
+    def resident_id(self, row):
+        if row.get('resident') is not None:
+            return self.residents.get(row['resident'])
+        resident_id = _as_int(row.get('resident_id') or row.get('requestee_id'))
+        return resident_id if resident_id in self.resident_streets else None
+
+    def drive_id(self, row):
+        if row.get('drive_ref') is not None:
+            return self.drive_refs.get(str(row['drive_ref']))
+        drive_id = _as_int(row.get('drive_id'))
+        return drive_id if drive_id in self.drive_ids else None
+
+
+def _insert_users(batch, role, subtable, subrow):
+    """Insert the shared `user` rows for a batch, then the subclass rows keyed by the new ids.
+
+    Rows with a `password_hash` keep it as is; the batch's plain passwords are hashed
+    in parallel on the hashing pool.
+    """
+    plain = [row['password'] for row in batch if not row.get('password_hash')]
+    hashes = iter(hash_passwords(plain))
+    users = [
+        {
+            'username': row['username'],
+            'password': row.get('password_hash') or next(hashes),
+            'role': role
+        }
+        for row in batch
+    ]
+    inserted = db.session.execute(
+        db.insert(_USER).returning(_USER.c.id, sort_by_parameter_order=True), users
+    ).all()
+    db.session.execute(
+        db.insert(subtable),
+        [subrow(row, new.id) for row, new in zip(batch, inserted)]
+    )
+    return [new.id for new in inserted]
+
+
+def _import_drivers(rows, maps):
+    for batch in rows:
+        ids = _insert_users(batch, 'driver', _DRIVER, lambda row, id: {'id': id, 'status': row.get('status')})
+        for row, id in zip(batch, ids):
+            maps.drivers[row['username']] = id
+            maps.driver_ids.add(id)
+        yield len(batch), 0
+
+
+def _import_residents(rows, maps):
+    for batch in rows:
+        ids = _insert_users(batch, 'resident', _RESIDENT, lambda row, id: {
+            'id': id, 'name': row.get('name'), 'street': row.get('street')
+        })
+        for row, id in zip(batch, ids):
+            maps.residents[row['username']] = id
+            maps.resident_streets[id] = row.get('street')
+        yield len(batch), 0
+
+
+def _import_drives(rows, maps):
+    for batch in rows:
+        values, refs = [], []
+        for row in batch:
+            driver_id = maps.driver_id(row)
+            if driver_id is None:
+                continue
+            values.append({
+                'driver_id': driver_id,
+                'datetime': _parse_datetime(row.get('datetime') or row.get('when')) or datetime.utcnow(),
+                'current_location': row.get('current_location') or row.get('location')
+            })
+            refs.append(row.get('ref'))
+        if values:
+            inserted = db.session.execute(
+                db.insert(_DRIVE).returning(_DRIVE.c.id, sort_by_parameter_order=True), values
+            ).all()
+            for ref, new in zip(refs, inserted):
+                maps.drive_ids.add(new.id)
+                if ref is not None:
+                    maps.drive_refs[str(ref)] = new.id
+        yield len(values), len(batch) - len(values)
+
+
+def _import_stop_requests(rows, maps):
+    for batch in rows:
+        values = []
+        for row in batch:
+            resident_id = maps.resident_id(row)
+            drive_id = maps.drive_id(row)
+            if resident_id is None or drive_id is None:
+                continue
+            values.append({
+                'drive_id': drive_id,
+                'requestee_id': resident_id,
+                'street_name': row.get('street') or row.get('street_name') or maps.resident_streets.get(resident_id),
+                'created_at': _parse_datetime(row.get('created_at')) or datetime.utcnow()
+            })
+        if values:
+            db.session.execute(db.insert(_STOP_REQUEST), values)
+        yield len(values), len(batch) - len(values)
+
+
+_IMPORTERS = [
+    ('drivers', _import_drivers),
+    ('residents', _import_residents),
+    ('drives', _import_drives),
+    ('stop_requests', _import_stop_requests),
+]
+
+
+def bulk_import(sources, batch_size=DEFAULT_BATCH_SIZE, fmt=None, on_batch=None):
+    """Stream rows from files into the database with batched executemany inserts.
+
+    `sources` maps 'drivers'/'residents'/'drives'/'stop_requests' to file paths; tables
+    are loaded in dependency order and each batch is committed on its own. Rows
+    reference users by `driver`/`resident` username (or *_id) and drives by `drive_ref`
+    (the `ref` column of the drives file) or `drive_id`; unresolved rows are skipped.
+    `on_batch(table, stats)` is called after every commit. Returns a list of per-table
+    stats dicts with rows, skipped, seconds and rows_per_sec.
+    """
+    maps = _IdMaps()
+    results = []
+    for table, importer in _IMPORTERS:
+        path = sources.get(table)
+        if not path:
+            continue
+        stats = {'table': table, 'rows': 0, 'skipped': 0, 'seconds': 0.0, 'rows_per_sec': 0.0}
+        start = time.perf_counter()
+        try:
+            batches = importer(_batched(iter_rows(path, fmt), batch_size), maps)
+            for inserted, skipped in batches:
+                db.session.commit()
+                stats['rows'] += inserted
+                stats['skipped'] += skipped
+                stats['seconds'] = time.perf_counter() - start
+                stats['rows_per_sec'] = stats['rows'] / stats['seconds'] if stats['seconds'] else 0.0
+                if on_batch:
+                    on_batch(table, stats)
+        except Exception:
+            # earlier batches stay committed; only the failing batch is discarded
+            db.session.rollback()
+            raise
+        results.append(stats)
+    return results
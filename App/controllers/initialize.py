@@ -1,5 +1,6 @@
 from .user import create_user
-from App.database import db
+from App.database import db, stamp_head
+from App.cache import clear_cache
 
 from App.models import Driver, Resident
 
@@ -8,6 +9,8 @@ def initialize():
     # Reset schema
     db.drop_all()
     db.create_all()
+    # create_all built the latest schema, so `flask db upgrade` has nothing left to apply
+    stamp_head()
 
     # Create a sample user
     create_user('bob', 'bobpass')
@@ -40,4 +43,6 @@ def initialize():
         print ("Something went wrong. I dont fucking care, lets run the code anyway")
         pass
 
+    # the tables were recreated, so their write counters started over
+    clear_cache()
     print('database initialized with demo data')
@@ -0,0 +1,82 @@
+from datetime import datetime
+from App.models import Notification, StopRequest
+from App.database import db, replica_reads
+from .pagination import clamp_limit
+
+NOTIFICATION_BATCH_SIZE = 500
+
+def describe_drive_change(drive_id, changes):
+    parts = []
+    if changes.get('datetime') is not None:
+        parts.append(f"now departs at {changes['datetime']:%Y-%m-%d %H:%M}")
+    if 'current_location' in changes:
+        parts.append(f"now starts from {changes['current_location'] or 'an unknown location'}")
+    return f"Drive #{drive_id} " + (' and '.join(parts) or 'was updated')
+
+def fan_out_drive_update(drive_id, changes, batch_size=NOTIFICATION_BATCH_SIZE):
+    """Write a 'drive.updated' notification for every resident with a stop request on the drive.
+
+    Affected residents are resolved with one DISTINCT query on stop_request.drive_id;
+    notifications go in as multi-row inserts of `batch_size`, committing once per batch.
+    Returns the number of residents notified.
+    """
+    resident_ids = db.session.scalars(
+        db.select(StopRequest.requestee_id)
+        .where(StopRequest.drive_id == drive_id, StopRequest.requestee_id.is_not(None))
+        .distinct().order_by(StopRequest.requestee_id)
+    ).all()
+    if not resident_ids:
+        return 0
+    message = describe_drive_change(drive_id, changes)
+    now = datetime.utcnow()
+    table = Notification.__table__
+    for start in range(0, len(resident_ids), batch_size):
+        db.session.execute(table.insert(), [
+            {'resident_id': rid, 'drive_id': drive_id, 'kind': 'drive.updated', 'message': message, 'created_at': now}
+            for rid in resident_ids[start:start + batch_size]
+        ])
+        db.session.commit()
+    return len(resident_ids)
+
+@replica_reads
+def get_resident_notifications(resident_id, limit=None, after_id=None, unread_only=False):
+    """Return one page of a resident's notifications, newest first, as {'items', 'next_cursor'}."""
+    limit = clamp_limit(limit)
+    stmt = db.select(
+        Notification.id, Notification.drive_id, Notification.kind, Notification.message,
+        Notification.created_at, Notification.read_at
+    ).where(Notification.resident_id == resident_id)
+    if unread_only:
+        stmt = stmt.where(Notification.read_at.is_(None))
+    if after_id is not None:
+        stmt = stmt.where(Notification.id < after_id)
+    rows = db.session.execute(stmt.order_by(Notification.id.desc()).limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1].id
+    return {
+        'items': [
+            {
+                'id': n.id,
+                'drive_id': n.drive_id,
+                'kind': n.kind,
+                'message': n.message,
+                'created_at': n.created_at.isoformat(),
+                'read': n.read_at is not None
+            }
+            for n in rows
+        ],
+        'next_cursor': next_cursor
+    }
+
+def mark_notifications_read(resident_id, ids=None):
+    """Mark the given (or all) unread notifications read in one UPDATE; returns the row count."""
+    stmt = db.update(Notification).where(
+        Notification.resident_id == resident_id, Notification.read_at.is_(None)
+    )
+    if ids is not None:
+        stmt = stmt.where(Notification.id.in_(ids))
+    result = db.session.execute(stmt.values(read_at=datetime.utcnow()), execution_options={'synchronize_session': False})
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,29 @@
+from App.database import db
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def clamp_limit(limit):
+    """Coerce a requested page size into [1, MAX_PAGE_SIZE]."""
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+
+def keyset_page(stmt, id_column, limit=None, after_id=None):
+    """Run one bounded query for the page after `after_id`, ordered by `id_column`.
+
+    Fetches limit + 1 rows so the presence of a next page is known without a COUNT.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    limit = clamp_limit(limit)
+    if after_id is not None:
+        stmt = stmt.where(id_column > after_id)
+    stmt = stmt.order_by(id_column).limit(limit + 1)
+    rows = db.session.execute(stmt).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1].id
+    return rows, next_cursor
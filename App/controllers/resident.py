@@ -1,5 +1,13 @@
-from App.models import Resident
-from App.database import db
+from datetime import datetime
+from sqlalchemy.exc import SQLAlchemyError
+from App.models import Resident, StopRequest, Drive
+from App.database import db, replica_reads
+from App.events import publish_many
+from .pagination import keyset_page, clamp_limit
+from .driver import resolve_drive, materialize_occurrence, nearby_rows, DEFAULT_NEARBY_RADIUS_KM
+from App.geo import cell_for, validate_position
+
+MAX_STOP_BATCH = 500
 
 def create_resident(username, password, name=None, street=None):
     r = Resident(username=username, password=password, name=name, street=street)
@@ -10,19 +18,208 @@ def create_resident(username, password, name=None, street=None):
 def get_resident(id):
     return db.session.get(Resident, id)
 
-# Updated: accept drive_id to associate the StopRequest with an existing Drive
-def create_stop_request(resident_id, drive_id, street):
+def get_stop_request(id):
+    return db.session.get(StopRequest, id)
+
+# Updated: accept drive_id (or a recurring drive's occurrence key) to associate the StopRequest with a Drive
+def create_stop_request(resident_id, drive_id, street, latitude=None, longitude=None):
+    """Returns None if the resident or drive is not found; ValueError for an invalid lat/lon."""
+    latitude, longitude = _position(latitude, longitude)
     resident = get_resident(resident_id)
     if not resident:
         return None
     try:
-        return resident.create_stop_request(drive_id, street)
-    except Exception:
-        # drive not found or other error
+        drive = resolve_drive(drive_id)
+        if drive is None:
+            return None
+        return resident.create_stop_request(drive, street, latitude=latitude, longitude=longitude)
+    except SQLAlchemyError:
+        # integrity failure or e.g. a locked database; leave the session usable
+        db.session.rollback()
         return None
 
-def get_resident_inbox(resident_id, street=None):
-    resident = get_resident(resident_id)
-    if not resident:
-        return []
-    return resident.view_inbox(street)
\ No newline at end of file
+def _as_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _position(lat, lon):
+    if lat is None and lon is None:
+        return (None, None)
+    try:
+        return validate_position(lat, lon)
+    except TypeError:
+        raise ValueError('lat and lon must both be numbers')
+
+def create_stop_requests(items, resident_id=None):
+    """Create many stop requests in one transaction, reporting a result per item.
+
+    Each item is a dict with drive_id (an id or a recurring drive's occurrence key),
+    optional street, lat/lon and resident_id (defaulting to `resident_id`). Drives and
+    residents are validated with one IN query each and the valid items go in as a
+    single multi-row INSERT and one commit. Returns a list, in input order, of {'index', 'status': 'created', 'stop'}
+    or {'index', 'status': 'error', 'error'}.
+    """
+    wanted, keys = [], {}
+    for item in items:
+        item = item if isinstance(item, dict) else {}
+        drive_ref = item.get('drive_id')
+        drive_id = _as_id(drive_ref)
+        if drive_id is None and isinstance(drive_ref, str):
+            # occurrence keys materialize their Drive row inside this transaction
+            if drive_ref not in keys:
+                drive = materialize_occurrence(drive_ref)
+                keys[drive_ref] = drive.id if drive is not None else None
+            drive_id = keys[drive_ref]
+        try:
+            position = _position(item.get('lat'), item.get('lon'))
+        except (TypeError, ValueError):
+            position = False
+        wanted.append((_as_id(item.get('resident_id', resident_id)), drive_id, item.get('street'), position))
+
+    drive_ids = {w[1] for w in wanted if w[1] is not None}
+    resident_ids = {w[0] for w in wanted if w[0] is not None}
+    known_drives = set(db.session.scalars(db.select(Drive.id).where(Drive.id.in_(drive_ids)))) if drive_ids else set()
+    streets = dict(db.session.execute(
+        db.select(Resident.id, Resident.street).where(Resident.id.in_(resident_ids))
+    ).all()) if resident_ids else {}
+
+    now = datetime.utcnow()
+    results, values = [], []
+    for index, (rid, did, street, position) in enumerate(wanted):
+        if position is False:
+            results.append({'index': index, 'status': 'error', 'error': 'Invalid lat/lon'})
+        elif rid not in streets:
+            results.append({'index': index, 'status': 'error', 'error': 'Resident not found'})
+        elif did not in known_drives:
+            results.append({'index': index, 'status': 'error', 'error': 'Drive not found'})
+        else:
+            values.append({
+                'drive_id': did,
+                'street_name': str(street) if street is not None else streets[rid],
+                'requestee_id': rid,
+                'created_at': now,
+                'latitude': position[0],
+                'longitude': position[1],
+                'grid_cell': cell_for(*position)
+            })
+            results.append(index)
+
+    if values:
+        table = StopRequest.__table__
+        try:
+            # Unordered RETURNING keeps this one multi-row statement on SQLite (which has
+            # no sentinel for ordered RETURNING); rows are matched back by content below.
+            inserted = db.session.execute(
+                db.insert(table).returning(table.c.id, table.c.drive_id, table.c.street_name,
+                                           table.c.requestee_id, table.c.created_at),
+                values
+            ).all()
+            # Core inserts skip the ORM hooks in App.events, so publish explicitly
+            publish_many('stop.requested', [_stop_request_row(row) for row in inserted])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        by_content = {}
+        for row in sorted(inserted, key=lambda r: r.id):
+            by_content.setdefault((row.drive_id, row.street_name, row.requestee_id), []).append(row)
+        pending = iter(values)
+        for i, result in enumerate(results):
+            if isinstance(result, int):
+                row = next(pending)
+                new = by_content[(row['drive_id'], row['street_name'], row['requestee_id'])].pop(0)
+                results[i] = {'index': i, 'status': 'created', 'stop': _stop_request_row(new)}
+    return results
+
+def _stop_request_row(r):
+    return {
+        'id': r.id,
+        'drive_id': r.drive_id,
+        'street_name': r.street_name,
+        'requestee_id': r.requestee_id,
+        'created_at': r.created_at.isoformat() if r.created_at else None
+    }
+
+@replica_reads
+def get_resident_inbox(resident_id, street=None, since=None, limit=None, after_id=None):
+    """Return one page of a resident's stop requests, newest first, as plain dicts.
+
+    Filtering, ordering and the (created_at, id) keyset are all applied in SQL; pass the
+    previous page's next_cursor as after_id. `since` may be a datetime or ISO string
+    (ValueError if unparseable). Returns None if the resident does not exist.
+    """
+    exists = db.session.execute(
+        db.select(Resident.id).where(Resident.id == resident_id)
+    ).first()
+    if not exists:
+        return None
+    if isinstance(since, str):
+        since = datetime.fromisoformat(since)
+    limit = clamp_limit(limit)
+
+    stmt = db.select(
+        StopRequest.id, StopRequest.drive_id, StopRequest.street_name,
+        StopRequest.requestee_id, StopRequest.created_at
+    ).where(StopRequest.requestee_id == resident_id)
+    if street is not None:
+        stmt = stmt.where(StopRequest.street_name == str(street))
+    if since is not None:
+        stmt = stmt.where(StopRequest.created_at >= since)
+    if after_id is not None:
+        cursor_ts = db.select(StopRequest.created_at).where(StopRequest.id == after_id).scalar_subquery()
+        stmt = stmt.where(db.or_(
+            StopRequest.created_at < cursor_ts,
+            db.and_(StopRequest.created_at == cursor_ts, StopRequest.id < after_id)
+        ))
+    stmt = stmt.order_by(StopRequest.created_at.desc(), StopRequest.id.desc()).limit(limit + 1)
+
+    rows = db.session.execute(stmt).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1].id
+    return {'items': [_stop_request_row(r) for r in rows], 'next_cursor': next_cursor}
+
+def list_residents(limit=None, after_id=None, street=None):
+    """Return one keyset page of residents as {'items': [...], 'next_cursor': id|None}."""
+    stmt = db.select(Resident.id, Resident.username, Resident.name, Resident.street)
+    if street is not None:
+        stmt = stmt.where(Resident.street == street)
+    rows, next_cursor = keyset_page(stmt, Resident.id, limit, after_id)
+    return {
+        'items': [
+            {'id': r.id, 'username': r.username, 'name': r.name, 'street': r.street}
+            for r in rows
+        ],
+        'next_cursor': next_cursor
+    }
+
+def list_stop_requests(limit=None, after_id=None, drive_id=None, requestee_id=None, street=None):
+    """Return one keyset page of stop requests filtered by drive, resident and/or street."""
+    stmt = db.select(
+        StopRequest.id, StopRequest.drive_id, StopRequest.street_name,
+        StopRequest.requestee_id, StopRequest.created_at
+    )
+    if drive_id is not None:
+        stmt = stmt.where(StopRequest.drive_id == drive_id)
+    if requestee_id is not None:
+        stmt = stmt.where(StopRequest.requestee_id == requestee_id)
+    if street is not None:
+        stmt = stmt.where(StopRequest.street_name == street)
+    rows, next_cursor = keyset_page(stmt, StopRequest.id, limit, after_id)
+    return {'items': [_stop_request_row(r) for r in rows], 'next_cursor': next_cursor}
+
+def find_nearby_stops(lat, lon, radius_km=DEFAULT_NEARBY_RADIUS_KM, limit=None, drive_id=None):
+    """Stop requests positioned within radius_km of (lat, lon), nearest first (ValueError on bad input)."""
+    extra = (StopRequest.drive_id == drive_id,) if drive_id is not None else ()
+    hits = nearby_rows(StopRequest, (
+        StopRequest.id, StopRequest.drive_id, StopRequest.street_name,
+        StopRequest.requestee_id, StopRequest.created_at
+    ), lat, lon, radius_km, extra)
+    return [
+        dict(_stop_request_row(r), lat=r.latitude, lon=r.longitude, distance_km=round(distance, 3))
+        for distance, r in hits[:clamp_limit(limit)]
+    ]
+
@@ -1,5 +1,7 @@
-from App.models import User
-from App.database import db
+from sqlalchemy.orm import with_polymorphic
+
+from App.models import User, Driver, Resident
+from App.database import db, replica_reads
 
 def create_user(username, password):
     newuser = User(username=username, password=password)
@@ -8,12 +10,15 @@ def create_user(username, password):
     return newuser
 
 def get_user_by_username(username):
-    result = db.session.execute(db.select(User).filter_by(username=username))
+    """Load a user as its concrete Driver/Resident/User class in a single query on the unique username."""
+    poly = with_polymorphic(User, [Driver, Resident])
+    result = db.session.execute(db.select(poly).where(poly.username == username))
     return result.scalar_one_or_none()
 
 def get_user(id):
     return db.session.get(User, id)
 
+@replica_reads
 def get_all_users():
     return db.session.scalars(db.select(User)).all()
 
@@ -32,3 +37,12 @@ def update_user(id, username):
         db.session.commit()
         return True
     return None
+
+def delete_user(id):
+    # polymorphic load, so the driver/resident row and its cascades go too
+    user = get_user(id)
+    if not user:
+        return None
+    db.session.delete(user)
+    db.session.commit()
+    return True
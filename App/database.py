@@ -1,14 +1,287 @@
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from flask import request
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND = 'replica'
+DEFAULT_REPLICA_STICKY_SECONDS = 5
+READ_FROM_HEADER = 'X-Read-From'
+READ_PRIMARY_COOKIE = 'read_primary'
+
+# Read routing state for the current request (or CLI invocation):
+# _route is a per-request override ('primary' / 'replica'), _replica_scope is set
+# inside replica_reads, and _wrote pins reads to the primary after any write.
+_route = ContextVar('db_route', default=None)
+_replica_scope = ContextVar('db_replica_scope', default=False)
+_wrote = ContextVar('db_wrote', default=False)
+
+
+class RoutingSession(Session):
+    """Sends SELECTs made inside replica_reads to the replica bind, when one is configured.
+
+    Flushes, DML and any read after this request wrote something stay on the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and isinstance(clause, Select):
+            engines = self._db.engines
+            if REPLICA_BIND in engines and _reads_from_replica():
+                return engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _reads_from_replica():
+    route = _route.get()
+    if route == 'primary' or _wrote.get():
+        return False
+    return route == 'replica' or _replica_scope.get()
+
+
+def replica_reads(fn):
+    """Mark a read-only controller or view: its SELECTs may be served by the replica."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = _replica_scope.set(True)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _replica_scope.reset(token)
+    return wrapper
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _pin_after_flush(session, flush_context):
+    _wrote.set(True)
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _pin_after_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _wrote.set(True)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# Production engine defaults (DB_ENGINE_MODE = 'production')
+DEFAULT_GREENLET_CONCURRENCY = 100
+DEFAULT_MAX_CONNECTIONS_PER_WORKER = 20
+DEFAULT_POOL_TIMEOUT = 10
+DEFAULT_POOL_RECYCLE = 1800
+
+# Applied to every SQLite connection in production mode; SQLITE_PRAGMAS overrides entries.
+# WAL lets readers run alongside the single writer, and busy_timeout makes a writer
+# wait for the lock instead of failing at once with "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,      # ms
+    'cache_size': -20000,      # KiB, i.e. ~20 MB of page cache per connection
+    'mmap_size': 268435456,    # 256 MB
+}
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a free connection.
+
+    Under gevent the pool's condition variable is cooperative, so a greenlet waiting
+    here parks instead of blocking the worker; the stats show when it happens.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._timing_lock = threading.Lock()
+        self._timing = {'checkouts': 0, 'waited': 0, 'timeouts': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0}
 
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            with self._timing_lock:
+                self._timing['timeouts'] += 1
+            raise
+        waited = time.perf_counter() - started
+        with self._timing_lock:
+            timing = self._timing
+            timing['checkouts'] += 1
+            timing['wait_seconds'] += waited
+            timing['max_wait_seconds'] = max(timing['max_wait_seconds'], waited)
+            if waited > 0.001:
+                timing['waited'] += 1
+        return conn
+
+    def recreate(self):
+        # keep the counters across pool recreation (e.g. after a disconnect)
+        pool = super().recreate()
+        pool._timing = self._timing
+        pool._timing_lock = self._timing_lock
+        return pool
+
+    def stats(self):
+        with self._timing_lock:
+            stats = dict(self._timing)
+        stats.update(size=self.size(), checked_out=self.checkedout(), overflow=self.overflow(),
+                     max_overflow=self._max_overflow, timeout=self._timeout)
+        stats['avg_wait_ms'] = stats['wait_seconds'] / (stats['checkouts'] or 1) * 1000
+        return stats
+
+
+def gevent_wait_callback(conn, timeout=None):
+    """psycopg2 wait callback that waits on the socket through gevent instead of blocking."""
+    from psycopg2 import extensions, OperationalError
+    from gevent.socket import wait_read, wait_write
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise OperationalError(f'bad result from poll: {state!r}')
+
+
+def make_psycopg_green():
+    """Install gevent_wait_callback for psycopg2 in a gevent-patched process; returns whether it is active."""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    if not monkey.is_module_patched('socket'):
+        return False
+    try:
+        from psycopg2 import extensions
+    except ImportError:
+        logger.warning('gevent worker without psycopg2: Postgres queries will block the worker')
+        return False
+    if extensions.get_wait_callback() is not gevent_wait_callback:
+        extensions.set_wait_callback(gevent_wait_callback)
+    return True
+
+
+def production_engine_options(config):
+    """Engine options sized to the worker's greenlet concurrency.
+
+    Each worker opens at most min(DB_GREENLET_CONCURRENCY, DB_MAX_CONNECTIONS_PER_WORKER)
+    connections: half kept in the pool, the rest as overflow. Greenlets beyond that
+    wait (cooperatively) up to DB_POOL_TIMEOUT seconds. Connections are pinged on
+    checkout and recycled after DB_POOL_RECYCLE seconds. Explicit
+    SQLALCHEMY_ENGINE_OPTIONS win over these.
+    """
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    options = {'pool_pre_ping': True, 'pool_recycle': config.get('DB_POOL_RECYCLE', DEFAULT_POOL_RECYCLE)}
+    # in-memory SQLite keeps its single shared connection
+    if not (url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')):
+        concurrency = config.get('DB_GREENLET_CONCURRENCY', DEFAULT_GREENLET_CONCURRENCY)
+        total = max(1, min(concurrency, config.get('DB_MAX_CONNECTIONS_PER_WORKER', DEFAULT_MAX_CONNECTIONS_PER_WORKER)))
+        pool_size = max(1, total // 2)
+        options.update(
+            poolclass=TimedQueuePool,
+            pool_size=pool_size,
+            max_overflow=total - pool_size,
+            pool_timeout=config.get('DB_POOL_TIMEOUT', DEFAULT_POOL_TIMEOUT),
+        )
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return options
+
+
+def sqlite_pragmas(config):
+    return dict(SQLITE_PRAGMAS, **(config.get('SQLITE_PRAGMAS') or {}))
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Run `PRAGMA name=value` for each entry on every new DBAPI connection of `engine`."""
+    statements = [f'PRAGMA {name}={value}' for name, value in pragmas.items()]
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
 
-db = SQLAlchemy()
 
 def get_migrate(app):
+    # Flask-Migrate pulls in Alembic; only the `flask db` commands need it
+    from flask_migrate import Migrate
     return Migrate(app, db)
 
+def stamp_head():
+    """Record the latest migration as applied; call after create_all built the head schema."""
+    from flask import current_app
+    from flask_migrate import stamp
+    if 'migrate' not in current_app.extensions:
+        get_migrate(current_app)
+    stamp()
+
 def create_db():
     db.create_all()
-    
+
 def init_db(app):
-    db.init_app(app)
\ No newline at end of file
+    """DB_ENGINE_MODE='production' applies production_engine_options, plus the green psycopg2
+    callback on Postgres or SQLITE_PRAGMAS on SQLite. SQLALCHEMY_REPLICA_URI adds the
+    replica bind used by replica_reads."""
+    production = app.config.get('DB_ENGINE_MODE') == 'production'
+    backend = make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name()
+    replica_uri = app.config.get('SQLALCHEMY_REPLICA_URI')
+    if production:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = production_engine_options(app.config)
+        if backend.startswith('postgres'):
+            make_psycopg_green()
+    if replica_uri:
+        app.config['SQLALCHEMY_BINDS'] = dict(app.config.get('SQLALCHEMY_BINDS') or {}, **{REPLICA_BIND: replica_uri})
+        init_read_routing(app)
+    db.init_app(app)
+    # the replica bind mirrors the primary; no models live on it, so create_all/drop_all skip it
+    db.metadatas.pop(REPLICA_BIND, None)
+    if production:
+        with app.app_context():
+            for engine in db.engines.values():
+                if engine.dialect.name == 'sqlite':
+                    apply_sqlite_pragmas(engine, sqlite_pragmas(app.config))
+
+
+def init_read_routing(app):
+    """Per-request read routing: `X-Read-From: primary|replica` overrides it, and a client
+    that just wrote is pinned to the primary for REPLICA_STICKY_SECONDS (read-your-writes)."""
+    sticky = app.config.get('REPLICA_STICKY_SECONDS', DEFAULT_REPLICA_STICKY_SECONDS)
+
+    @app.before_request
+    def _start_routing():
+        route = (request.headers.get(READ_FROM_HEADER) or '').lower()
+        if route not in ('primary', 'replica'):
+            route = 'primary' if request.cookies.get(READ_PRIMARY_COOKIE) else None
+        _route.set(route)
+        _wrote.set(False)
+
+    @app.after_request
+    def _stick_writers_to_primary(response):
+        if _wrote.get() and response.status_code < 400:
+            response.set_cookie(READ_PRIMARY_COOKIE, '1', max_age=sticky, httponly=True, samesite='Lax')
+        return response
+
+    @app.teardown_request
+    def _end_routing(exc):
+        _route.set(None)
+        _wrote.set(False)
+
+
+def pool_stats():
+    """Checkout wait-time stats for the current app's engine, or just its status if the pool is not timed."""
+    pool = db.engine.pool
+    if isinstance(pool, TimedQueuePool):
+        return pool.stats()
+    return {'status': pool.status()}
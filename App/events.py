@@ -0,0 +1,209 @@
+import json
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event, func, inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from App.database import db
+from App.models import Drive, Driver, StopRequest, TransportEvent
+from App.serializers import serialize
+
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_HEARTBEAT = 15.0
+DEFAULT_STREAM_TIMEOUT = 300.0
+DEFAULT_RETENTION = 10000
+RETRY_MS = 3000
+_FETCH_BATCH = 100
+_PRUNE_EVERY = 100
+
+_EVENTS = TransportEvent.__table__
+
+
+class EventBroker:
+    """Wakes this worker's SSE streams when new transport events may exist.
+
+    Events live in the transport_event table, so every worker process sees every
+    event. Streams in one worker share a single "latest id" probe per poll interval;
+    commits in this worker wake them immediately. Waiting uses threading.Condition,
+    which gunicorn's gevent worker monkey-patches into a cooperative primitive, so an
+    idle stream parks its greenlet instead of a thread.
+    """
+
+    def __init__(self, poll_interval=DEFAULT_POLL_INTERVAL, retention=DEFAULT_RETENTION):
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._cond = threading.Condition()
+        self._head = 0
+        self._polled_at = 0.0
+        self._commits = 0
+
+    def notify(self, engine):
+        """Called after a commit that recorded events."""
+        self._polled_at = 0.0
+        with self._cond:
+            self._cond.notify_all()
+        self._commits += 1
+        if self.retention and self._commits % _PRUNE_EVERY == 0:
+            prune_events(engine, self.retention)
+
+    def wait(self, engine, after_id, timeout):
+        """Block until an event newer than after_id may exist (True) or timeout passes (False)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            if self._head > after_id:
+                return True
+            now = time.monotonic()
+            if now - self._polled_at >= self.poll_interval:
+                self._polled_at = now
+                self._head = latest_event_id(engine)
+                continue
+            remaining = deadline - now
+            if remaining <= 0:
+                return False
+            with self._cond:
+                self._cond.wait(min(remaining, self.poll_interval - (now - self._polled_at)))
+
+
+_broker = EventBroker()
+_stream_settings = {'heartbeat': DEFAULT_HEARTBEAT, 'timeout': DEFAULT_STREAM_TIMEOUT}
+
+
+def init_events(app):
+    """Configure from EVENTS_POLL_INTERVAL / EVENTS_HEARTBEAT / EVENTS_STREAM_TIMEOUT (seconds) and EVENTS_RETENTION (rows)."""
+    global _broker
+    _broker = EventBroker(
+        app.config.get('EVENTS_POLL_INTERVAL', DEFAULT_POLL_INTERVAL),
+        app.config.get('EVENTS_RETENTION', DEFAULT_RETENTION)
+    )
+    _stream_settings['heartbeat'] = app.config.get('EVENTS_HEARTBEAT', DEFAULT_HEARTBEAT)
+    _stream_settings['timeout'] = app.config.get('EVENTS_STREAM_TIMEOUT', DEFAULT_STREAM_TIMEOUT)
+
+
+def latest_event_id(engine):
+    with engine.connect() as conn:
+        return conn.execute(db.select(func.max(_EVENTS.c.id))).scalar() or 0
+
+
+def prune_events(engine, retention):
+    """Drop all but the newest `retention` events."""
+    with engine.begin() as conn:
+        cutoff = conn.execute(db.select(func.max(_EVENTS.c.id))).scalar()
+        if cutoff is not None and cutoff > retention:
+            conn.execute(_EVENTS.delete().where(_EVENTS.c.id <= cutoff - retention))
+
+
+def _fetch_events(engine, after_id, limit=_FETCH_BATCH):
+    with engine.connect() as conn:
+        return conn.execute(
+            db.select(_EVENTS.c.id, _EVENTS.c.type, _EVENTS.c.payload)
+            .where(_EVENTS.c.id > after_id).order_by(_EVENTS.c.id).limit(limit)
+        ).all()
+
+
+def _oldest_event_id(engine):
+    with engine.connect() as conn:
+        return conn.execute(db.select(func.min(_EVENTS.c.id))).scalar()
+
+
+def _event_row(event_type, payload):
+    return {'type': event_type, 'payload': json.dumps(payload), 'created_at': datetime.utcnow()}
+
+
+def publish_many(event_type, payloads):
+    """Record events in the current session's transaction; they are streamed once it commits."""
+    if payloads:
+        db.session.execute(_EVENTS.insert(), [_event_row(event_type, p) for p in payloads])
+        db.session.info['transport_events'] = True
+
+
+def publish(event_type, payload):
+    publish_many(event_type, [payload])
+
+
+def _format(event_id, event_type, data):
+    return f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+
+
+def stream_events(engine, last_event_id=None, heartbeat=None, timeout=None):
+    """Yield SSE frames for events after last_event_id until `timeout` seconds pass.
+
+    A fresh client (no last_event_id) first gets a 'hello' carrying the current id, so
+    it can load a snapshot and then apply deltas. A client whose last id has already
+    been pruned gets 'resync' and should reload its snapshot.
+    """
+    heartbeat = _stream_settings['heartbeat'] if heartbeat is None else heartbeat
+    timeout = _stream_settings['timeout'] if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+
+    yield f"retry: {RETRY_MS}\n\n"
+    if last_event_id is None:
+        after = latest_event_id(engine)
+        yield _format(after, 'hello', json.dumps({'last_event_id': after}))
+    else:
+        after = last_event_id
+        oldest = _oldest_event_id(engine)
+        if oldest is not None and oldest > after + 1:
+            after = latest_event_id(engine)
+            yield _format(after, 'resync', json.dumps({'last_event_id': after}))
+
+    while True:
+        rows = _fetch_events(engine, after)
+        for row in rows:
+            yield _format(row.id, row.type, row.payload)
+            after = row.id
+        if len(rows) == _FETCH_BATCH:
+            continue
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if not _broker.wait(engine, after, min(heartbeat, remaining)):
+            yield ": keepalive\n\n"
+
+
+# ORM writes record their events in the same flush (and transaction) as the change.
+
+def _record(connection, target, event_type, payload):
+    connection.execute(_EVENTS.insert(), [_event_row(event_type, payload)])
+    session = sa_inspect(target).session
+    if session is not None:
+        session.info['transport_events'] = True
+
+
+def _changed(target, *keys):
+    state = sa_inspect(target)
+    return any(state.attrs[key].history.has_changes() for key in keys)
+
+
+@event.listens_for(Drive, 'after_insert')
+def _drive_created(mapper, connection, target):
+    _record(connection, target, 'drive.created', serialize(target))
+
+
+@event.listens_for(Drive, 'after_update')
+def _drive_updated(mapper, connection, target):
+    if _changed(target, 'datetime', 'current_location', 'driver_id', 'latitude', 'longitude'):
+        _record(connection, target, 'drive.updated', serialize(target))
+
+
+@event.listens_for(StopRequest, 'after_insert')
+def _stop_requested(mapper, connection, target):
+    _record(connection, target, 'stop.requested', serialize(target))
+
+
+@event.listens_for(Driver, 'after_update')
+def _driver_status_changed(mapper, connection, target):
+    if _changed(target, 'status'):
+        _record(connection, target, 'driver.status', {'id': target.id, 'status': target.status})
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_streams(session):
+    if session.info.pop('transport_events', False):
+        _broker.notify(session.get_bind())
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_flag(session):
+    session.info.pop('transport_events', None)
@@ -0,0 +1,117 @@
+"""Uniform lat/lon grid used to index drives and stop requests by position.
+
+Every located row stores the integer id of the GRID_CELL_DEG x GRID_CELL_DEG cell it
+falls in. A radius query turns into a handful of contiguous cell-id ranges (one per
+grid row), which an ordinary B-tree index answers on SQLite and Postgres alike; the
+exact haversine filter then runs over just those candidates.
+"""
+import math
+from functools import lru_cache
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG_LAT = 111.32
+GRID_CELL_DEG = 0.01
+GRID_ROWS = int(round(180 / GRID_CELL_DEG))
+GRID_COLS = int(round(360 / GRID_CELL_DEG))
+# Beyond this many grid rows a query scans by row range instead of per-row cell ranges
+MAX_ROW_RANGES = 64
+
+
+@lru_cache(maxsize=None)
+def numpy_or_none():
+    """NumPy, imported on first use (it vectorizes the distance math); None when not installed."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def validate_position(lat, lon):
+    """Return (lat, lon) as floats, raising ValueError when out of range."""
+    lat, lon = float(lat), float(lon)
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        raise ValueError(f'position out of range: {lat}, {lon}')
+    return lat, lon
+
+
+def _row(lat):
+    return min(int((lat + 90.0) / GRID_CELL_DEG), GRID_ROWS - 1)
+
+
+def _col(lon):
+    return math.floor((lon + 180.0) / GRID_CELL_DEG) % GRID_COLS
+
+
+def cell_for(lat, lon):
+    """Grid cell id for a position, or None if either coordinate is missing."""
+    if lat is None or lon is None:
+        return None
+    return _row(lat) * GRID_COLS + _col(lon)
+
+
+def candidate_cell_ranges(lat, lon, radius_km):
+    """Inclusive (first, last) cell-id ranges covering every point within radius_km of (lat, lon)."""
+    dlat = radius_km / KM_PER_DEG_LAT
+    lat_lo, lat_hi = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+    row_lo, row_hi = _row(lat_lo), _row(lat_hi)
+
+    # widest longitude span is at the row edge closest to a pole
+    widest = max(abs(lat_lo), abs(lat_hi))
+    cos_lat = math.cos(math.radians(widest))
+    if cos_lat < 1e-6 or radius_km / (KM_PER_DEG_LAT * cos_lat) >= 180.0:
+        col_spans = [(0, GRID_COLS - 1)]
+    else:
+        dlon = radius_km / (KM_PER_DEG_LAT * cos_lat)
+        col_lo, col_hi = _col(lon - dlon), _col(lon + dlon)
+        if col_lo <= col_hi:
+            col_spans = [(col_lo, col_hi)]
+        else:  # wraps the antimeridian
+            col_spans = [(col_lo, GRID_COLS - 1), (0, col_hi)]
+
+    if row_hi - row_lo + 1 > MAX_ROW_RANGES or col_spans == [(0, GRID_COLS - 1)]:
+        return [(row_lo * GRID_COLS, row_hi * GRID_COLS + GRID_COLS - 1)]
+    return [
+        (row * GRID_COLS + lo, row * GRID_COLS + hi)
+        for row in range(row_lo, row_hi + 1)
+        for lo, hi in col_spans
+    ]
+
+
+def _haversine_np(np, lat, lon, lats, lons):
+    phi1 = np.radians(lat)
+    phi2 = np.radians(lats)
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _haversine(lat, lon, plat, plon):
+    phi1, phi2 = math.radians(lat), math.radians(plat)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(plon - lon) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def distances_km(lat, lon, lats, lons):
+    """Haversine distance from (lat, lon) to each of lats/lons, as a list of floats."""
+    np = numpy_or_none()
+    if np is not None:
+        return _haversine_np(np, lat, lon, np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)).tolist()
+    return [_haversine(lat, lon, plat, plon) for plat, plon in zip(lats, lons)]
+
+
+def within_radius(lat, lon, radius_km, rows):
+    """Keep rows (with .latitude/.longitude) within radius_km, nearest first, as (distance_km, row)."""
+    if not rows:
+        return []
+    np = numpy_or_none()
+    if np is not None:
+        coords = np.array([(r.latitude, r.longitude) for r in rows], dtype=float)
+        dists = _haversine_np(np, lat, lon, coords[:, 0], coords[:, 1])
+        keep = np.flatnonzero(dists <= radius_km)
+        keep = keep[np.argsort(dists[keep], kind='stable')]
+        return [(float(dists[i]), rows[i]) for i in keep]
+    hits = [(_haversine(lat, lon, r.latitude, r.longitude), r) for r in rows]
+    hits = [hit for hit in hits if hit[0] <= radius_km]
+    hits.sort(key=lambda hit: hit[0])
+    return hits
@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import jsonify
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from App.database import db
+
+
+class HashingPoolBusy(Exception):
+    """Raised when the hashing queue is full; callers should answer 503 and let the client retry."""
+
+
+class HashingPool:
+    """Bounded pool of native threads for CPU-bound password hashing.
+
+    werkzeug's scrypt/pbkdf2 hashes run in C with the GIL released, so on real OS
+    threads they neither stall other greenlets (under gunicorn's gevent worker) nor
+    serialize behind each other. Under gevent the caller's greenlet yields while
+    it waits; otherwise the calling thread blocks on a future as usual.
+    """
+
+    def __init__(self, max_workers=None, max_queue=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue if max_queue is not None else self.max_workers * 16
+        self._lock = threading.Lock()
+        self._pool = None
+        self._gevent = False
+        self._in_flight = 0
+        self._stats = {
+            'submitted': 0, 'completed': 0, 'rejected': 0, 'errors': 0,
+            'max_in_flight': 0, 'wait_seconds': 0.0, 'run_seconds': 0.0,
+        }
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._gevent = _gevent_patched()
+            if self._gevent:
+                from gevent.threadpool import ThreadPool
+                self._pool = ThreadPool(self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix='hashing')
+        return self._pool
+
+    def run(self, fn, *args):
+        """Run fn(*args) on the pool and return its result, raising HashingPoolBusy when full."""
+        with self._lock:
+            if self._in_flight >= self.max_queue:
+                self._stats['rejected'] += 1
+                raise HashingPoolBusy(f'{self._in_flight} jobs already queued')
+            self._in_flight += 1
+            self._stats['submitted'] += 1
+            self._stats['max_in_flight'] = max(self._stats['max_in_flight'], self._in_flight)
+
+        queued_at = time.perf_counter()
+        timing = {}
+        def timed():
+            started = time.perf_counter()
+            timing['wait'] = started - queued_at
+            try:
+                return fn(*args)
+            finally:
+                timing['run'] = time.perf_counter() - started
+
+        pool = self._get_pool()
+        try:
+            if self._gevent:
+                return pool.spawn(timed).get()
+            return pool.submit(timed).result()
+        except Exception:
+            with self._lock:
+                self._stats['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._stats['completed'] += 1
+                self._stats['wait_seconds'] += timing.get('wait', 0.0)
+                self._stats['run_seconds'] += timing.get('run', 0.0)
+
+    def map(self, fn, items):
+        """fn(item) for each item, run concurrently on the pool; results in order.
+
+        For batch jobs such as the importer: it never raises HashingPoolBusy, and it
+        keeps at most max_workers items in flight.
+        """
+        items = list(items)
+        if not items:
+            return []
+        pool = self._get_pool()
+        with self._lock:
+            self._stats['submitted'] += len(items)
+        started = time.perf_counter()
+        try:
+            if self._gevent:
+                return list(pool.imap(fn, items))
+            return list(pool.map(fn, items))
+        finally:
+            with self._lock:
+                self._stats['completed'] += len(items)
+                self._stats['run_seconds'] += time.perf_counter() - started
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, in_flight=self._in_flight,
+                         max_workers=self.max_workers, max_queue=self.max_queue)
+        done = stats['completed'] or 1
+        stats['avg_wait_ms'] = stats['wait_seconds'] / done * 1000
+        stats['avg_run_ms'] = stats['run_seconds'] / done * 1000
+        return stats
+
+    def shutdown(self):
+        if self._pool is not None:
+            if self._gevent:
+                self._pool.kill()
+            else:
+                self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+def _gevent_patched():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+
+_pool = HashingPool()
+
+
+def init_hashing(app):
+    """Resize the process-wide pool from HASHING_POOL_SIZE / HASHING_QUEUE_LIMIT.
+
+    Any view that hashes (login, user/driver/resident creation, admin) answers a full
+    queue with 503 and Retry-After.
+    """
+    size = app.config.get('HASHING_POOL_SIZE')
+    limit = app.config.get('HASHING_QUEUE_LIMIT')
+    if size or limit is not None:
+        resize_pool(size, limit)
+    app.register_error_handler(HashingPoolBusy, _hashing_busy)
+
+
+def resize_pool(max_workers=None, max_queue=None):
+    """Replace the process-wide pool; None keeps HashingPool's defaults."""
+    global _pool
+    _pool.shutdown()
+    _pool = HashingPool(max_workers, max_queue)
+
+
+def _hashing_busy(error):
+    db.session.rollback()
+    return jsonify({'error': 'server busy, retry shortly'}), 503, {'Retry-After': '1'}
+
+
+def hash_password(password):
+    return _pool.run(generate_password_hash, password)
+
+
+def hash_passwords(passwords):
+    """Hash a batch of passwords in parallel on the pool (for bulk imports)."""
+    return _pool.map(generate_password_hash, passwords)
+
+
+def verify_password(password_hash, password):
+    return _pool.run(check_password_hash, password_hash, password)
+
+
+def offload(fn, *args):
+    """Run other short CPU-bound work (route optimization) on the same pool."""
+    return _pool.run(fn, *args)
+
+
+def hashing_stats():
+    return _pool.stats()
@@ -1,13 +1,15 @@
 import os
 from flask import Flask, render_template
-from flask_uploads import DOCUMENTS, IMAGES, TEXT, UploadSet, configure_uploads
-from flask_cors import CORS
 from werkzeug.utils import secure_filename
 from werkzeug.datastructures import  FileStorage
 
 
 from App.database import init_db
 from App.config import load_config
+from App.hashing import init_hashing
+from App.events import init_events
+from App.notifications import init_notifications
+from App.cache import init_cache
 
 
 from App.controllers import (
@@ -15,26 +17,59 @@ from App.controllers import (
     add_auth_context
 )
 
-from App.views import views, setup_admin
+from App.views import views
 
 def add_views(app):
     for view in views:
         app.register_blueprint(view)
 
-def create_app(overrides={}):
-    app = Flask(__name__, static_url_path='/static')
-    load_config(app, overrides)
+# Optional extensions; each one's package is imported only when it is enabled
+def init_cors(app):
+    from flask_cors import CORS
     CORS(app)
-    add_auth_context(app)
+
+def init_uploads(app):
+    from flask_uploads import DOCUMENTS, IMAGES, TEXT, UploadSet, configure_uploads
     photos = UploadSet('photos', TEXT + DOCUMENTS + IMAGES)
     configure_uploads(app, photos)
+
+def init_admin(app):
+    from App.views.admin import setup_admin
+    setup_admin(app)
+
+EXTENSIONS = {
+    'cors': init_cors,
+    'uploads': init_uploads,
+    'admin': init_admin,
+}
+
+def enabled_extensions(app, extensions=None):
+    """Names from `extensions`, else APP_EXTENSIONS (a list or comma-separated string), else all."""
+    if extensions is None:
+        extensions = app.config.get('APP_EXTENSIONS', tuple(EXTENSIONS))
+    if isinstance(extensions, str):
+        extensions = [name.strip() for name in extensions.split(',') if name.strip()]
+    unknown = set(extensions) - set(EXTENSIONS)
+    if unknown:
+        raise RuntimeError(f'unknown APP_EXTENSIONS {sorted(unknown)!r}')
+    return [name for name in EXTENSIONS if name in extensions]
+
+def create_app(overrides={}, extensions=None):
+    app = Flask(__name__, static_url_path='/static')
+    load_config(app, overrides)
+    init_hashing(app)
+    init_events(app)
+    init_notifications(app)
+    init_cache(app)
+    add_auth_context(app)
     add_views(app)
     init_db(app)
     jwt = setup_jwt(app)
-    setup_admin(app)
+    for name in enabled_extensions(app, extensions):
+        EXTENSIONS[name](app)
     @jwt.invalid_token_loader
     @jwt.unauthorized_loader
     def custom_unauthorized_response(error):
         return render_template('401.html', error=error), 401
     app.app_context().push()
-    return app
\ No newline at end of file
+    return app
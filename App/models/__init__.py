@@ -1,4 +1,9 @@
 from .user import *
 from .driver import *
 from .resident import *
-from .stoprequest import *
\ No newline at end of file
+from .stoprequest import *
+from .recurrence import *
+from .event import *
+from .notification import *
+from .street import *
+from .version import *
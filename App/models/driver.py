@@ -1,6 +1,7 @@
 
 from App.database import db
 from App.models.user import User
+from App.models.location import Located
 from datetime import datetime, timezone
 
 class Driver(User):
@@ -11,6 +12,9 @@ class Driver(User):
     # one-to-many: Driver -> Drive
     schedule = db.relationship('Drive', back_populates='driver', cascade='all, delete-orphan')
 
+    # one-to-many: Driver -> DriveRecurrence (expanded on demand, see get_driver_schedule)
+    recurrences = db.relationship('DriveRecurrence', back_populates='driver', cascade='all, delete-orphan')
+
     __mapper_args__ = {
         'polymorphic_identity': 'driver',
     }
@@ -19,7 +23,7 @@ class Driver(User):
         super().__init__(username, password)
         self.status = status
 
-    def add_drive(self, when=None, current_location=None):
+    def add_drive(self, when=None, current_location=None, latitude=None, longitude=None):
         """Create a Drive for this driver and persist it."""
         #when = when or datetime.utcnow()
         
@@ -32,14 +36,26 @@ class Driver(User):
         #####################
         
         drive = Drive(datetime=when, current_location=current_location, driver=self)
+        drive.set_position(latitude, longitude)
         db.session.add(drive)
         db.session.commit()
         return drive
 
+    def add_recurrence(self, weekdays, at, current_location=None, starts_on=None, ends_on=None):
+        """Create a repeating drive (e.g. weekdays at 08:00) without materializing any Drive rows."""
+        from App.models.recurrence import DriveRecurrence
+        if isinstance(at, str):
+            at = datetime.strptime(at, "%H:%M").time()
+        rule = DriveRecurrence(self, weekdays, at, current_location=current_location,
+                               starts_on=starts_on, ends_on=ends_on)
+        db.session.add(rule)
+        db.session.commit()
+        return rule
+
     def __repr__(self):
         return f"<Driver id={self.id} username={self.username} status={self.status}>"
 
-class Drive(db.Model):
+class Drive(Located, db.Model):
     __tablename__ = 'drive'
     id = db.Column(db.Integer, primary_key=True)
     datetime = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -48,8 +64,24 @@ class Drive(db.Model):
     driver_id = db.Column(db.Integer, db.ForeignKey('driver.id'))
     driver = db.relationship('Driver', back_populates='schedule')
 
-    # one-to-many: Drive -> StopRequest
-    stops = db.relationship('StopRequest', back_populates='drive', cascade='all, delete-orphan')
+    # set when this row materializes one occurrence of a DriveRecurrence; `occurrence`
+    # keeps the scheduled time even if the drive itself is later moved
+    recurrence_id = db.Column(db.Integer, db.ForeignKey('drive_recurrence.id'), nullable=True)
+    occurrence = db.Column(db.DateTime, nullable=True)
+
+    # one-to-many: Drive -> StopRequest, in visiting order (unsequenced stops last)
+    stops = db.relationship(
+        'StopRequest', back_populates='drive', cascade='all, delete-orphan',
+        order_by='(StopRequest.sequence.is_(None), StopRequest.sequence, StopRequest.id)'
+    )
+    notifications = db.relationship('Notification', back_populates='drive')
+
+    # index for driver schedule lookups ordered by time
+    __table_args__ = (
+        db.Index('ix_drive_driver_id_datetime', 'driver_id', 'datetime'),
+        # at most one materialized row per occurrence
+        db.UniqueConstraint('recurrence_id', 'occurrence', name='uq_drive_recurrence_id_occurrence'),
+    )
 
     def __init__(self, datetime, current_location, driver):
         self.driver = driver
@@ -0,0 +1,14 @@
+from App.database import db
+from datetime import datetime
+
+class TransportEvent(db.Model):
+    """One change pushed to live transport clients; the id doubles as the SSE event id."""
+    __tablename__ = 'transport_event'
+    id = db.Column(db.Integer, primary_key=True)
+    type = db.Column(db.String(40), nullable=False)
+    # JSON-encoded payload, written once and streamed verbatim
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<TransportEvent id={self.id} type={self.type}>"
@@ -0,0 +1,30 @@
+from sqlalchemy import event
+
+from App.database import db
+from App.geo import cell_for, validate_position
+
+class Located:
+    """Optional lat/lon for a row, indexed through its App.geo grid cell."""
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    grid_cell = db.Column(db.BigInteger, nullable=True, index=True)
+
+    def set_position(self, latitude, longitude):
+        """Set or (with None, None) clear the position; raises ValueError when out of range."""
+        if latitude is None and longitude is None:
+            self.latitude = self.longitude = None
+        else:
+            self.latitude, self.longitude = validate_position(latitude, longitude)
+
+    @property
+    def position(self):
+        if self.latitude is None or self.longitude is None:
+            return None
+        return {'lat': self.latitude, 'lon': self.longitude}
+
+
+# Keep grid_cell in step with lat/lon on every ORM write.
+@event.listens_for(Located, 'before_insert', propagate=True)
+@event.listens_for(Located, 'before_update', propagate=True)
+def _assign_grid_cell(mapper, connection, target):
+    target.grid_cell = cell_for(target.latitude, target.longitude)
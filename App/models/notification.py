@@ -0,0 +1,24 @@
+from App.database import db
+from datetime import datetime
+
+class Notification(db.Model):
+    """A message in a resident's inbox, e.g. that a drive they requested a stop on changed."""
+    __tablename__ = 'notification'
+    id = db.Column(db.Integer, primary_key=True)
+    resident_id = db.Column(db.Integer, db.ForeignKey('resident.id'), nullable=False)
+    resident = db.relationship('Resident', back_populates='notifications')
+
+    # nulled (not deleted) if the drive goes away
+    drive_id = db.Column(db.Integer, db.ForeignKey('drive.id'), nullable=True)
+    drive = db.relationship('Drive', back_populates='notifications')
+    kind = db.Column(db.String(40), nullable=False)
+    message = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    read_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_notification_resident_id_id', 'resident_id', 'id'),
+    )
+
+    def __repr__(self):
+        return f"<Notification id={self.id} resident_id={self.resident_id} kind={self.kind}>"
@@ -0,0 +1,134 @@
+from datetime import date, datetime, timedelta
+
+from App.database import db
+
+WEEKDAY_NAMES = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+
+def weekday_mask(days):
+    """Bitmask (Monday = bit 0) from 0-6 ints, day names, or 'weekdays' / 'daily'."""
+    if isinstance(days, int):
+        return days & 0x7F
+    if isinstance(days, str):
+        days = days.strip().lower()
+        if days == 'weekdays':
+            return 0x1F
+        if days == 'daily':
+            return 0x7F
+        days = [d.strip() for d in days.split(',') if d.strip()]
+    mask = 0
+    for day in days:
+        if isinstance(day, str) and not day.isdigit():
+            index = WEEKDAY_NAMES.index(day[:3].lower())
+        else:
+            index = int(day)
+            if not 0 <= index < 7:
+                raise ValueError(f'weekday out of range: {day}')
+        mask |= 1 << index
+    return mask
+
+
+def occurrence_key(recurrence_id, when):
+    """Stable reference for one occurrence of a rule, e.g. 'r3-20261019T0800'."""
+    return f"r{recurrence_id}-{when:%Y%m%dT%H%M}"
+
+
+def parse_occurrence_key(key):
+    """Return (recurrence_id, datetime) for an occurrence key, or None if `key` is not one."""
+    if not isinstance(key, str) or not key.startswith('r') or '-' not in key:
+        return None
+    rid, _, stamp = key[1:].partition('-')
+    try:
+        return int(rid), datetime.strptime(stamp, '%Y%m%dT%H%M')
+    except ValueError:
+        return None
+
+
+class DriveRecurrence(db.Model):
+    """A driver's repeating route: same time and start location on a set of weekdays.
+
+    Occurrences are expanded on demand for a requested window; a concrete Drive row
+    (linked back through Drive.recurrence_id) exists only once something targets it.
+    """
+    __tablename__ = 'drive_recurrence'
+    id = db.Column(db.Integer, primary_key=True)
+
+    driver_id = db.Column(db.Integer, db.ForeignKey('driver.id'), nullable=False, index=True)
+    driver = db.relationship('Driver', back_populates='recurrences')
+
+    weekdays = db.Column(db.Integer, nullable=False)
+    time_of_day = db.Column(db.Time, nullable=False)
+    current_location = db.Column(db.String(120), nullable=True)
+    starts_on = db.Column(db.Date, nullable=False)
+    ends_on = db.Column(db.Date, nullable=True)
+
+    def __init__(self, driver, weekdays, time_of_day, current_location=None, starts_on=None, ends_on=None):
+        self.driver = driver
+        self.weekdays = weekday_mask(weekdays)
+        self.time_of_day = time_of_day
+        self.current_location = current_location
+        self.starts_on = starts_on or date.today()
+        self.ends_on = ends_on
+
+    def occurrences(self, start, end):
+        """Yield the datetimes of this rule falling in [start, end)."""
+        first = max(start.date(), self.starts_on)
+        last = end.date() if self.ends_on is None else min(end.date(), self.ends_on)
+        day = first
+        while day <= last:
+            if self.weekdays & (1 << day.weekday()):
+                when = datetime.combine(day, self.time_of_day)
+                if start <= when < end:
+                    yield when
+            day += timedelta(days=1)
+
+    def occurs_at(self, when):
+        return (
+            when.time() == self.time_of_day
+            and bool(self.weekdays & (1 << when.weekday()))
+            and self.starts_on <= when.date()
+            and (self.ends_on is None or when.date() <= self.ends_on)
+        )
+
+    def get_json(self):
+        return {
+            'id': self.id,
+            'driver_id': self.driver_id,
+            'weekdays': [WEEKDAY_NAMES[i] for i in range(7) if self.weekdays & (1 << i)],
+            'time_of_day': self.time_of_day.strftime('%H:%M'),
+            'current_location': self.current_location,
+            'starts_on': self.starts_on.isoformat(),
+            'ends_on': self.ends_on.isoformat() if self.ends_on else None
+        }
+
+    def __repr__(self):
+        return f"<DriveRecurrence id={self.id} driver_id={self.driver_id} weekdays={self.weekdays:07b} at={self.time_of_day}>"
+
+
+class DriveOccurrence:
+    """A not-yet-materialized occurrence of a DriveRecurrence, shaped like a Drive."""
+
+    __slots__ = ('key', 'recurrence_id', 'driver_id', 'datetime', 'current_location')
+
+    id = None
+    stops = ()
+
+    def __init__(self, recurrence, when):
+        self.key = occurrence_key(recurrence.id, when)
+        self.recurrence_id = recurrence.id
+        self.driver_id = recurrence.driver_id
+        self.datetime = when
+        self.current_location = recurrence.current_location
+
+    def get_json(self):
+        return {
+            'id': None,
+            'key': self.key,
+            'recurrence_id': self.recurrence_id,
+            'driver_id': self.driver_id,
+            'datetime': self.datetime.isoformat(),
+            'current_location': self.current_location
+        }
+
+    def __repr__(self):
+        return f"<DriveOccurrence key={self.key} driver_id={self.driver_id} current_location={self.current_location}>"
@@ -9,6 +9,7 @@ class Resident(User):
     name = db.Column(db.String(80), nullable=True)
     street = db.Column(db.String(120), nullable=True)
     stop_requests = db.relationship('StopRequest', back_populates='requestee', cascade='all, delete-orphan')
+    notifications = db.relationship('Notification', back_populates='resident', cascade='all, delete-orphan')
 
     __mapper_args__ = {
         'polymorphic_identity': 'resident',
@@ -20,11 +21,13 @@ class Resident(User):
         self.street = street
 
     def view_inbox(self, street=None):
-        if street is None:
-            return list(self.stop_requests)
-        return [sr for sr in self.stop_requests if sr.street_name == str(street)]
+        stmt = db.select(StopRequest).where(StopRequest.requestee_id == self.id)
+        if street is not None:
+            stmt = stmt.where(StopRequest.street_name == str(street))
+        stmt = stmt.order_by(StopRequest.created_at.desc(), StopRequest.id.desc())
+        return list(db.session.scalars(stmt))
 
-    def create_stop_request(self, drive, street=None):
+    def create_stop_request(self, drive, street=None, latitude=None, longitude=None):
         from App.database import db as _db
         from App.models.driver import Drive as DriveModel
         street_name = str(street) if street is not None else self.street
@@ -38,6 +41,7 @@ class Resident(User):
         if not drive_obj:
             raise ValueError('Drive not found')
         sr = StopRequest(drive=drive_obj, street_name=street_name, requestee=self)
+        sr.set_position(latitude, longitude)
         _db.session.add(sr)
         _db.session.commit()
         return sr
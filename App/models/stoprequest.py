@@ -1,7 +1,8 @@
 from App.database import db
+from App.models.location import Located
 from datetime import datetime
 
-class StopRequest(db.Model):
+class StopRequest(Located, db.Model):
     __tablename__ = 'stop_request'
     id = db.Column(db.Integer, primary_key=True)
 
@@ -16,6 +17,16 @@ class StopRequest(db.Model):
 
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
+    # visiting order within the drive, set by optimize_drive; None until optimized
+    sequence = db.Column(db.Integer, nullable=True)
+
+    # indexes for the inbox (requestee), per-drive stop and street lookups
+    __table_args__ = (
+        db.Index('ix_stop_request_requestee_id_created_at', 'requestee_id', 'created_at'),
+        db.Index('ix_stop_request_drive_id', 'drive_id'),
+        db.Index('ix_stop_request_street_name_created_at', 'street_name', 'created_at'),
+    )
+
     def __init__(self, drive, street_name, requestee):
         self.drive = drive
         self.street_name = street_name
@@ -0,0 +1,19 @@
+from App.database import db
+
+class StreetLocation(db.Model):
+    """Local geocoding table: one representative position per street name."""
+    __tablename__ = 'street_location'
+    name = db.Column(db.String(120), primary_key=True)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+
+    def __init__(self, name, latitude, longitude):
+        self.name = name
+        self.latitude = latitude
+        self.longitude = longitude
+
+    def get_json(self):
+        return {'name': self.name, 'lat': self.latitude, 'lon': self.longitude}
+
+    def __repr__(self):
+        return f"<StreetLocation name={self.name} lat={self.latitude} lon={self.longitude}>"
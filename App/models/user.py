@@ -1,10 +1,17 @@
-from werkzeug.security import check_password_hash, generate_password_hash
 from App.database import db
+from App.hashing import hash_password, verify_password
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username =  db.Column(db.String(20), nullable=False, unique=True)
     password = db.Column(db.String(120), nullable=False)
+    # discriminator so one query can load the concrete Driver/Resident subclass
+    role = db.Column(db.String(20), nullable=False, default='user', server_default='user')
+
+    __mapper_args__ = {
+        'polymorphic_on': role,
+        'polymorphic_identity': 'user',
+    }
 
     def __init__(self, username, password):
         self.username = username
@@ -17,10 +24,10 @@ class User(db.Model):
         }
 
     def set_password(self, password):
-        """Create hashed password."""
-        self.password = generate_password_hash(password)
+        """Create hashed password (on the bounded hashing pool)."""
+        self.password = hash_password(password)
     
     def check_password(self, password):
-        """Check hashed password."""
-        return check_password_hash(self.password, password)
+        """Check hashed password (on the bounded hashing pool)."""
+        return verify_password(self.password, password)
 
@@ -0,0 +1,10 @@
+from App.database import db
+
+class TableVersion(db.Model):
+    """Write counter for one table, bumped in the same transaction as every change to it."""
+    __tablename__ = 'table_version'
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<TableVersion name={self.name} version={self.version}>"
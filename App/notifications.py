@@ -0,0 +1,89 @@
+import logging
+import queue
+import threading
+
+from App.controllers.notification import fan_out_drive_update
+
+logger = logging.getLogger(__name__)
+
+
+class FanOutDispatcher:
+    """Runs fan-out jobs on one background worker so the triggering request returns at once.
+
+    The worker is a threading.Thread, i.e. a greenlet under gunicorn's gevent worker,
+    and runs each job in its own app context (and so its own database session). Jobs
+    run one at a time in submission order.
+    """
+
+    def __init__(self, app=None, asynchronous=True):
+        self.app = app
+        self.asynchronous = asynchronous
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._stats = {'submitted': 0, 'completed': 0, 'errors': 0}
+
+    def submit(self, fn, *args):
+        with self._lock:
+            self._stats['submitted'] += 1
+        if not self.asynchronous:
+            self._run_job(fn, args)
+            return
+        self._ensure_worker()
+        self._queue.put((fn, args))
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._drain, name='fan-out', daemon=True)
+                self._worker.start()
+
+    def _drain(self):
+        while True:
+            fn, args = self._queue.get()
+            try:
+                self._run_job(fn, args)
+            finally:
+                self._queue.task_done()
+
+    def _run_job(self, fn, args):
+        try:
+            with self.app.app_context():
+                fn(*args)
+        except Exception:
+            logger.exception('fan-out job %s failed', getattr(fn, '__name__', fn))
+            with self._lock:
+                self._stats['errors'] += 1
+        finally:
+            with self._lock:
+                self._stats['completed'] += 1
+
+    def join(self):
+        """Block until every submitted job has run (tests, CLI, shutdown)."""
+        self._queue.join()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, queued=self._queue.qsize())
+
+
+_dispatcher = FanOutDispatcher()
+
+
+def init_notifications(app):
+    """Bind the dispatcher to `app`; NOTIFICATIONS_ASYNC=False runs fan-out inline."""
+    global _dispatcher
+    _dispatcher = FanOutDispatcher(app, app.config.get('NOTIFICATIONS_ASYNC', True))
+
+
+def notify_drive_update(drive_id, changes):
+    """Queue notifications for residents with stops on `drive_id`. Call after the update commits."""
+    _dispatcher.submit(fan_out_drive_update, drive_id, changes)
+
+
+def wait_for_notifications():
+    _dispatcher.join()
+
+
+def notification_stats():
+    return _dispatcher.stats()
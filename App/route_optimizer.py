@@ -0,0 +1,132 @@
+"""Visiting order for a drive's stops: nearest neighbour, then 2-opt within a time budget.
+
+The route is an open path from a fixed first point (the drive's start, or its first
+stop) through every stop. Distances are great-circle kilometres from App.geo.
+"""
+import math
+import time
+
+from App.geo import EARTH_RADIUS_KM, numpy_or_none
+
+DEFAULT_TIME_BUDGET = 0.2
+
+
+def distance_matrix(lats, lons):
+    """Pairwise haversine distances in km (an n x n ndarray, or list of lists without NumPy)."""
+    np = numpy_or_none()
+    if np is not None:
+        phi = np.radians(np.asarray(lats, dtype=float))
+        lmb = np.radians(np.asarray(lons, dtype=float))
+        dphi = phi[:, None] - phi[None, :]
+        dlmb = lmb[:, None] - lmb[None, :]
+        a = np.sin(dphi / 2) ** 2 + np.cos(phi)[:, None] * np.cos(phi)[None, :] * np.sin(dlmb / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    phi = [math.radians(v) for v in lats]
+    lmb = [math.radians(v) for v in lons]
+    n = len(phi)
+    return [
+        [2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0,
+            math.sin((phi[i] - phi[j]) / 2) ** 2
+            + math.cos(phi[i]) * math.cos(phi[j]) * math.sin((lmb[i] - lmb[j]) / 2) ** 2)))
+         for j in range(n)]
+        for i in range(n)
+    ]
+
+
+def path_length(dist, order):
+    return float(sum(dist[order[k]][order[k + 1]] for k in range(len(order) - 1)))
+
+
+def nearest_neighbour(dist, start=0):
+    """Greedy path from `start`, always moving to the closest unvisited point."""
+    n = len(dist)
+    np = numpy_or_none()
+    if np is not None:
+        visited = np.zeros(n, dtype=bool)
+        order = [start]
+        visited[start] = True
+        for _ in range(n - 1):
+            row = np.where(visited, np.inf, dist[order[-1]])
+            nxt = int(np.argmin(row))
+            visited[nxt] = True
+            order.append(nxt)
+        return order
+    remaining = set(range(n)) - {start}
+    order = [start]
+    while remaining:
+        last = dist[order[-1]]
+        nxt = min(remaining, key=last.__getitem__)
+        remaining.remove(nxt)
+        order.append(nxt)
+    return order
+
+
+def two_opt(dist, order, deadline):
+    """Improve an open path (first point fixed) by segment reversals until none helps or time runs out.
+
+    For each i the best j is picked from one vectorized delta over all candidates.
+    Returns (order, passes, completed) where completed is False if the deadline hit.
+    """
+    order = list(order)
+    n = len(order)
+    passes = 0
+    if n < 4:
+        return order, passes, True
+    np = numpy_or_none()
+    if np is not None:
+        tour = np.asarray(order)
+        while True:
+            passes += 1
+            improved = False
+            for i in range(1, n - 1):
+                if time.perf_counter() > deadline:
+                    return tour.tolist(), passes, False
+                a, b = tour[i - 1], tour[i]
+                c = tour[i + 1:]
+                delta = dist[a, c] - dist[a, b]
+                e = tour[i + 2:]
+                delta[:-1] += dist[b, e] - dist[c[:-1], e]
+                j = int(np.argmin(delta))
+                if delta[j] < -1e-9:
+                    tour[i:i + j + 2] = tour[i:i + j + 2][::-1].copy()
+                    improved = True
+            if not improved:
+                return tour.tolist(), passes, True
+    while True:
+        passes += 1
+        improved = False
+        for i in range(1, n - 1):
+            if time.perf_counter() > deadline:
+                return order, passes, False
+            a, b = order[i - 1], order[i]
+            best, best_j = -1e-9, None
+            for j in range(i + 1, n):
+                c = order[j]
+                delta = dist[a][c] - dist[a][b]
+                if j + 1 < n:
+                    e = order[j + 1]
+                    delta += dist[b][e] - dist[c][e]
+                if delta < best:
+                    best, best_j = delta, j
+            if best_j is not None:
+                order[i:best_j + 1] = reversed(order[i:best_j + 1])
+                improved = True
+        if not improved:
+            return order, passes, True
+
+
+def optimize_path(lats, lons, time_budget=DEFAULT_TIME_BUDGET):
+    """Order points 1..n-1 after the fixed point 0. Returns (order, stats); order excludes point 0."""
+    started = time.perf_counter()
+    if len(lats) <= 1:
+        return [], {'length_km': 0.0, 'greedy_km': 0.0, 'passes': 0, 'completed': True, 'elapsed_ms': 0.0}
+    dist = distance_matrix(lats, lons)
+    greedy = nearest_neighbour(dist, 0)
+    order, passes, completed = two_opt(dist, greedy, started + time_budget)
+    return order[1:], {
+        'length_km': round(path_length(dist, order), 3),
+        'greedy_km': round(path_length(dist, greedy), 3),
+        'passes': passes,
+        'completed': completed,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
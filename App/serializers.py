@@ -0,0 +1,87 @@
+from datetime import date, datetime
+from operator import attrgetter
+
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.exc import NoInspectionAvailable
+
+# Columns that must never leave the server, whatever model they appear on.
+EXCLUDED_FIELDS = frozenset({'password'})
+
+_registry = {}
+
+
+def _compile(cls, include):
+    """Build a serializer for one mapped class from its column list, computed once."""
+    mapper = sa_inspect(cls)
+    plain, temporal = [], []
+    for attr in mapper.column_attrs:
+        if attr.key in EXCLUDED_FIELDS:
+            continue
+        python_type = None
+        try:
+            python_type = attr.columns[0].type.python_type
+        except NotImplementedError:
+            pass
+        if python_type in (datetime, date):
+            temporal.append(attr.key)
+        else:
+            plain.append(attr.key)
+
+    nested = []
+    for name in include:
+        rel = mapper.relationships[name]  # KeyError for anything not explicitly mapped
+        nested.append((name, rel.uselist))
+
+    plain_keys = tuple(plain)
+    get_plain = attrgetter(*plain_keys) if len(plain_keys) > 1 else None
+
+    def serialize_instance(obj):
+        if get_plain is not None:
+            out = dict(zip(plain_keys, get_plain(obj)))
+        else:
+            out = {k: getattr(obj, k) for k in plain_keys}
+        for key in temporal:
+            value = getattr(obj, key)
+            out[key] = value.isoformat() if value is not None else None
+        for name, uselist in nested:
+            value = getattr(obj, name)
+            if uselist:
+                out[name] = [serialize(v) for v in value]
+            else:
+                out[name] = serialize(value)
+        return out
+
+    return serialize_instance
+
+
+def serializer_for(cls, include=()):
+    """Return the cached serializer for `cls`; relationships are only emitted if named in `include`."""
+    key = (cls, tuple(include))
+    fn = _registry.get(key)
+    if fn is None:
+        fn = _registry[key] = _compile(cls, key[1])
+    return fn
+
+
+def serialize(obj, include=()):
+    """Convert models, lists and dicts into JSON-ready values."""
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, dict):
+        return {k: serialize(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, set)):
+        return [serialize(v, include) for v in obj]
+    cls = type(obj)
+    fn = _registry.get((cls, tuple(include)))
+    if fn is not None:
+        return fn(obj)
+    try:
+        return serializer_for(cls, include)(obj)
+    except NoInspectionAvailable:
+        pass
+    get_json = getattr(obj, 'get_json', None)
+    if callable(get_json):
+        return get_json()
+    return str(obj)
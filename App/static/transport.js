@@ -14,73 +14,109 @@ document.addEventListener('DOMContentLoaded', function() {
     output.textContent = `[${ts}] ${txt}\n` + output.textContent;
   }
 
-  // Fetch full snapshot (drivers, residents, drives, stop_requests) and populate all selects/tables
+  // Last snapshot (drivers, residents, drives, stop_requests), kept current by live events
+  let state = { drivers: [], residents: [], drives: [], stop_requests: [] };
+
+  // Fetch full snapshot and populate all selects/tables
   async function refreshAll() {
     try {
       const res = await fetch('/api/transport/list-all');
-      const data = await res.json();
-
-      // drivers
-      selectDriver.innerHTML = '<option value="" disabled selected>Choose driver</option>';
-      (data.drivers || []).forEach(d => {
-        const opt = document.createElement('option');
-        opt.value = d.id;
-        opt.text = `#${d.id} - ${d.status || ''}`;
-        selectDriver.appendChild(opt);
-      });
+      state = await res.json();
+      render();
+      appendOutput('Refreshed options and lists');
+    } catch (e) {
+      appendOutput('Failed to refresh data: ' + e.message);
+    }
+  }
 
-      // residents
-      selectResident.innerHTML = '<option value="" disabled selected>Choose resident</option>';
-      (data.residents || []).forEach(r => {
-        const opt = document.createElement('option');
-        opt.value = r.id;
-        opt.text = `#${r.id} - ${r.name || ''} ${r.street ? '('+r.street+')' : ''}`;
-        selectResident.appendChild(opt);
-      });
+  function render() {
+    const data = state;
 
-      // drives
-      selectDrive.innerHTML = '<option value="" disabled selected>Choose drive</option>';
-      tableDrives.innerHTML = '';
-      (data.drives || []).forEach(dr => {
-        const opt = document.createElement('option');
-        opt.value = dr.id;
-        opt.text = `#${dr.id} - ${dr.datetime || ''}`;
-        selectDrive.appendChild(opt);
-
-        const tr = document.createElement('tr');
-        tr.innerHTML = `<td>${dr.id}</td><td>${dr.datetime}</td><td>${dr.driver_id}</td><td>${dr.current_location || ''}</td>`;
-        tableDrives.appendChild(tr);
-      });
+    // drivers
+    selectDriver.innerHTML = '<option value="" disabled selected>Choose driver</option>';
+    (data.drivers || []).forEach(d => {
+      const opt = document.createElement('option');
+      opt.value = d.id;
+      opt.text = `#${d.id} - ${d.status || ''}`;
+      selectDriver.appendChild(opt);
+    });
 
-      // streets: collect unique streets from residents and stop_requests
-      const streets = new Set();
-      (data.residents || []).forEach(r => { if (r.street) streets.add(r.street); });
-      (data.stop_requests || []).forEach(s => { if (s.street_name) streets.add(s.street_name); });
-      selectStreet.innerHTML = '<option value="" disabled selected>Choose street</option>';
-      Array.from(streets).forEach(s => {
-        const opt = document.createElement('option');
-        opt.value = s;
-        opt.text = s;
-        selectStreet.appendChild(opt);
-      });
+    // residents
+    selectResident.innerHTML = '<option value="" disabled selected>Choose resident</option>';
+    (data.residents || []).forEach(r => {
+      const opt = document.createElement('option');
+      opt.value = r.id;
+      opt.text = `#${r.id} - ${r.name || ''} ${r.street ? '('+r.street+')' : ''}`;
+      selectResident.appendChild(opt);
+    });
 
-      // All Data table (compact JSON rows)
-      tableAll.innerHTML = '';
-      Object.entries(data).forEach(([key, arr]) => {
-        const tr = document.createElement('tr');
-        const tdType = document.createElement('td');
-        tdType.textContent = key;
-        const tdData = document.createElement('td');
-        tdData.textContent = JSON.stringify(arr, null, 2);
-        tr.appendChild(tdType);
-        tr.appendChild(tdData);
-        tableAll.appendChild(tr);
-      });
+    // drives
+    selectDrive.innerHTML = '<option value="" disabled selected>Choose drive</option>';
+    tableDrives.innerHTML = '';
+    (data.drives || []).forEach(dr => {
+      const opt = document.createElement('option');
+      opt.value = dr.id;
+      opt.text = `#${dr.id} - ${dr.datetime || ''}`;
+      selectDrive.appendChild(opt);
 
-      appendOutput('Refreshed options and lists');
-    } catch (e) {
-      appendOutput('Failed to refresh data: ' + e.message);
+      const tr = document.createElement('tr');
+      tr.innerHTML = `<td>${dr.id}</td><td>${dr.datetime}</td><td>${dr.driver_id}</td><td>${dr.current_location || ''}</td>`;
+      tableDrives.appendChild(tr);
+    });
+
+    // streets: collect unique streets from residents and stop_requests
+    const streets = new Set();
+    (data.residents || []).forEach(r => { if (r.street) streets.add(r.street); });
+    (data.stop_requests || []).forEach(s => { if (s.street_name) streets.add(s.street_name); });
+    selectStreet.innerHTML = '<option value="" disabled selected>Choose street</option>';
+    Array.from(streets).forEach(s => {
+      const opt = document.createElement('option');
+      opt.value = s;
+      opt.text = s;
+      selectStreet.appendChild(opt);
+    });
+
+    // All Data table (compact JSON rows)
+    tableAll.innerHTML = '';
+    Object.entries(data).forEach(([key, arr]) => {
+      const tr = document.createElement('tr');
+      const tdType = document.createElement('td');
+      tdType.textContent = key;
+      const tdData = document.createElement('td');
+      tdData.textContent = JSON.stringify(arr, null, 2);
+      tr.appendChild(tdType);
+      tr.appendChild(tdData);
+      tableAll.appendChild(tr);
+    });
+  }
+
+  function upsert(list, item) {
+    const existing = list.find(x => x.id === item.id);
+    if (existing) Object.assign(existing, item);
+    else list.push(item);
+  }
+
+  // Apply one delta from /api/transport/events to the snapshot and re-render
+  function applyEvent(type, payload) {
+    if (type === 'drive.created' || type === 'drive.updated') {
+      upsert(state.drives, {
+        id: payload.id,
+        datetime: payload.datetime,
+        driver_id: payload.driver_id,
+        current_location: payload.current_location
+      });
+    } else if (type === 'stop.requested') {
+      upsert(state.stop_requests, payload);
+      const drive = state.drives.find(d => d.id === payload.drive_id);
+      if (drive) {
+        drive.stops = drive.stops || [];
+        if (!drive.stops.includes(payload.id)) drive.stops.push(payload.id);
+      }
+    } else if (type === 'driver.status') {
+      upsert(state.drivers, payload);
     }
+    render();
+    appendOutput(`Live ${type}: #${payload.id}`);
   }
 
   async function createResident() {
@@ -123,7 +159,6 @@ document.addEventListener('DOMContentLoaded', function() {
     const data = await res.json();
     if (res.ok) {
       appendOutput('Created drive: ' + JSON.stringify(data));
-      await refreshAll();
     } else {
       appendOutput('Failed to create drive: ' + JSON.stringify(data));
     }
@@ -142,7 +177,6 @@ document.addEventListener('DOMContentLoaded', function() {
     const data = await res.json();
     if (res.ok) {
       appendOutput('Created stop: ' + JSON.stringify(data));
-      await refreshAll();
     } else {
       appendOutput('Failed to create stop: ' + JSON.stringify(data));
     }
@@ -198,11 +232,10 @@ document.addEventListener('DOMContentLoaded', function() {
       if (modalInstance) modalInstance.close();
       else editDriveModal.style.display = 'none';
       await showSchedule();
-      await refreshAll();
     } else {
       appendOutput('Failed to update drive: ' + JSON.stringify(data));
     }
-  }
+  });
 
   async function showInbox() {
     const resident_id = parseInt(selectResident.value);
@@ -212,7 +245,7 @@ document.addEventListener('DOMContentLoaded', function() {
     const res = await fetch(url);
     const data = await res.json();
     tableInbox.innerHTML = '';
-    data.forEach(s => {
+    (data.items || []).forEach(s => {
       const tr = document.createElement('tr');
       tr.innerHTML = `<td>${s.id}</td><td>${s.street_name}</td><td>${s.drive_id}</td><td>${s.created_at}</td>`;
       tableInbox.appendChild(tr);
@@ -228,6 +261,16 @@ document.addEventListener('DOMContentLoaded', function() {
   document.getElementById('btn-show-schedule').addEventListener('click', showSchedule);
   document.getElementById('btn-show-inbox').addEventListener('click', showInbox);
 
-  // initial load
-  refreshAll();
+  // initial load: the stream's 'hello' (or 'resync') triggers one snapshot load,
+  // after which the board only applies deltas
+  if (window.EventSource) {
+    const source = new EventSource('/api/transport/events');
+    source.addEventListener('hello', refreshAll);
+    source.addEventListener('resync', refreshAll);
+    ['drive.created', 'drive.updated', 'stop.requested', 'driver.status'].forEach(type => {
+      source.addEventListener(type, e => applyEvent(type, JSON.parse(e.data)));
+    });
+  } else {
+    refreshAll();
+  }
 });
\ No newline at end of file
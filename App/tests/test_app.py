@@ -1,4 +1,7 @@
-import os, tempfile, pytest, logging, unittest
+import os, tempfile, pytest, logging, unittest, contextvars, sqlite3
+from flask import current_app
+from contextlib import contextmanager
+from sqlalchemy import event
 from werkzeug.security import check_password_hash, generate_password_hash
 
 from datetime import datetime, timezone
@@ -6,6 +9,8 @@ from datetime import datetime, timezone
 from App.main import create_app
 from App.database import db, create_db
 from App.models import User, Driver, Drive, Resident, StopRequest
+from App.hashing import HashingPool, HashingPoolBusy
+from App.serializers import serialize
 from App.controllers import (
     create_user,
     get_all_users_json,
@@ -20,7 +25,17 @@ from App.controllers import (
     create_resident,
     get_resident,
     create_stop_request,
-    get_resident_inbox
+    get_resident_inbox,
+    list_drives,
+    list_stop_requests,
+    list_all_data,
+    print_all_data,
+    print_drivers,
+    bulk_import,
+    load_identity,
+    identity_cache_stats,
+    create_recurrence,
+    materialize_occurrence
 )
 
 
@@ -77,6 +92,47 @@ class UserUnitTests(unittest.TestCase):
         self.assertTrue(check)
         
     
+    def test_hashing_pool_rejects_when_queue_full(self):
+        import threading
+        pool = HashingPool(max_workers=1, max_queue=1)
+        started, release = threading.Event(), threading.Event()
+        def slow():
+            started.set()
+            release.wait(5)
+            return "done"
+        worker = threading.Thread(target=pool.run, args=(slow,))
+        worker.start()
+        started.wait(5)
+        with self.assertRaises(HashingPoolBusy):
+            pool.run(lambda: None)
+        release.set()
+        worker.join()
+        self.assertEqual(pool.run(lambda x: x * 2, 21), 42)
+        stats = pool.stats()
+        self.assertEqual(stats['rejected'], 1)
+        self.assertEqual(stats['completed'], 2)
+        self.assertEqual(stats['in_flight'], 0)
+        pool.shutdown()
+
+    def test_hashing_pool_map_runs_batches_in_order(self):
+        pool = HashingPool(max_workers=2, max_queue=1)
+        self.assertEqual(pool.map(lambda x: x * 2, range(10)), [x * 2 for x in range(10)])
+        self.assertEqual(pool.stats()['rejected'], 0)
+        pool.shutdown()
+
+    def test_serialize_excludes_password_and_relationships(self):
+        driver = Driver(username="driver1", password="pass", status="Available")
+        drive = Drive(datetime=datetime(2026, 1, 10, 18, 0), current_location="Main St", driver=driver)
+        data = serialize(driver)
+        self.assertNotIn("password", data)
+        self.assertNotIn("schedule", data)
+        self.assertEqual(data["status"], "Available")
+
+        data = serialize(drive, include=("stops",))
+        self.assertEqual(data["datetime"], "2026-01-10T18:00:00")
+        self.assertEqual(data["stops"], [])
+        self.assertNotIn("driver", data)
+
     #############################################################
     '''
     def test_new_user(self):
@@ -110,7 +166,8 @@ class UserUnitTests(unittest.TestCase):
 # scope="class" would execute the fixture once and resued for all methods in the class
 @pytest.fixture(autouse=True, scope="module")
 def empty_db():
-    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///test.db'})
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///test.db', 'EVENTS_STREAM_TIMEOUT': 0},
+                     extensions=())
     create_db()
     yield app.test_client()
     db.drop_all()
@@ -229,11 +286,11 @@ class UsersIntegrationTests(unittest.TestCase):
         inbox = get_resident_inbox(resident.id, resident.street)
 
         flag = False
-        for s in inbox: #inbox contains a list of stop requests
-            if s == stop_request: #check to see if the stop_request just made is in the inbox
+        for s in inbox['items']: #inbox contains a page of stop request rows
+            if s['id'] == stop_request.id: #check to see if the stop_request just made is in the inbox
                 flag = True
         self.assertIsNotNone(inbox)
-        self.assertGreater(len(inbox), 0)
+        self.assertGreater(len(inbox['items']), 0)
         self.assertTrue(flag)
 
     def test_driver_status_update_visibility(self):
@@ -252,9 +309,799 @@ class UsersIntegrationTests(unittest.TestCase):
 
         inbox = get_resident_inbox(resident.id, resident.street)
         self.assertIsNotNone(inbox)
-        for request in inbox:
-            if request.drive.driver_id == driver.id:
+        for request in inbox['items']:
+            if request['drive_id'] == drive.id:
                 status = resident.view_driver_status(driver)
                 self.assertIsNotNone(status)
                 self.assertEqual(status, "On the way")
-     
+
+
+class HashingBusyIntegrationTests(unittest.TestCase):
+
+    def test_every_hashing_view_answers_503_when_the_pool_is_full(self):
+        from App.hashing import resize_pool
+        client = current_app.test_client()
+        create_user("busy_admin", "pass")
+        token = login("busy_admin", "pass")
+        resize_pool(max_queue=0)
+        try:
+            for path, body, headers in [
+                ('/api/transport/create-resident', {'username': 'busy_r', 'password': 'p'}, {}),
+                ('/api/transport/create-driver', {'username': 'busy_d', 'password': 'p'}, {}),
+                ('/api/users', {'username': 'busy_u', 'password': 'p'}, {}),
+                ('/api/v1/users', {'username': 'busy_v', 'password': 'p'}, {'Authorization': f'Bearer {token}'}),
+            ]:
+                response = client.post(path, json=body, headers=headers)
+                self.assertEqual(response.status_code, 503, path)
+                self.assertEqual(response.headers['Retry-After'], '1')
+        finally:
+            resize_pool()
+        self.assertIsNone(get_user_by_username("busy_r"))
+
+
+class PaginationIntegrationTests(unittest.TestCase):
+
+    def test_list_drives_keyset_pages(self):
+        driver = create_driver("pager", "pass", status="Available")
+        for i in range(5):
+            create_drive(driver.id, when=f"2026-03-0{i + 1} 08:00", current_location=f"Stop {i}")
+
+        first = list_drives(limit=2, driver_id=driver.id)
+        self.assertEqual(len(first['items']), 2)
+        self.assertIsNotNone(first['next_cursor'])
+
+        seen = [d['id'] for d in first['items']]
+        page = first
+        while page['next_cursor'] is not None:
+            page = list_drives(limit=2, after_id=page['next_cursor'], driver_id=driver.id)
+            seen.extend(d['id'] for d in page['items'])
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(seen, sorted(seen))
+
+    def test_list_stop_requests_filters_by_street(self):
+        driver = create_driver("pager2", "pass", status="Available")
+        drive = create_drive(driver.id, when="2026-03-10 08:00", current_location="Depot")
+        resident = create_resident("pager_res", "pass", name="Pat", street="Elm St")
+        create_stop_request(resident.id, drive.id, "Elm St")
+        create_stop_request(resident.id, drive.id, "Birch Rd")
+
+        page = list_stop_requests(drive_id=drive.id, street="Elm St")
+        self.assertEqual(len(page['items']), 1)
+        self.assertEqual(page['items'][0]['street_name'], "Elm St")
+        self.assertIsNone(page['next_cursor'])
+
+
+@contextmanager
+def count_queries():
+    """Count SQL statements issued on the app engine inside the block."""
+    counter = {'n': 0}
+    def _count(*args, **kwargs):
+        counter['n'] += 1
+    event.listen(db.engine, "before_cursor_execute", _count)
+    try:
+        yield counter
+    finally:
+        event.remove(db.engine, "before_cursor_execute", _count)
+
+
+class ListAllDataIntegrationTests(unittest.TestCase):
+
+    def _seed(self, prefix, n):
+        driver = create_driver(f"{prefix}_drv", "pass", status="Available")
+        resident = create_resident(f"{prefix}_res", "pass", name=prefix, street="Main St")
+        for i in range(n):
+            drive = create_drive(driver.id, when="2026-04-01 08:00", current_location="Main St")
+            create_stop_request(resident.id, drive.id, "Main St")
+
+    def test_list_all_data_query_count_is_constant(self):
+        self._seed("few", 1)
+        db.session.expire_all()
+        with count_queries() as small:
+            list_all_data()
+
+        self._seed("many", 10)
+        db.session.expire_all()
+        with count_queries() as large:
+            data = list_all_data()
+
+        self.assertEqual(small['n'], large['n'])
+        stops = {s['id'] for s in data['stop_requests']}
+        for drive in data['drives']:
+            self.assertTrue(set(drive['stops']) <= stops)
+
+    def test_print_table_loads_only_that_table(self):
+        with count_queries() as counter:
+            print_drivers()
+        self.assertEqual(counter['n'], 1)
+
+    def test_print_all_data_reads_each_table_once(self):
+        with count_queries() as counter:
+            data = print_all_data()
+        self.assertEqual(counter['n'], 5)
+        self.assertEqual(set(data), {'users', 'drivers', 'drives', 'residents', 'stop_requests'})
+
+
+class ResidentInboxIntegrationTests(unittest.TestCase):
+
+    def test_inbox_filters_and_pages_newest_first(self):
+        driver = create_driver("inbox_drv", "pass", status="Available")
+        drive = create_drive(driver.id, when="2026-05-01 08:00", current_location="Main St")
+        resident = create_resident("inbox_res", "pass", name="Ina", street="Main St")
+        stops = [create_stop_request(resident.id, drive.id, "Main St") for _ in range(3)]
+        create_stop_request(resident.id, drive.id, "Oak Ave")
+        stops[0].created_at = datetime(2026, 1, 1)
+        db.session.commit()
+
+        first = get_resident_inbox(resident.id, street="Main St", limit=1)
+        self.assertEqual([s['id'] for s in first['items']], [stops[2].id])
+        second = get_resident_inbox(resident.id, street="Main St", limit=5, after_id=first['next_cursor'])
+        self.assertEqual([s['id'] for s in second['items']], [stops[1].id, stops[0].id])
+        self.assertIsNone(second['next_cursor'])
+
+        recent = get_resident_inbox(resident.id, street="Main St", since="2026-02-01T00:00:00")
+        self.assertNotIn(stops[0].id, [s['id'] for s in recent['items']])
+
+    def test_inbox_for_missing_resident(self):
+        self.assertIsNone(get_resident_inbox(99999))
+
+
+class BulkImportIntegrationTests(unittest.TestCase):
+
+    def test_bulk_import_resolves_references(self):
+        tmp = tempfile.mkdtemp()
+        def write(name, content):
+            path = os.path.join(tmp, name)
+            with open(path, 'w') as fh:
+                fh.write(content)
+            return path
+
+        sources = {
+            'drivers': write('drivers.csv', "username,password,status\nbulk_drv,pass,active\n"),
+            'residents': write('residents.csv', "username,password,name,street\nbulk_r1,pass,R1,Main St\nbulk_r2,pass,R2,Oak Ave\n"),
+            'drives': write('drives.ndjson',
+                '{"ref": "am", "driver": "bulk_drv", "datetime": "2026-06-01 08:00", "current_location": "Depot"}\n'
+                '{"ref": "pm", "driver": "bulk_drv", "datetime": "2026-06-01 17:00"}\n'),
+            'stop_requests': write('stops.csv',
+                "resident,drive_ref,street\nbulk_r1,am,\nbulk_r2,pm,Elm St\nbulk_r2,missing,\nunknown,am,\n"),
+        }
+        stats = {s['table']: s for s in bulk_import(sources, batch_size=1)}
+
+        self.assertEqual(stats['residents']['rows'], 2)
+        self.assertEqual(stats['drives']['rows'], 2)
+        self.assertEqual(stats['stop_requests']['rows'], 2)
+        self.assertEqual(stats['stop_requests']['skipped'], 2)
+
+        r1 = get_user_by_username("bulk_r1")
+        self.assertIsNotNone(r1)
+        self.assertTrue(r1.check_password("pass"))
+        inbox = get_resident_inbox(r1.id)
+        self.assertEqual(len(inbox['items']), 1)
+        self.assertEqual(inbox['items'][0]['street_name'], "Main St")
+
+
+class RecurringDriveIntegrationTests(unittest.TestCase):
+
+    def test_occurrences_expand_lazily_and_materialize_on_demand(self):
+        driver = create_driver("rec_drv", "pass", status="active")
+        resident = create_resident("rec_res", "pass", name="Rec", street="Elm St")
+        rule = create_recurrence(driver.id, "weekdays", "08:00", current_location="Depot", starts_on="2026-11-02")
+        window = dict(start="2026-11-02T00:00", end="2026-11-09T00:00")
+
+        schedule = get_driver_schedule(driver.id, **window)
+        self.assertEqual(len(schedule), 5)
+        self.assertTrue(all(d.id is None for d in schedule))
+        self.assertEqual(db.session.scalar(db.select(db.func.count(Drive.id)).where(Drive.recurrence_id == rule.id)), 0)
+
+        monday = schedule[0]
+        stop = create_stop_request(resident.id, monday.key, None)
+        self.assertIsNotNone(stop)
+        self.assertIs(materialize_occurrence(monday.key), stop.drive)
+        self.assertIsNone(materialize_occurrence(f"r{rule.id}-20261107T0800"))  # a Saturday
+
+        # moving the materialized drive must not bring back its virtual occurrence
+        stop.drive.datetime = datetime(2026, 11, 2, 9, 30)
+        db.session.commit()
+        schedule = get_driver_schedule(driver.id, **window)
+        self.assertEqual(len(schedule), 5)
+        self.assertEqual(schedule[0].id, stop.drive_id)
+        self.assertEqual([s.id for s in schedule[0].stops], [stop.id])
+        self.assertEqual(sum(1 for d in schedule if d.id is None), 4)
+
+
+class IdentityCacheIntegrationTests(unittest.TestCase):
+
+    def test_identity_cached_until_user_updated(self):
+        driver = create_driver("cached_drv", "pass", status="Available")
+        first = load_identity('driver', driver.id)
+        self.assertEqual(first.role, 'driver')
+        self.assertEqual(first.status, "Available")
+
+        hits = identity_cache_stats()['hits']
+        with count_queries() as counter:
+            again = load_identity('driver', driver.id)
+        self.assertIs(again, first)
+        self.assertEqual(counter['n'], 0)
+        self.assertEqual(identity_cache_stats()['hits'], hits + 1)
+
+        update_user(driver.id, "cached_drv2")
+        self.assertEqual(load_identity('driver', driver.id).username, "cached_drv2")
+
+    def test_unknown_identity_is_not_cached(self):
+        self.assertIsNone(load_identity('resident', 99999))
+
+
+class StopRequestPositionIntegrationTests(unittest.TestCase):
+
+    def test_invalid_position_is_rejected_not_reported_missing(self):
+        client = current_app.test_client()
+        resident = create_resident("pos_res", "pass", name="Pos", street="Elm St")
+        driver = create_driver("pos_drv", "pass", status="active")
+        drive = create_drive(driver.id, current_location="Depot")
+        with self.assertRaises(ValueError):
+            create_stop_request(resident.id, drive.id, None, latitude=91, longitude=0)
+        self.assertIsNone(create_stop_request(resident.id, 99999, None, latitude=52.5, longitude=13.4))
+
+        create_user("pos_admin", "pass")
+        headers = {'Authorization': f'Bearer {login("pos_admin", "pass")}'}
+        for lat, lon in [(91, 0), ('north', 13.4), (52.5, None)]:
+            response = client.post('/api/v1/stops', headers=headers,
+                                   json={'resident_id': resident.id, 'drive_id': drive.id, 'lat': lat, 'lon': lon})
+            self.assertEqual(response.status_code, 400, (lat, lon))
+            self.assertIn('lat/lon', response.get_json()['error'])
+        response = client.post('/api/v1/stops', headers=headers,
+                               json={'resident_id': resident.id, 'drive_id': drive.id, 'lat': 52.5, 'lon': 13.4})
+        self.assertEqual(response.status_code, 201)
+
+
+class MetricsIntegrationTests(unittest.TestCase):
+
+    def test_health_is_liveness_only_and_metrics_need_a_staff_token(self):
+        client = current_app.test_client()
+        self.assertEqual(client.get('/health').get_json(), {'status': 'healthy'})
+
+        self.assertEqual(client.get('/api/v1/metrics').status_code, 401)
+        create_driver("metrics_drv", "pass", status="active")
+        response = client.get('/api/v1/metrics', headers={'Authorization': f'Bearer {login("metrics_drv", "pass")}'})
+        self.assertEqual(response.status_code, 403)
+
+        create_user("metrics_staff", "pass")
+        response = client.get('/api/v1/metrics', headers={'Authorization': f'Bearer {login("metrics_staff", "pass")}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.get_json()), {'hashing', 'db_pool'})
+        self.assertIn('max_queue', response.get_json()['hashing'])
+
+
+class AuthContextIntegrationTests(unittest.TestCase):
+
+    def test_auth_context_resolves_user_once_per_request(self):
+        client = current_app.test_client()
+        create_user("ctx_user", "pass")
+        token = login("ctx_user", "pass")
+
+        response = client.get('/', headers={'Authorization': f'Bearer {token}'})
+        assert response.status_code == 200
+        assert b'Welcome ctx_user' in response.data
+
+        # the resolved user must not leak into the next (anonymous) request
+        response = client.get('/')
+        assert response.status_code == 200
+        assert b'Welcome ctx_user' not in response.data
+
+        response = client.get('/', headers={'Authorization': 'Bearer not-a-token'})
+        assert response.status_code == 200
+
+    def test_login_lookup_loads_concrete_class_in_one_query(self):
+        create_resident("poly_res", "pass", name="Poly", street="Main St")
+        db.session.expunge_all()
+        with count_queries() as counter:
+            user = get_user_by_username("poly_res")
+            street = user.street
+        assert isinstance(user, Resident)
+        assert street == "Main St"
+        assert counter['n'] == 1
+
+    def test_role_claim_authorizes_without_loading_user(self):
+        from flask_jwt_extended import decode_token
+        from App.controllers.auth import current_principal, driver_required, resident_required
+
+        client = current_app.test_client()
+        create_driver("claim_driver", "pass", status="active")
+        response = client.post('/api/login', json={'username': 'claim_driver', 'password': 'pass'})
+        token = response.get_json()['access_token']
+        assert decode_token(token)['role'] == 'driver'
+
+        @driver_required
+        def driver_view():
+            return current_principal.id
+
+        @resident_required
+        def resident_view():
+            return 'unreachable'
+
+        headers = {'Authorization': f'Bearer {token}'}
+        with current_app.test_request_context(headers=headers), count_queries() as counter:
+            assert isinstance(driver_view(), int)
+            response, status = resident_view()
+            assert status == 403
+        assert counter['n'] == 0
+
+        # profile fields still load on demand
+        with current_app.test_request_context(headers=headers):
+            driver_view()
+            assert current_principal.username == "claim_driver"
+            assert current_principal.status == "active"
+
+
+class ApiV1IntegrationTests(unittest.TestCase):
+
+    def test_api_controller_bindings_fail_fast(self):
+        from App.views.api import resolve_controllers
+        with self.assertRaisesRegex(RuntimeError, "no_such_controller"):
+            resolve_controllers({'missing': 'no_such_controller'})
+
+    def test_api_v1_login_and_list(self):
+        client = current_app.test_client()
+        create_user("api_user", "pass")
+        response = client.post('/api/v1/auth/login', json={'username': 'api_user', 'password': 'pass'})
+        assert response.status_code == 200
+        assert 'password' not in response.get_json()['user']
+        headers = {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+        response = client.get('/api/v1/drives?limit=2', headers=headers)
+        assert response.status_code == 200
+        assert len(response.get_json()['items']) <= 2
+
+        response = client.get('/api/v1/drives/99999', headers=headers)
+        assert response.status_code == 404
+
+    def test_stop_batch_reports_partial_failures(self):
+        client = current_app.test_client()
+        create_user("batch_admin", "pass")
+        resident = create_resident("batch_res", "pass", name="Batch", street="Elm St")
+        driver = create_driver("batch_drv", "pass", status="active")
+        drives = [create_drive(driver.id, current_location=f"Depot {i}").id for i in range(2)]
+        resident_id = resident.id
+        token = client.post('/api/v1/auth/login', json={'username': 'batch_admin', 'password': 'pass'}).get_json()['access_token']
+        headers = {'Authorization': f'Bearer {token}'}
+
+        items = [{'drive_id': drives[0]}, {'drive_id': 99999}, {'drive_id': drives[1], 'street': 'Oak Ave'}]
+        with count_queries() as counter:
+            response = client.post('/api/v1/stops/batch', json={'resident_id': resident_id, 'items': items}, headers=headers)
+        assert response.status_code == 207
+        body = response.get_json()
+        assert (body['created'], body['failed']) == (2, 1)
+        assert [r['status'] for r in body['results']] == ['created', 'error', 'created']
+        assert body['results'][0]['stop']['street_name'] == 'Elm St'
+        assert body['results'][2]['stop']['street_name'] == 'Oak Ave'
+        # drive IN query, resident IN query, one multi-row insert, one events insert and one
+        # table_version bump at commit; no per-item lookups
+        assert counter["n"] == 5, counter
+
+        response = client.post('/api/v1/stops/batch', json=[{'resident_id': resident_id, 'drive_id': 'x'}], headers=headers)
+        assert response.status_code == 422
+        response = client.post('/api/v1/stops/batch', json={'items': []}, headers=headers)
+        assert response.status_code == 400
+
+
+class TransportEventsIntegrationTests(unittest.TestCase):
+
+    def test_transport_events_stream_deltas_and_resume(self):
+        from App.events import latest_event_id, stream_events
+        from App.controllers import set_driver_status
+
+        def frames(stream):
+            return [dict(line.split(': ', 1) for line in frame.splitlines() if line)
+                    for frame in stream if frame.startswith('id:')]
+
+        client = current_app.test_client()
+        head = latest_event_id(db.engine)
+        driver = create_driver("sse_drv", "pass", status="idle")
+        drive = create_drive(driver.id, when="2026-07-01 08:00", current_location="Depot")
+        set_driver_status(driver.id, "en route")
+        resident = create_resident("sse_res", "pass", name="Sse", street="Elm St")
+        create_stop_request(resident.id, drive.id, None)
+        drive.current_location = "Elm St"
+        db.session.commit()
+
+        events = frames(stream_events(db.engine, head, timeout=0))
+        assert [e['event'] for e in events] == ['drive.created', 'driver.status', 'stop.requested', 'drive.updated']
+        assert '"en route"' in events[1]['data']
+
+        # resume after the second event, as a reconnecting EventSource would (the
+        # test app's EVENTS_STREAM_TIMEOUT of 0 ends the stream once it is caught up)
+        response = client.get('/api/transport/events', headers={'Last-Event-ID': events[1]['id']})
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        resumed = frames(response.get_data(as_text=True).split('\n\n'))
+        assert [e['event'] for e in resumed] == ['stop.requested', 'drive.updated']
+
+        fresh = frames(stream_events(db.engine, None, timeout=0))
+        assert fresh == [{'id': events[-1]['id'], 'event': 'hello', 'data': f'{{"last_event_id": {events[-1]["id"]}}}'}]
+
+    def test_drive_update_fans_out_notifications_off_request(self):
+        from App.notifications import wait_for_notifications
+        from App.controllers import fan_out_drive_update, get_resident_notifications
+
+        client = current_app.test_client()
+        driver = create_driver("fan_drv", "pass", status="active")
+        drive = create_drive(driver.id, when="2026-08-01 08:00", current_location="Depot")
+        residents = [create_resident(f"fan_res{i}", "pass", name=f"F{i}", street="Elm St") for i in range(3)]
+        for r in residents + [residents[0]]:
+            create_stop_request(r.id, drive.id, None)
+        drive_id, resident_ids = drive.id, [r.id for r in residents]
+
+        token = client.post('/api/login', json={'username': 'fan_drv', 'password': 'pass'}).get_json()['access_token']
+        response = client.post('/api/transport/update-drive', json={'id': drive_id, 'location': 'North Gate'},
+                               headers={'Authorization': f'Bearer {token}'})
+        assert response.status_code == 200
+        wait_for_notifications()
+
+        for rid in resident_ids:
+            items = get_resident_notifications(rid)['items']
+            assert len(items) == 1
+            assert items[0]['message'] == f"Drive #{drive_id} now starts from North Gate"
+
+        # one residents query, then one insert + table_version bump + commit per batch
+        with count_queries() as counter:
+            assert fan_out_drive_update(drive_id, {'current_location': 'Depot'}, batch_size=2) == 3
+        assert counter['n'] == 5
+
+
+class RoutingGeoIntegrationTests(unittest.TestCase):
+
+    def test_nearby_drives_reads_candidate_cells_then_filters_exactly(self):
+        from App.controllers import find_nearby_drives
+        from App.geo import cell_for
+
+        driver = create_driver("geo_drv", "pass", status="active")
+        near = create_drive(driver.id, current_location="Alexanderplatz", latitude=52.5219, longitude=13.4132)
+        nearer = create_drive(driver.id, current_location="Rotes Rathaus", latitude=52.5186, longitude=13.4083)
+        far = create_drive(driver.id, current_location="Tiergarten", latitude=52.5145, longitude=13.3501)
+        create_drive(driver.id, current_location="No position")
+        east = create_drive(driver.id, current_location="Date line east", latitude=-16.5, longitude=179.999)
+        assert near.grid_cell == cell_for(52.5219, 13.4132)
+
+        hits = find_nearby_drives(52.5186, 13.4080, radius_km=1.0)
+        assert [h['id'] for h in hits] == [nearer.id, near.id]
+        assert hits[0]['distance_km'] < hits[1]['distance_km'] <= 1.0
+        assert far.id not in [h['id'] for h in find_nearby_drives(52.5186, 13.4080, radius_km=3.0)]
+
+        # candidate cells wrap the antimeridian
+        assert [h['id'] for h in find_nearby_drives(-16.5, -179.999, radius_km=1.0)] == [east.id]
+
+        client = current_app.test_client()
+        create_user("geo_api", "pass")
+        token = client.post('/api/v1/auth/login', json={'username': 'geo_api', 'password': 'pass'}).get_json()['access_token']
+        headers = {'Authorization': f'Bearer {token}'}
+        response = client.get('/api/v1/drives/nearby?lat=52.5186&lon=13.4080&radius=1', headers=headers)
+        assert response.status_code == 200
+        assert [d['id'] for d in response.get_json()['items']] == [nearer.id, near.id]
+        assert client.get('/api/v1/drives/nearby?lat=52.5', headers=headers).status_code == 400
+        assert client.get('/api/v1/drives/nearby?lat=52.5&lon=13.4&radius=500', headers=headers).status_code == 400
+
+    def test_optimize_drive_orders_stops_and_persists_sequence(self):
+        from App.controllers import optimize_drive, set_street_location
+        from App.route_optimizer import distance_matrix, nearest_neighbour, optimize_path, path_length, two_opt
+
+        driver = create_driver("route_drv", "pass", status="active")
+        resident = create_resident("route_res", "pass", name="R", street="Elm")
+        drive = create_drive(driver.id, current_location="Depot", latitude=52.5, longitude=13.40)
+        set_street_location("Oak", 52.5, 13.42)
+        set_street_location("Pine", 52.5, 13.44)
+        # requested out of order; two are placed via the street table, one cannot be placed
+        far = create_stop_request(resident.id, drive.id, "Far", latitude=52.5, longitude=13.45)
+        pine = create_stop_request(resident.id, drive.id, "Pine")
+        lost = create_stop_request(resident.id, drive.id, "Nowhere")
+        near = create_stop_request(resident.id, drive.id, "Near", latitude=52.5, longitude=13.41)
+        oak = create_stop_request(resident.id, drive.id, "Oak")
+
+        result = optimize_drive(drive.id)
+        assert result['stops'] == [near.id, oak.id, pine.id, far.id, lost.id]
+        assert result['unlocated'] == [lost.id]
+        assert [s.id for s in db.session.get(Drive, drive.id).stops] == result['stops']
+        assert db.session.get(StopRequest, lost.id).sequence == 5
+        assert optimize_drive(999999) is None
+
+        # 2-opt never lengthens the greedy path
+        lats = [0.0, 0.0, 0.1, 0.0, 0.1, 0.05]
+        lons = [0.0, 0.1, 0.1, 0.2, 0.0, 0.3]
+        dist = distance_matrix(lats, lons)
+        greedy = nearest_neighbour(dist)
+        improved, _, completed = two_opt(dist, greedy, float('inf'))
+        assert completed and sorted(improved) == list(range(6)) and improved[0] == 0
+        assert path_length(dist, improved) <= path_length(dist, greedy)
+        assert optimize_path([0.0], [0.0])[0] == []
+
+        # only the drive's own driver may start a search, and only on a bounded drive
+        from App.controllers.driver import MAX_OPTIMIZE_STOPS
+        client = current_app.test_client()
+        create_driver("route_other", "pass", status="active")
+        for username in ("route_res", "route_other"):
+            response = client.post(f'/api/v1/drives/{drive.id}/optimize', headers={'Authorization': f'Bearer {login(username, "pass")}'})
+            assert response.status_code == 403
+        headers = {'Authorization': f'Bearer {login("route_drv", "pass")}'}
+        response = client.post(f'/api/v1/drives/{drive.id}/optimize', json={'time_budget_ms': 50}, headers=headers)
+        assert response.status_code == 200
+        assert response.get_json()['stops'] == result['stops']
+        assert client.post('/api/v1/drives/999999/optimize', headers=headers).status_code == 404
+
+        big = create_drive(driver.id, current_location="Depot", latitude=52.5, longitude=13.40)
+        db.session.execute(StopRequest.__table__.insert(), [
+            {'drive_id': big.id, 'requestee_id': resident.id, 'street_name': 'Elm', 'created_at': datetime(2026, 1, 1)}
+            for _ in range(MAX_OPTIMIZE_STOPS + 1)
+        ])
+        db.session.commit()
+        assert client.post(f'/api/v1/drives/{big.id}/optimize', headers=headers).status_code == 413
+
+
+class ConditionalCacheIntegrationTests(unittest.TestCase):
+
+    def test_unchanged_polls_get_304_after_one_counter_lookup(self):
+        client = current_app.test_client()
+        driver = create_driver("etag_drv", "pass", status="active")
+        drive = create_drive(driver.id, when="2026-08-01 08:00", current_location="Depot")
+
+        first = client.get('/api/transport/list-all')
+        assert first.status_code == 200
+        etag = first.headers['ETag']
+        assert etag.startswith('W/"')
+
+        with count_queries() as counter:
+            again = client.get('/api/transport/list-all', headers={'If-None-Match': etag})
+        assert again.status_code == 304 and again.headers['ETag'] == etag
+        assert counter['n'] == 1
+
+        # any committed write to a snapshot table changes the tag
+        resident = create_resident("etag_res", "pass", name="E", street="Elm St")
+        changed = client.get('/api/transport/list-all', headers={'If-None-Match': etag})
+        assert changed.status_code == 200 and changed.headers['ETag'] != etag
+        assert any(r['id'] == resident.id for r in changed.get_json()['residents'])
+
+        # the counters move once the write commits, not while its transaction holds them
+        from App.versions import table_versions
+        before = table_versions(['drive'])
+        db.session.get(Drive, drive.id).current_location = 'Yard'
+        db.session.flush()
+        assert table_versions(['drive']) == before
+        db.session.commit()
+        assert table_versions(['drive'])['drive'] == before['drive'] + 1
+
+        # Core statements run through the session bump too
+        etag = changed.headers['ETag']
+        db.session.execute(db.update(Drive).where(Drive.driver_id == driver.id).values(current_location='Gate'))
+        db.session.commit()
+        assert client.get('/api/transport/list-all', headers={'If-None-Match': etag}).status_code == 200
+
+        token = login("etag_drv", "pass")
+        headers = {'Authorization': f'Bearer {token}'}
+        page = client.get('/api/v1/drives', headers=headers)
+        assert page.status_code == 200
+        headers['If-None-Match'] = page.headers['ETag']
+        assert client.get('/api/v1/drives', headers=headers).status_code == 304
+        # the tag covers the query string
+        assert client.get('/api/v1/drives?limit=1', headers=headers).status_code == 200
+
+    def test_cached_responses_follow_table_versions(self):
+        from sqlalchemy import update
+        from App.cache import SQLiteCache, clear_cache
+
+        client = current_app.test_client()
+        clear_cache()
+        driver = create_driver("cache_drv", "pass", status="active")
+
+        first = client.get('/api/transport/options')
+        assert driver.id in [d['id'] for d in first.get_json()['drivers']]
+        with count_queries() as counter:
+            again = client.get('/api/transport/options')
+        assert counter['n'] == 1 and again.get_json() == first.get_json()
+
+        # a rolled-back change leaves the entry in place
+        driver.status = "gone"
+        db.session.flush()
+        db.session.rollback()
+        with count_queries() as counter:
+            client.get('/api/transport/options')
+        assert counter['n'] == 1
+
+        # a write with no cache bookkeeping (as from another worker or the admin UI) moves the key on
+        def driver_status(response):
+            return {d['id']: d['status'] for d in response.get_json()['drivers']}[driver.id]
+
+        assert driver_status(client.get('/api/transport/list-all')) == "active"
+        db.session.execute(update(Driver).where(Driver.id == driver.id).values(status="off"))
+        db.session.commit()
+        fresh = client.get('/api/transport/list-all')
+        assert driver_status(fresh) == "off"
+        assert client.get('/api/transport/list-all', headers={'If-None-Match': fresh.headers['ETag']}).status_code == 304
+        assert driver_status(client.get('/api/transport/options')) == "off"
+
+        # the SQLite backend shares entries between workers
+        path = os.path.join(tempfile.mkdtemp(), 'cache.sqlite')
+        worker_a, worker_b = SQLiteCache(path), SQLiteCache(path)
+        worker_a.set('/x|drive=1', {'body': '[]', 'mimetype': 'application/json'}, 60)
+        assert worker_b.get('/x|drive=1') == {'body': '[]', 'mimetype': 'application/json'}
+        worker_b.clear()
+        assert worker_a.get('/x|drive=1') is None
+
+        # a worker's threads (greenlets under gevent) share its one connection
+        from concurrent.futures import ThreadPoolExecutor
+        def round_trip(i):
+            worker_a.set(f'/t|{i}', {'body': str(i), 'mimetype': 'text/plain'}, 60)
+            return worker_a.get(f'/t|{i}')['body']
+        with ThreadPoolExecutor(8) as pool:
+            assert list(pool.map(round_trip, range(32))) == [str(i) for i in range(32)]
+        worker_a.close()
+        worker_b.close()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            worker_a.get('/t|0')
+
+
+class EngineOptionsUnitTests(unittest.TestCase):
+
+    def test_production_engine_pool_is_sized_and_times_checkouts(self):
+        import threading
+        from sqlalchemy import create_engine, text
+        from sqlalchemy.exc import TimeoutError as PoolTimeout
+        from App.database import TimedQueuePool, production_engine_options
+
+        config = {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'pool.db')}",
+                  'DB_GREENLET_CONCURRENCY': 3, 'DB_POOL_TIMEOUT': 0.2}
+        options = production_engine_options(config)
+        assert options['poolclass'] is TimedQueuePool and options['pool_pre_ping']
+        assert (options['pool_size'], options['max_overflow']) == (1, 2)
+        assert 'pool_size' not in production_engine_options({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        assert production_engine_options(dict(config, SQLALCHEMY_ENGINE_OPTIONS={'pool_size': 7}))['pool_size'] == 7
+
+        engine = create_engine(config['SQLALCHEMY_DATABASE_URI'], **options)
+        held = [engine.connect() for _ in range(3)]
+        with self.assertRaises(PoolTimeout):
+            engine.connect()
+        release = threading.Timer(0.05, held[0].close)
+        release.start()
+        with engine.connect() as conn:
+            assert conn.execute(text('select 1')).scalar() == 1
+        release.join()
+        stats = engine.pool.stats()
+        assert stats['timeouts'] == 1 and stats['waited'] >= 1 and stats['max_wait_seconds'] >= 0.04
+        assert stats['checkouts'] == 4 and stats['max_overflow'] == 2
+        for conn in held[1:]:
+            conn.close()
+        engine.dispose()
+
+    def test_sqlite_profile_sets_pragmas_on_every_connection(self):
+        from sqlalchemy import create_engine, text
+        from App.database import apply_sqlite_pragmas, sqlite_pragmas
+
+        pragmas = sqlite_pragmas({'SQLITE_PRAGMAS': {'busy_timeout': 2500}})
+        engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'tuned.db')}")
+        apply_sqlite_pragmas(engine, pragmas)
+        with engine.connect() as conn:
+            assert conn.execute(text('PRAGMA journal_mode')).scalar().lower() == 'wal'
+            assert conn.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+            assert conn.execute(text('PRAGMA busy_timeout')).scalar() == 2500
+            assert conn.execute(text('PRAGMA cache_size')).scalar() == -20000
+        engine.dispose()
+
+
+class ReplicaIntegrationTests(unittest.TestCase):
+
+    """Each test builds a second app on a primary/replica pair of SQLite files."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.primary = os.path.join(self.tmp, 'primary.db')
+        self.replica = os.path.join(self.tmp, 'replica.db')
+        self.main_app = current_app._get_current_object()
+        self.app = None
+
+    def tearDown(self):
+        if self.app is not None:
+            with self.app.app_context():
+                db.session.remove()
+                for engine in db.engines.values():
+                    engine.dispose()
+        # the second create_app rebound the process-wide services; bind them back
+        from App.cache import init_cache
+        from App.events import init_events
+        from App.notifications import init_notifications
+        init_events(self.main_app)
+        init_notifications(self.main_app)
+        init_cache(self.main_app)
+
+    def make_app(self, **config):
+        config = dict({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f'sqlite:///{self.primary}',
+                       'SQLALCHEMY_REPLICA_URI': f'sqlite:///{self.replica}', 'NOTIFICATIONS_ASYNC': False}, **config)
+        # create_app pushes an app context; keep that push out of this test's context
+        self.app = contextvars.copy_context().run(create_app, config)
+        return self.app
+
+    def replicate(self):
+        with sqlite3.connect(self.primary) as src, sqlite3.connect(self.replica) as dst:
+            src.backup(dst)
+
+    def test_reads_route_to_replica_and_writers_stay_on_primary(self):
+        from App.controllers import get_all_users
+
+        app = self.make_app(CACHE_BACKEND='null')
+        with app.app_context():
+            client = app.test_client()
+            create_db()
+            driver = create_driver("replica_drv", "pass", status="active")
+            create_drive(driver.id, when="2026-08-01 08:00", current_location="Depot")
+            # "replicate", then write to the primary only
+            self.replicate()
+            create_drive(driver.id, when="2026-08-02 08:00", current_location="Unreplicated")
+            create_user("replica_late", "pass")
+
+            def drive_count(**kwargs):
+                return len(client.get('/api/transport/list-all', **kwargs).get_json()['drives'])
+
+            assert drive_count() == 1
+            assert drive_count(headers={'X-Read-From': 'primary'}) == 2
+
+            # a write pins that client to the primary for the next reads
+            token = client.post('/api/login', json={'username': 'replica_drv', 'password': 'pass'}).get_json()['access_token']
+            response = client.post('/api/transport/create-drive', json={'location': 'Gate'},
+                                   headers={'Authorization': f'Bearer {token}'})
+            assert response.status_code == 201
+            assert 'read_primary=1' in response.headers['Set-Cookie']
+            assert drive_count() == 3
+            client.delete_cookie('read_primary')
+            assert drive_count() == 1
+
+            # code outside the HTTP layer: replica until it writes, then read-your-writes
+            # (the request context's teardown drops the pin again)
+            with app.test_request_context():
+                assert "replica_late" not in [u.username for u in get_all_users()]
+                create_user("replica_later", "pass")
+                assert {"replica_late", "replica_later"} <= {u.username for u in get_all_users()}
+
+    def test_lagging_replica_serves_etags_and_cache_entries_that_match_its_data(self):
+        app = self.make_app(CACHE_BACKEND='lru')
+        with app.app_context():
+            client = app.test_client()
+            create_db()
+            driver = create_driver("lag_drv", "pass", status="active")
+            create_drive(driver.id, when="2026-08-01 08:00", current_location="Depot")
+            self.replicate()
+            create_drive(driver.id, when="2026-08-02 08:00", current_location="Unreplicated")
+
+            stale = client.get('/api/transport/list-all')
+            assert len(stale.get_json()['drives']) == 1
+            polled = {'If-None-Match': stale.headers['ETag']}
+            assert client.get('/api/transport/list-all', headers=polled).status_code == 304
+
+            # once the replica catches up, the old tag no longer matches and the cache misses
+            self.replicate()
+            caught_up = client.get('/api/transport/list-all', headers=polled)
+            assert caught_up.status_code == 200
+            assert len(caught_up.get_json()['drives']) == 2
+            assert caught_up.headers['ETag'] != stale.headers['ETag']
+            assert len(client.get('/api/transport/list-all').get_json()['drives']) == 2
+
+
+class StartupImportTests(unittest.TestCase):
+
+    def test_startup_imports_optional_extensions_only_when_enabled(self):
+        import json, subprocess, sys
+        script = (
+            "import json, sys, wsgi\n"
+            "from App.main import create_app\n"
+            "lazy = ('flask_admin', 'flask_cors', 'flask_uploads', 'flask_migrate', 'numpy', 'rich')\n"
+            "loaded = lambda: sorted(m for m in lazy if m in sys.modules)\n"
+            "steps = {'import': loaded()}\n"
+            "lean = create_app(extensions=())\n"
+            "steps['lean'] = loaded()\n"
+            "full = create_app(extensions='admin, cors')\n"
+            "steps['full'] = loaded()\n"
+            "steps['blueprints'] = ['admin' in lean.blueprints, 'admin' in full.blueprints]\n"
+            "print(json.dumps(steps))\n"
+        )
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+        env = dict(os.environ, FLASK_SQLALCHEMY_DATABASE_URI='sqlite://')
+        result = subprocess.run([sys.executable, '-c', script], cwd=root, env=env, capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        steps = json.loads(result.stdout.strip().splitlines()[-1])
+        assert steps['import'] == [] and steps['lean'] == []
+        assert steps['full'] == ['flask_admin', 'flask_cors']
+        assert steps['blueprints'] == [False, True]
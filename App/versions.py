@@ -0,0 +1,124 @@
+"""Per-table write counters and the weak ETags derived from them.
+
+Every ORM flush and every INSERT/UPDATE/DELETE run through the session notes the
+tables it touches; once the transaction commits, their table_version rows are bumped
+in one short transaction of their own (one UPDATE per commit). Writers therefore never
+hold the shared counter rows' locks for the length of their transaction, so they do
+not serialize on them. The counters are shared by all workers and can only lag
+committed data for a moment; a poll in that window just gets a 200 it could have
+skipped. A read endpoint names the tables its response is built from; `conditional`
+answers a matching If-None-Match with 304 after a single counter lookup, before the
+view runs any of its own queries.
+"""
+import hashlib
+from functools import wraps
+
+from flask import Response, make_response, request
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from App.database import db
+from App.models import TableVersion
+
+_VERSIONS = TableVersion.__table__
+
+
+def table_versions(names):
+    """{table name: version} for `names` in one query; tables never written count as 0."""
+    rows = db.session.execute(
+        db.select(_VERSIONS.c.name, _VERSIONS.c.version).where(_VERSIONS.c.name.in_(names))
+    )
+    versions = dict.fromkeys(names, 0)
+    for name, version in rows:
+        versions[name] = version
+    return versions
+
+
+def request_table_versions(tables):
+    """table_versions(tables), looked up once per request so conditional and cached share it."""
+    memo = request.environ.setdefault('app.table_versions', {})
+    names = tuple(sorted(tables))
+    if names not in memo:
+        memo[names] = table_versions(names)
+    return memo[names]
+
+
+def make_etag(versions, *vary):
+    """Opaque tag for table `versions` plus any request-specific parts."""
+    key = repr((sorted(versions.items()), vary)).encode()
+    return hashlib.blake2b(key, digest_size=12).hexdigest()
+
+
+def conditional(*tables, vary=None):
+    """Serve GETs with a weak ETag over `tables`; `vary()` adds request-specific parts.
+
+    The query string is always part of the tag. Stack it under replica_reads on a view
+    that reads the replica, so the counters come from the same database as the body
+    and the tag never runs ahead of the data.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            parts = (request.path, request.query_string) + (tuple(vary()) if vary else ())
+            etag = make_etag(request_table_versions(tables), *parts)
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+                response.set_etag(etag, weak=True)
+                return response
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag, weak=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def _bump(conn, names):
+    names = sorted(set(names) - {_VERSIONS.name})
+    if not names:
+        return
+    result = conn.execute(
+        _VERSIONS.update().where(_VERSIONS.c.name.in_(names)).values(version=_VERSIONS.c.version + 1)
+    )
+    if result.rowcount < len(names):
+        existing = set(conn.execute(db.select(_VERSIONS.c.name).where(_VERSIONS.c.name.in_(names))).scalars())
+        conn.execute(_VERSIONS.insert(), [{'name': n, 'version': 1} for n in names if n not in existing])
+
+
+@event.listens_for(_VERSIONS, 'after_create')
+def _seed_versions(target, connection, **kw):
+    # one row per table up front, so a bump is always a single UPDATE
+    connection.execute(target.insert(), [{'name': name, 'version': 0} for name in target.metadata.tables])
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _note_executed(orm_execute_state):
+    # statements run through the session are bumped once the transaction commits
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None:
+            orm_execute_state.session.info.setdefault('written_tables', set()).add(table.name)
+
+
+@event.listens_for(Session, 'after_flush')
+def _note_flushed(session, flush_context):
+    names = session.info.setdefault('written_tables', set())
+    for obj in session.new | session.deleted:
+        names.update(t.name for t in sa_inspect(obj).mapper.tables)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            names.update(t.name for t in sa_inspect(obj).mapper.tables)
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_committed(session):
+    names = session.info.pop('written_tables', None)
+    if names:
+        with session.get_bind().begin() as conn:
+            _bump(conn, names)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _discard_written(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('written_tables', None)
@@ -2,13 +2,14 @@ from .api import api as api_views
 from .user import user_views
 from .index import index_views
 from .auth import auth_views
-from .admin import setup_admin
 from .admin_api import admin_api
+from .transport import transport_views
 
 views = [
     user_views,
     index_views,
     auth_views,
     admin_api,
-    api_views
+    api_views,
+    transport_views
 ] 
\ No newline at end of file
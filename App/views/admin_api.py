@@ -112,7 +112,16 @@ def create_new_resident():
 @admin_api.get('/residents/<int:resident_id>/inbox')
 def get_inbox(resident_id):
     """Get a resident's inbox of stop requests."""
-    inbox = get_resident_inbox(resident_id, street=request.args.get('street'))
+    try:
+        inbox = get_resident_inbox(
+            resident_id,
+            street=request.args.get('street'),
+            since=request.args.get('since'),
+            limit=request.args.get('limit', type=int),
+            after_id=request.args.get('after_id', type=int)
+        )
+    except ValueError:
+        return jsonify({'error': 'since must be an ISO datetime'}), 400
     if inbox is None:
         return jsonify({'error': 'Resident not found'}), 404
     return jsonify(inbox)
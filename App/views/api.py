@@ -1,56 +1,92 @@
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import (
-    jwt_required,
-    create_access_token,
-    get_jwt_identity,
-    current_user
-)
+from flask_jwt_extended import jwt_required, create_access_token
 import datetime
-import inspect
+from types import MappingProxyType
 
 import App.controllers as controllers
+from App.controllers.auth import current_principal, driver_required, role_required
+from App.controllers.driver import MAX_OPTIMIZE_STOPS, TooManyStops
+from App.controllers.resident import MAX_STOP_BATCH
+from App.database import pool_stats
+from App.hashing import HashingPoolBusy, hashing_stats
+from App.serializers import serialize
+from App.versions import conditional
 
 api = Blueprint('api', __name__, url_prefix='/api/v1')
 
+# Binding used by the handlers -> controller function exported by App.controllers.
+CONTROLLER_BINDINGS = {
+    'find_user': 'get_user_by_username',
+    'create_user': 'create_user',
+    'list_users': 'get_all_users',
+    'get_user': 'get_user',
+    'update_user': 'update_user',
+    'delete_user': 'delete_user',
+    'list_residents': 'list_residents',
+    'get_resident': 'get_resident',
+    'create_resident': 'create_resident',
+    'get_resident_inbox': 'get_resident_inbox',
+    'list_drivers': 'list_drivers',
+    'get_driver': 'get_driver',
+    'create_driver': 'create_driver',
+    'get_driver_schedule': 'get_driver_schedule',
+    'create_recurrence': 'create_recurrence',
+    'list_drives': 'list_drives',
+    'get_drive': 'get_drive',
+    'create_drive': 'create_drive',
+    'optimize_drive': 'optimize_drive',
+    'find_nearby_drives': 'find_nearby_drives',
+    'list_stop_requests': 'list_stop_requests',
+    'get_stop_request': 'get_stop_request',
+    'create_stop_request': 'create_stop_request',
+    'create_stop_requests': 'create_stop_requests',
+    'find_nearby_stops': 'find_nearby_stops',
+    'list_all_data': 'list_all_data',
+}
+
+# Frozen on blueprint registration; handlers index it directly.
+_controllers = MappingProxyType({})
+
+
+def resolve_controllers(bindings=CONTROLLER_BINDINGS):
+    """Resolve every binding once, raising RuntimeError if any controller is missing."""
+    resolved, missing = {}, []
+    for key, name in bindings.items():
+        fn = getattr(controllers, name, None)
+        if callable(fn):
+            resolved[key] = fn
+        else:
+            missing.append(name)
+    if missing:
+        raise RuntimeError(f"api blueprint: missing controllers {', '.join(sorted(missing))}")
+    return MappingProxyType(resolved)
+
+
+@api.record_once
+def _bind_controllers(state):
+    global _controllers
+    _controllers = resolve_controllers()
 
-def _get_controller(name):
-    return getattr(controllers, name, None)
-
-
-def _serialize_obj(obj):
-    if obj is None:
-        return None
-    if isinstance(obj, (str, int, float, bool)):
-        return obj
-    if isinstance(obj, dict):
-        return {k: _serialize_obj(v) for k, v in obj.items()}
-    if isinstance(obj, (list, tuple, set)):
-        return [_serialize_obj(v) for v in obj]
-    to_dict = getattr(obj, "to_dict", None)
-    if callable(to_dict):
-        return to_dict()
-    d = {}
-    for k, v in getattr(obj, "__dict__", {}).items():
-        if k.startswith("_sa_") or k.startswith("_"):
-            continue
-        if inspect.isroutine(v):
-            continue
-        try:
-            _ = v.__class__
-        except Exception:
-            pass
-        d[k] = _serialize_obj(v)
-    if not d:
-        return str(obj)
-    return d
 
+def _nearby_args():
+    """lat/lon (required) and radius in km for the nearby endpoints; ValueError if missing."""
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    if lat is None or lon is None:
+        raise ValueError('lat and lon required')
+    args = {'lat': lat, 'lon': lon, 'limit': request.args.get('limit', type=int)}
+    radius = request.args.get('radius', type=float)
+    if radius is not None:
+        args['radius_km'] = radius
+    return args
 
-def _call_controller(name, *args, **kwargs):
-    fn = _get_controller(name)
-    if not fn:
-        return None, False, f"controller.{name} not implemented"
-    result = fn(*args, **kwargs)
-    return result, True, None
+
+def _page_args():
+    """Keyset pagination params shared by the list endpoints."""
+    return {
+        'limit': request.args.get('limit', type=int),
+        'after_id': request.args.get('after_id', type=int),
+    }
 
 
 # Public auth/login - return JWT access token
@@ -62,72 +98,22 @@ def login_api():
     if not username or not password:
         return jsonify({'error': 'username and password required'}), 400
 
-    # Try several common controller function names to find a user and verify password
-    finder_names = [
-        'get_user_by_username', 'find_user_by_username',
-        'get_user', 'get_user_by_name', 'find_user'
-    ]
-    user = None
-    for name in finder_names:
-        fn = _get_controller(name)
-        if fn:
-            try:
-                sig = inspect.signature(fn)
-                if len(sig.parameters) == 1:
-                    user = fn(username)
-                else:
-                    # fallback: call with username only
-                    user = fn(username)
-            except Exception:
-                try:
-                    user = fn(username)
-                except Exception:
-                    user = None
-        if user:
-            break
-
-    # If controller has an authenticate function, prefer that
-    auth_fn = _get_controller('authenticate') or _get_controller('authenticate_user') or _get_controller('login_user')
-    if auth_fn:
-        try:
-            user = auth_fn(username, password)
-            if isinstance(user, str):
-                return jsonify({'access_token': user}), 200
-        except Exception:
-            pass
-
+    user = _controllers['find_user'](username)
     if not user:
         return jsonify({'error': 'invalid credentials'}), 401
-
-    # verify password: try controller helper names, or user.check_password method
-    verifier = _get_controller('verify_password') or _get_controller('check_password')
-    verified = False
-    if verifier:
-        try:
-            verified = verifier(user, password)
-        except Exception:
-            verified = False
-    else:
-        check = getattr(user, 'check_password', None) or getattr(user, 'verify_password', None)
-        if callable(check):
-            try:
-                verified = check(password)
-            except Exception:
-                verified = False
-        else:
-            if getattr(user, 'password', None) == password:
-                verified = True
-
+    try:
+        verified = user.check_password(password)
+    except HashingPoolBusy:
+        return jsonify({'error': 'too many concurrent logins, retry shortly'}), 503, {'Retry-After': '1'}
     if not verified:
         return jsonify({'error': 'invalid credentials'}), 401
 
-    identity = getattr(user, 'id', None) or getattr(user, 'username', username)
     expires = datetime.timedelta(days=7)
-    token = create_access_token(identity=identity, expires_delta=expires)
+    token = create_access_token(identity=user, expires_delta=expires)
     return jsonify({
         'access_token': token,
         'expires_in': int(expires.total_seconds()),
-        'user': _serialize_obj(user)
+        'user': serialize(user)
     }), 200
 
 
@@ -135,58 +121,49 @@ def login_api():
 @api.post('/users')
 @jwt_required()
 def create_user_api():
-    fn = _get_controller('create_user') or _get_controller('user_create') or _get_controller('register_user')
-    if not fn:
-        return jsonify({'error': 'controller.create_user not implemented'}), 501
+    fn = _controllers['create_user']
     data = request.get_json(force=True, silent=True) or {}
     username = data.get('username')
     password = data.get('password')
     if not username or not password:
         return jsonify({'error': 'username and password required'}), 400
     user = fn(username, password)
-    return jsonify(_serialize_obj(user)), 201
+    return jsonify(serialize(user)), 201
 
 
 @api.get('/users')
 @jwt_required()
 def list_users_api():
-    fn = _get_controller('list_users') or _get_controller('get_all_users') or _get_controller('users_list')
-    if not fn:
-        return jsonify({'error': 'controller.list_users not implemented'}), 501
+    fn = _controllers['list_users']
     users = fn()
-    return jsonify(_serialize_obj(users)), 200
+    return jsonify(serialize(users)), 200
 
 
 @api.get('/users/<int:user_id>')
 @jwt_required()
 def get_user_api(user_id):
-    fn = _get_controller('get_user') or _get_controller('find_user')
-    if not fn:
-        return jsonify({'error': 'controller.get_user not implemented'}), 501
+    fn = _controllers['get_user']
     user = fn(user_id)
     if not user:
         return jsonify({'error': 'User not found'}), 404
-    return jsonify(_serialize_obj(user)), 200
+    return jsonify(serialize(user)), 200
 
 
 @api.put('/users/<int:user_id>')
 @jwt_required()
 def update_user_api(user_id):
-    fn = _get_controller('update_user') or _get_controller('edit_user')
-    if not fn:
-        return jsonify({'error': 'controller.update_user not implemented'}), 501
+    fn = _controllers['update_user']
     data = request.get_json(force=True, silent=True) or {}
     user = fn(user_id, **data)
-    return jsonify(_serialize_obj(user)), 200
+    return jsonify(serialize(user)), 200
 
 
 @api.delete('/users/<int:user_id>')
 @jwt_required()
 def delete_user_api(user_id):
-    fn = _get_controller('delete_user') or _get_controller('remove_user')
-    if not fn:
-        return jsonify({'error': 'controller.delete_user not implemented'}), 501
-    fn(user_id)
+    fn = _controllers['delete_user']
+    if not fn(user_id):
+        return jsonify({'error': 'User not found'}), 404
     return jsonify({'status': 'deleted'}), 200
 
 
@@ -194,197 +171,280 @@ def delete_user_api(user_id):
 @api.get('/residents')
 @jwt_required()
 def list_residents_api():
-    fn = _get_controller('list_residents') or _get_controller('get_all_residents') or _get_controller('list_all_residents')
-    if not fn:
-        lad_fn = _get_controller('list_all_data')
-        if lad_fn:
-            data = lad_fn()
-            return jsonify(_serialize_obj(data.get('residents'))), 200
-        return jsonify({'error': 'controller.list_residents not implemented'}), 501
-    residents = fn()
-    return jsonify(_serialize_obj(residents)), 200
+    fn = _controllers['list_residents']
+    page = fn(street=request.args.get('street'), **_page_args())
+    return jsonify(page), 200
 
 
 @api.get('/residents/<int:resident_id>')
 @jwt_required()
 def get_resident_api(resident_id):
-    fn = _get_controller('get_resident') or _get_controller('find_resident')
-    if not fn:
-        return jsonify({'error': 'controller.get_resident not implemented'}), 501
+    fn = _controllers['get_resident']
     r = fn(resident_id)
     if not r:
         return jsonify({'error': 'Resident not found'}), 404
-    return jsonify(_serialize_obj(r)), 200
+    return jsonify(serialize(r)), 200
 
 
 @api.post('/residents')
 @jwt_required()
 def create_resident_api():
-    fn = _get_controller('create_resident') or _get_controller('resident_create')
-    if not fn:
-        return jsonify({'error': 'controller.create_resident not implemented'}), 501
+    fn = _controllers['create_resident']
     data = request.get_json(force=True, silent=True) or {}
-    r = fn(data.get('name'), data.get('street'))
-    return jsonify(_serialize_obj(r)), 201
+    if not data.get('username') or not data.get('password'):
+        return jsonify({'error': 'username and password required'}), 400
+    r = fn(data['username'], data['password'], name=data.get('name'), street=data.get('street'))
+    return jsonify(serialize(r)), 201
 
 
 @api.get('/residents/<int:resident_id>/inbox')
 @jwt_required()
 def get_resident_inbox_api(resident_id):
-    fn = _get_controller('get_resident_inbox') or _get_controller('resident_inbox')
-    if not fn:
-        return jsonify({'error': 'controller.get_resident_inbox not implemented'}), 501
-    street = request.args.get('street')
-    inbox = fn(resident_id, street)
+    fn = _controllers['get_resident_inbox']
+    try:
+        inbox = fn(
+            resident_id,
+            street=request.args.get('street'),
+            since=request.args.get('since'),
+            **_page_args()
+        )
+    except ValueError:
+        return jsonify({'error': 'since must be an ISO datetime'}), 400
     if inbox is None:
         return jsonify({'error': 'Resident not found'}), 404
-    return jsonify(_serialize_obj(inbox)), 200
+    return jsonify(inbox), 200
 
 
 # Driver endpoints (list, get, create, schedule)
 @api.get('/drivers')
 @jwt_required()
 def list_drivers_api():
-    fn = _get_controller('list_drivers') or _get_controller('get_all_drivers')
-    if not fn:
-        lad_fn = _get_controller('list_all_data')
-        if lad_fn:
-            data = lad_fn()
-            return jsonify(_serialize_obj(data.get('drivers'))), 200
-        return jsonify({'error': 'controller.list_drivers not implemented'}), 501
-    drivers = fn()
-    return jsonify(_serialize_obj(drivers)), 200
+    fn = _controllers['list_drivers']
+    page = fn(status=request.args.get('status'), **_page_args())
+    return jsonify(page), 200
 
 
 @api.get('/drivers/<int:driver_id>')
 @jwt_required()
 def get_driver_api(driver_id):
-    fn = _get_controller('get_driver') or _get_controller('find_driver')
-    if not fn:
-        return jsonify({'error': 'controller.get_driver not implemented'}), 501
+    fn = _controllers['get_driver']
     d = fn(driver_id)
     if not d:
         return jsonify({'error': 'Driver not found'}), 404
-    return jsonify(_serialize_obj(d)), 200
+    return jsonify(serialize(d)), 200
 
 
 @api.post('/drivers')
 @jwt_required()
 def create_driver_api():
-    fn = _get_controller('create_driver') or _get_controller('driver_create')
-    if not fn:
-        return jsonify({'error': 'controller.create_driver not implemented'}), 501
+    fn = _controllers['create_driver']
     data = request.get_json(force=True, silent=True) or {}
-    d = fn(data.get('status'))
-    return jsonify(_serialize_obj(d)), 201
+    if not data.get('username') or not data.get('password'):
+        return jsonify({'error': 'username and password required'}), 400
+    d = fn(data['username'], data['password'], status=data.get('status'))
+    return jsonify(serialize(d)), 201
 
 
 @api.get('/drivers/<int:driver_id>/schedule')
 @jwt_required()
 def get_driver_schedule_api(driver_id):
-    fn = _get_controller('get_driver_schedule') or _get_controller('driver_schedule')
-    if not fn:
-        return jsonify({'error': 'controller.get_driver_schedule not implemented'}), 501
-    schedule = fn(driver_id)
+    fn = _controllers['get_driver_schedule']
+    try:
+        schedule = fn(driver_id, start=request.args.get('start'), end=request.args.get('end'))
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO datetimes'}), 400
     if schedule is None:
         return jsonify({'error': 'Driver not found'}), 404
-    return jsonify(_serialize_obj(schedule)), 200
+    return jsonify(serialize(schedule)), 200
+
+
+@api.post('/drivers/<int:driver_id>/recurrences')
+@jwt_required()
+def create_recurrence_api(driver_id):
+    fn = _controllers['create_recurrence']
+    data = request.get_json(force=True, silent=True) or {}
+    if not data.get('weekdays') or not data.get('at'):
+        return jsonify({'error': 'weekdays and at (HH:MM) required'}), 400
+    try:
+        rule = fn(
+            driver_id,
+            data['weekdays'],
+            data['at'],
+            current_location=data.get('location'),
+            starts_on=data.get('starts_on'),
+            ends_on=data.get('ends_on')
+        )
+    except ValueError:
+        return jsonify({'error': 'invalid weekdays, time or date'}), 400
+    if not rule:
+        return jsonify({'error': 'Driver not found'}), 404
+    return jsonify(serialize(rule)), 201
 
 
 # Drives endpoints (list / get / create)
 @api.get('/drives')
 @jwt_required()
+@conditional('drive')
 def list_drives_api():
-    fn = _get_controller('list_drives') or _get_controller('get_all_drives')
-    if not fn:
-        lad_fn = _get_controller('list_all_data')
-        if lad_fn:
-            data = lad_fn()
-            return jsonify(_serialize_obj(data.get('drives'))), 200
-        return jsonify({'error': 'controller.list_drives not implemented'}), 501
-    drives = fn()
-    return jsonify(_serialize_obj(drives)), 200
+    fn = _controllers['list_drives']
+    page = fn(driver_id=request.args.get('driver_id', type=int), **_page_args())
+    return jsonify(page), 200
+
+
+@api.get('/drives/nearby')
+@jwt_required()
+def nearby_drives_api():
+    fn = _controllers['find_nearby_drives']
+    try:
+        drives = fn(since=request.args.get('since'), **_nearby_args())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'items': drives}), 200
 
 
 @api.get('/drives/<int:drive_id>')
 @jwt_required()
 def get_drive_api(drive_id):
-    fn = _get_controller('get_drive') or _get_controller('find_drive')
-    if not fn:
-        return jsonify({'error': 'controller.get_drive not implemented'}), 501
+    fn = _controllers['get_drive']
     d = fn(drive_id)
     if not d:
         return jsonify({'error': 'Drive not found'}), 404
-    return jsonify(_serialize_obj(d)), 200
+    return jsonify(serialize(d)), 200
 
 
 @api.post('/drives')
 @jwt_required()
 def create_drive_api():
-    fn = _get_controller('create_drive') or _get_controller('drive_create')
-    if not fn:
-        return jsonify({'error': 'controller.create_drive not implemented'}), 501
+    fn = _controllers['create_drive']
     data = request.get_json(force=True, silent=True) or {}
-    drive = fn(
-        data.get('driver_id'),
-        when=data.get('when'),
-        current_location=data.get('location')
-    )
+    try:
+        drive = fn(
+            data.get('driver_id'),
+            when=data.get('when'),
+            current_location=data.get('location'),
+            latitude=data.get('lat'),
+            longitude=data.get('lon')
+        )
+    except ValueError:
+        return jsonify({'error': 'invalid lat/lon'}), 400
     if not drive:
         return jsonify({'error': 'Driver not found or create_drive failed'}), 404
-    return jsonify(_serialize_obj(drive)), 201
+    return jsonify(serialize(drive)), 201
+
+
+@api.post('/drives/<int:drive_id>/optimize')
+@driver_required
+def optimize_drive_api(drive_id):
+    """Reorder the caller's drive; optional body {"time_budget_ms": n} bounds the 2-opt search (max 250)."""
+    fn = _controllers['optimize_drive']
+    data = request.get_json(force=True, silent=True) or {}
+    kwargs = {}
+    if data.get('time_budget_ms') is not None:
+        try:
+            kwargs['time_budget'] = float(data['time_budget_ms']) / 1000
+        except (TypeError, ValueError):
+            return jsonify({'error': 'time_budget_ms must be a number'}), 400
+    drive = _controllers['get_drive'](drive_id)
+    if drive is None:
+        return jsonify({'error': 'Drive not found'}), 404
+    if drive.driver_id != current_principal.id:
+        return jsonify({'error': 'You can only optimize your own drives'}), 403
+    try:
+        result = fn(drive_id, **kwargs)
+    except TooManyStops:
+        return jsonify({'error': f'at most {MAX_OPTIMIZE_STOPS} stops per optimized drive'}), 413
+    if result is None:
+        return jsonify({'error': 'Drive not found'}), 404
+    return jsonify(result), 200
 
 
 # Stops endpoints (list / get / create)
 @api.get('/stops')
 @jwt_required()
 def list_stops_api():
-    fn = _get_controller('list_stops') or _get_controller('get_all_stop_requests') or _get_controller('list_stop_requests')
-    if not fn:
-        lad_fn = _get_controller('list_all_data')
-        if lad_fn:
-            data = lad_fn()
-            return jsonify(_serialize_obj(data.get('stop_requests')) or _serialize_obj(data.get('stoprequests'))), 200
-        return jsonify({'error': 'controller.list_stops not implemented'}), 501
-    stops = fn()
-    return jsonify(_serialize_obj(stops)), 200
+    fn = _controllers['list_stop_requests']
+    page = fn(
+        drive_id=request.args.get('drive_id', type=int),
+        requestee_id=request.args.get('resident_id', type=int),
+        street=request.args.get('street'),
+        **_page_args()
+    )
+    return jsonify(page), 200
+
+
+@api.get('/stops/nearby')
+@jwt_required()
+def nearby_stops_api():
+    fn = _controllers['find_nearby_stops']
+    try:
+        stops = fn(drive_id=request.args.get('drive_id', type=int), **_nearby_args())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'items': stops}), 200
 
 
 @api.get('/stops/<int:stop_id>')
 @jwt_required()
 def get_stop_api(stop_id):
-    fn = _get_controller('get_stop_request') or _get_controller('get_stop') or _get_controller('find_stop')
-    if not fn:
-        return jsonify({'error': 'controller.get_stop_request not implemented'}), 501
+    fn = _controllers['get_stop_request']
     s = fn(stop_id)
     if not s:
         return jsonify({'error': 'Stop not found'}), 404
-    return jsonify(_serialize_obj(s)), 200
+    return jsonify(serialize(s)), 200
 
 
 @api.post('/stops')
 @jwt_required()
 def create_stop_request_api():
-    fn = _get_controller('create_stop_request') or _get_controller('stop_request_create')
-    if not fn:
-        return jsonify({'error': 'controller.create_stop_request not implemented'}), 501
+    fn = _controllers['create_stop_request']
     data = request.get_json(force=True, silent=True) or {}
-    stop = fn(
-        data.get('resident_id'),
-        data.get('drive_id'),
-        data.get('street')
-    )
+    try:
+        stop = fn(
+            data.get('resident_id'),
+            data.get('drive_id'),
+            data.get('street'),
+            latitude=data.get('lat'),
+            longitude=data.get('lon')
+        )
+    except ValueError as e:
+        return jsonify({'error': f'invalid lat/lon: {e}'}), 400
     if not stop:
         return jsonify({'error': 'Resident or Drive not found'}), 404
-    return jsonify(_serialize_obj(stop)), 201
+    return jsonify(serialize(stop)), 201
+
+
+@api.post('/stops/batch')
+@jwt_required()
+def create_stop_requests_api():
+    """Body: {"resident_id": default, "items": [{"drive_id", "street"?, "resident_id"?}, ...]}
+    or a bare list of items. 201 if every item was created, 207 if some failed, 422 if none did.
+    """
+    fn = _controllers['create_stop_requests']
+    data = request.get_json(force=True, silent=True)
+    if isinstance(data, list):
+        data = {'items': data}
+    items = (data or {}).get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'items must be a non-empty list'}), 400
+    if len(items) > MAX_STOP_BATCH:
+        return jsonify({'error': f'at most {MAX_STOP_BATCH} items per batch'}), 413
+    results = fn(items, resident_id=data.get('resident_id'))
+    created = sum(1 for r in results if r['status'] == 'created')
+    status = 201 if created == len(results) else 207 if created else 422
+    return jsonify({'created': created, 'failed': len(results) - created, 'results': results}), status
 
 
 # Utility: list all data
 @api.get('/list-all-data')
 @jwt_required()
 def api_list_all_data():
-    fn = _get_controller('list_all_data')
-    if not fn:
-        return jsonify({'error': 'controller.list_all_data not implemented'}), 501
+    fn = _controllers['list_all_data']
     data = fn()
-    return jsonify(_serialize_obj(data)), 200
\ No newline at end of file
+    return jsonify(serialize(data)), 200
+
+
+# Worker internals; /health stays a bare liveness check
+@api.get('/metrics')
+@role_required('user')
+def metrics_api():
+    return jsonify({'hashing': hashing_stats(), 'db_pool': pool_stats()}), 200
@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, jsonify, request, flash, send_from
 from flask_jwt_extended import jwt_required, get_jwt_identity, current_user, unset_jwt_cookies, create_access_token, set_access_cookies
 from App.models import User, Driver, Resident
 from App.database import db
+from App.hashing import HashingPoolBusy
 
 import json
 
@@ -9,6 +10,7 @@ from.index import index_views
 
 from App.controllers import (
     login,
+    get_user_by_username,
 
 )
 
@@ -30,7 +32,10 @@ def identify_page():
 @auth_views.route('/login', methods=['POST'])
 def login_action():
     data = request.form
-    token = login(data['username'], data['password'])
+    try:
+        token = login(data['username'], data['password'])
+    except HashingPoolBusy:
+        return jsonify(message='Too many concurrent logins, try again shortly'), 503, {'Retry-After': '1'}
     response = redirect(request.referrer)
     if not token:
         flash('Bad username or password given'), 401
@@ -58,13 +63,13 @@ def user_login_api():
     if not username or not password:
         return jsonify(message='Username and password required'), 400
 
-    user = Resident.query.filter_by(username=username).first()
-    if not user:
-        user = Driver.query.filter_by(username=username).first()
-    if not user:
-        user = User.query.filter_by(username=username).first()
+    user = get_user_by_username(username)
 
-    if not user or not user.check_password(password):
+    try:
+        verified = user is not None and user.check_password(password)
+    except HashingPoolBusy:
+        return jsonify(message='Too many concurrent logins, try again shortly'), 503, {'Retry-After': '1'}
+    if not verified:
         return jsonify(message='Bad username or password given'), 401
 
     access_token = create_access_token(identity=user)
@@ -72,7 +77,7 @@ def user_login_api():
     response = jsonify({
         "message": f"Logged in as {user.username}",
         "access_token": access_token,
-        "role": user.__class__.__name__.lower()
+        "role": user.role
     })
     set_access_cookies(response, access_token)
     return response, 200
@@ -80,10 +85,10 @@ def user_login_api():
 @auth_views.route('/api/identify', methods=['GET'])
 @jwt_required()
 def identify_user():
-    if not current_user:
+    if not current_user or current_user.record is None:
         return jsonify({'error': 'No user found for this token'}), 401
 
-    role = current_user.__class__.__name__.lower()
+    role = current_user.role
     return jsonify({
         'username': current_user.username,
         'id': current_user.id,
@@ -1,6 +1,5 @@
-from flask import Blueprint, render_template, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity, current_user
-import json
+from flask import Blueprint, Response, render_template, jsonify, request, stream_with_context
+from datetime import datetime
 
 from App.controllers import (
     create_resident,
@@ -9,26 +8,39 @@ from App.controllers import (
     create_drive,
     get_driver_schedule,
     get_resident_inbox,
-    get_resident,
-    get_driver
+    get_resident_notifications,
+    mark_notifications_read,
+    get_driver,
+    resolve_drive,
+    set_driver_status
 )
-from App.controllers.admin import list_all_data
-from App.models import Driver, Drive, Resident
-from App.database import db
+from App.controllers.admin import DataSnapshot, list_all_data
+from App.controllers.auth import current_principal, driver_required, resident_required
+from App.database import db, replica_reads
+from App.events import stream_events
+from App.notifications import notify_drive_update
+from App.versions import conditional
+from App.cache import cached
 
 transport_views = Blueprint('transport_views', __name__, template_folder='../templates')
 
-import json
-from flask_jwt_extended import get_jwt_identity
+SNAPSHOT_TABLES = ('user', 'driver', 'resident', 'drive', 'stop_request')
+SCHEDULE_TABLES = ('driver', 'drive', 'stop_request', 'drive_recurrence')
+
+def _schedule_vary():
+    # without a start, recurring drives are expanded from the current minute
+    now = None if request.args.get('start') else datetime.now().strftime('%Y%m%d%H%M')
+    return (current_principal.id, now)
 
 @transport_views.route('/transport', methods=['GET'])
 def transport_page():
     return render_template('transport.html')
 
 @transport_views.route('/api/transport/options', methods=['GET'])
+@replica_reads
+@cached(*SNAPSHOT_TABLES)
 def transport_options():
-    data = list_all_data() or {}
-    print(data)
+    data = DataSnapshot()
 
     drivers = []
     for d in data.get('drivers', []):
@@ -87,21 +99,19 @@ def api_create_driver():
     }), 201
 
 @transport_views.route('/api/transport/create-drive', methods=['POST'])
-@jwt_required()
+@driver_required
 def api_create_drive():
-    if not isinstance(current_user, Driver):
-        return jsonify({"error": "Only drivers can create drives"}), 403
    
     payload = request.get_json() or {}
     when = payload.get('when')
     location = payload.get('location')
 
-    drive = create_drive(current_user.id, when=when, current_location=location)
+    drive = create_drive(current_principal.id, when=when, current_location=location)
     if not drive:
         return jsonify({'error': 'Drive could not be created'}), 400
 
     return jsonify({
-        'message': f"Drive created for driver {current_user.username}",
+        'message': f"Drive created for driver {current_principal.username}",
         'id': drive.id,
         'driver_id': drive.driver_id,
         'datetime': drive.datetime.strftime("%Y-%m-%d %H:%M"),
@@ -110,21 +120,19 @@ def api_create_drive():
 
 
 @transport_views.route('/api/transport/create-stop', methods=['POST'])
-@jwt_required()
+@resident_required
 def api_create_stop():
-    if not isinstance(current_user, Resident):
-        return jsonify({"error": "Only residents can create stop requests"}), 403
    
     payload = request.get_json() or {}
     drive_id = payload.get('drive_id')
     street = payload.get('street')
 
-    sr = create_stop_request(current_user.id, drive_id, street)
+    sr = create_stop_request(current_principal.id, drive_id, street)
     if not sr:
         return jsonify({'error': 'Stop request could not be created'}), 400
 
     return jsonify({
-        'message': f"Stop request created for resident {current_user.username}",
+        'message': f"Stop request created for resident {current_principal.username}",
         'id': sr.id,
         'drive_id': sr.drive_id,
         'requestee_id': sr.requestee_id,
@@ -133,26 +141,27 @@ def api_create_stop():
     }), 201
     
 @transport_views.route('/api/transport/driver-schedule', methods=['GET'])
-@jwt_required()
+@driver_required
+@replica_reads
+@conditional(*SCHEDULE_TABLES, vary=_schedule_vary)
 def api_driver_schedule():
-    print ("Current User Type:", type(current_user))
-    if not isinstance(current_user, Driver):
-        return jsonify({"error": "Only drivers can view their schedule"}), 403
-    print ("Current User ID:", current_user.id)
     driver_id = request.args.get('driver_id', type=int)
     if not driver_id:
-        driver_id = current_user.id
-    print ("Driver ID:", driver_id)
+        driver_id = current_principal.id
     driver = get_driver(driver_id)
     if not driver:
         return jsonify({"error": "Driver not found"}), 404
-    schedule = get_driver_schedule(driver_id)
+    try:
+        schedule = get_driver_schedule(driver_id, start=request.args.get('start'), end=request.args.get('end'))
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO datetimes'}), 400
     
     result = []
     for d in schedule:
         result.append(
             {
             'id': d.id,
+            'key': getattr(d, 'key', None),
             'datetime': d.datetime.strftime("%Y-%m-%d %H:%M"),
             'driver_id': d.driver_id,
             'stops': [s.id for s in d.stops]
@@ -161,52 +170,38 @@ def api_driver_schedule():
     return jsonify(result), 200
 
 @transport_views.route('/api/transport/resident-inbox', methods=['GET'])
-@jwt_required()
+@resident_required
+@replica_reads
 def api_resident_inbox():
-    if not isinstance(current_user, Resident):
-        return jsonify({"error": "Only residents can view their inbox"}), 403
-
-    # Inline identify resident logic
-    resident = None
-    resident_id = request.args.get('resident_id', type=int)
-    if resident_id:
-        resident = db.session.get(Resident, resident_id)
-    if not resident:
-        # Try by username from current_user
-        if hasattr(current_user, 'username'):
-            resident = db.session.query(Resident).filter_by(username=current_user.username).first()
-    if not resident:
-        # Fallback: if current_user is a Resident, use it
-        if isinstance(current_user, Resident):
-            resident = current_user
-    print("Resident resolved as:", resident)
-    if not resident:
+
+    # Residents may read another resident's inbox by id; default to the caller's own.
+    resident_id = request.args.get('resident_id', type=int) or current_principal.id
+
+    try:
+        inbox = get_resident_inbox(
+            resident_id,
+            street=request.args.get('street'),
+            since=request.args.get('since'),
+            limit=request.args.get('limit', type=int),
+            after_id=request.args.get('after_id', type=int)
+        )
+    except ValueError:
+        return jsonify({'error': 'since must be an ISO datetime'}), 400
+    if inbox is None:
         return jsonify({"error": "Resident not found"}), 404
-    
-    street = request.args.get('street')
-    inbox = get_resident_inbox(resident_id, street)
-    
-    result = []
-    for sr in inbox:
-      result.append({
-            'id': sr.id,
-            'street_name': sr.street_name,
-            'requestee_id': sr.requestee_id,
-            'drive_id': sr.drive_id,
-            'created_at': sr.created_at.strftime("%Y-%m-%d %H:%M")
-        })
-    return jsonify(result), 200
+    return jsonify(inbox), 200
 
 @transport_views.route('/api/transport/list-all', methods=['GET'])
+@replica_reads
+@conditional(*SNAPSHOT_TABLES)
+@cached(*SNAPSHOT_TABLES)
 def api_list_all():
     data = list_all_data()
     return jsonify(data)
 
 @transport_views.route('/api/transport/update-drive', methods=['POST'])
-@jwt_required()
+@driver_required
 def api_update_drive():
-    if not isinstance(current_user, Driver):
-        return jsonify({"error": "Only drivers can update drives"}), 403
     
     payload = request.get_json() or {}
     drive_id = payload.get('id')
@@ -216,24 +211,40 @@ def api_update_drive():
     if not drive_id:
         return jsonify({'error': 'Drive ID required'}), 400 
 
-    drive = db.session.get(Drive, int(drive_id)) if drive_id else None
+    # an occurrence key materializes that occurrence of a recurring drive
+    drive = resolve_drive(drive_id)
     if not drive:
         return jsonify({'error': 'Drive not found'}), 404
     
-    if drive.driver_id != current_user.id:
+    if drive.driver_id != current_principal.id:
+        db.session.rollback()
         return jsonify({'error': 'You can only update your own drives'}), 403
 
+    changes = {}
     if dt:
         from datetime import datetime as dtmod
         try:
-            drive.datetime = dtmod.fromisoformat(dt)
+            when = dtmod.fromisoformat(dt)
         except Exception:
+            db.session.rollback()
             return jsonify({'error': 'Invalid datetime format'}), 400
+        if when != drive.datetime:
+            drive.datetime = changes['datetime'] = when
     
-    if location is not None:
-        drive.current_location = location
+    if location is not None and location != drive.current_location:
+        drive.current_location = changes['current_location'] = location
+
+    if 'lat' in payload or 'lon' in payload:
+        try:
+            drive.set_position(payload.get('lat'), payload.get('lon'))
+        except (TypeError, ValueError):
+            db.session.rollback()
+            return jsonify({'error': 'Invalid lat/lon'}), 400
     
     db.session.commit()
+    if changes:
+        # residents with stops on this drive are notified in the background
+        notify_drive_update(drive.id, changes)
 
     return jsonify({
         'message': f"Drive updated successfully",
@@ -242,3 +253,53 @@ def api_update_drive():
         'current_location': drive.current_location
     }), 200
 
+
+@transport_views.route('/api/transport/driver-status', methods=['POST'])
+@driver_required
+def api_driver_status():
+    payload = request.get_json() or {}
+    status = payload.get('status')
+    if not status:
+        return jsonify({'error': 'status required'}), 400
+    driver = set_driver_status(current_principal.id, status)
+    if not driver:
+        return jsonify({'error': 'Driver not found'}), 404
+    return jsonify({'id': driver.id, 'status': driver.status}), 200
+
+@transport_views.route('/api/transport/events', methods=['GET'])
+def api_transport_events():
+    """Server-Sent Events: drive.created, drive.updated, stop.requested, driver.status.
+
+    Browsers resume with the Last-Event-ID header on reconnect; ?last_event_id= does the
+    same for the first connection.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({'error': 'Last-Event-ID must be an integer'}), 400
+    stream = stream_events(db.engine, last_event_id)
+    return Response(stream_with_context(stream), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@transport_views.route('/api/transport/notifications', methods=['GET'])
+@resident_required
+def api_resident_notifications():
+    page = get_resident_notifications(
+        current_principal.id,
+        limit=request.args.get('limit', type=int),
+        after_id=request.args.get('after_id', type=int),
+        unread_only=request.args.get('unread') in ('1', 'true')
+    )
+    return jsonify(page), 200
+
+@transport_views.route('/api/transport/notifications/read', methods=['POST'])
+@resident_required
+def api_mark_notifications_read():
+    payload = request.get_json(silent=True) or {}
+    ids = payload.get('ids')
+    if ids is not None and not (isinstance(ids, list) and all(isinstance(i, int) for i in ids)):
+        return jsonify({'error': 'ids must be a list of integers'}), 400
+    return jsonify({'marked': mark_notifications_read(current_principal.id, ids)}), 200
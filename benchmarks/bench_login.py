@@ -0,0 +1,109 @@
+"""Login lookup cost and end-to-end /api/login throughput by role.
+
+Compares the old three-query lookup (Resident, then Driver, then User by
+username) against the single with_polymorphic query in get_user_by_username,
+then drives POST /api/login through the test client. End-to-end numbers are
+dominated by the password hash, so the lookup is also timed on its own.
+
+Usage (from the repo root):
+
+    python benchmarks/bench_login.py --users 300 --logins 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from App.main import create_app
+from App.database import db
+from App.models import User, Driver, Resident
+from App.controllers import get_user_by_username
+
+ROLES = ('user', 'driver', 'resident')
+
+
+def legacy_lookup(username):
+    """The lookup chain /api/login used before the polymorphic query."""
+    user = Resident.query.filter_by(username=username).first()
+    if not user:
+        user = Driver.query.filter_by(username=username).first()
+    if not user:
+        user = User.query.filter_by(username=username).first()
+    return user
+
+
+def seed(per_role):
+    db.drop_all()
+    db.create_all()
+    password = generate_password_hash('bench')
+    next_id = 1
+    for role in ROLES:
+        rows = [{'id': next_id + i, 'username': f'{role}{i}', 'password': password, 'role': role} for i in range(per_role)]
+        db.session.execute(User.__table__.insert(), rows)
+        if role == 'driver':
+            db.session.execute(Driver.__table__.insert(), [{'id': r['id'], 'status': 'active'} for r in rows])
+        elif role == 'resident':
+            db.session.execute(Resident.__table__.insert(), [{'id': r['id'], 'street': 'Main St'} for r in rows])
+        next_id += per_role
+    db.session.commit()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.n = 0
+
+    def __call__(self, *args, **kwargs):
+        self.n += 1
+
+
+def bench_lookup(fn, role, per_role, repeat):
+    counter = QueryCounter()
+    event.listen(db.engine, 'before_cursor_execute', counter)
+    timings = []
+    try:
+        for _ in range(repeat):
+            for i in range(per_role):
+                db.session.expunge_all()
+                t0 = time.perf_counter()
+                fn(f'{role}{i}')
+                timings.append(time.perf_counter() - t0)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', counter)
+    return statistics.mean(timings) * 1e6, counter.n / len(timings)
+
+
+def bench_http(client, role, logins):
+    t0 = time.perf_counter()
+    for i in range(logins):
+        response = client.post('/api/login', json={'username': f'{role}{i}', 'password': 'bench'})
+        assert response.status_code == 200, response.get_data(as_text=True)
+    return logins / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=300, help='users seeded per role')
+    parser.add_argument('--logins', type=int, default=50, help='HTTP logins per role')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'TESTING': True})
+    seed(args.users)
+    client = app.test_client()
+
+    print(f'{"role":<10} {"legacy us":>10} {"q/login":>8} {"poly us":>10} {"q/login":>8} {"HTTP logins/s":>14}')
+    for role in ROLES:
+        legacy_us, legacy_q = bench_lookup(legacy_lookup, role, args.users, args.repeat)
+        poly_us, poly_q = bench_lookup(get_user_by_username, role, args.users, args.repeat)
+        throughput = bench_http(client, role, min(args.logins, args.users))
+        print(f'{role:<10} {legacy_us:10.1f} {legacy_q:8.1f} {poly_us:10.1f} {poly_q:8.1f} {throughput:14.1f}')
+
+
+if __name__ == '__main__':
+    main()
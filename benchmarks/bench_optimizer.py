@@ -0,0 +1,93 @@
+"""Stop ordering for one drive at 10, 100 and 500 stops: route length and time of
+request order, nearest neighbour, and nearest neighbour + 2-opt, plus the full
+optimize_drive round trip (load, geocode, order, persist) on a seeded in-memory
+SQLite database. Half the stops are placed through the street_location table.
+
+Usage (from the repo root):
+
+    python benchmarks/bench_optimizer.py --sizes 10 100 500 --budget-ms 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from App.main import create_app
+from App.database import db
+from App.models import User, Driver, Drive, StopRequest, StreetLocation
+from App.controllers import optimize_drive
+from App import route_optimizer
+
+DEPOT = (52.52, 13.405)
+
+
+def scatter(n, rng):
+    """n points within roughly 10 km of the depot."""
+    return [(DEPOT[0] + rng.uniform(-0.09, 0.09), DEPOT[1] + rng.uniform(-0.15, 0.15)) for _ in range(n)]
+
+
+def seed(drive_id, points):
+    db.session.execute(Drive.__table__.insert(), [{
+        'id': drive_id, 'driver_id': 1, 'datetime': datetime(2026, 1, 1), 'current_location': 'Depot',
+        'latitude': DEPOT[0], 'longitude': DEPOT[1]
+    }])
+    db.session.execute(StreetLocation.__table__.insert(), [
+        {'name': f'Street {drive_id}-{i}', 'latitude': lat, 'longitude': lon}
+        for i, (lat, lon) in enumerate(points) if i % 2
+    ])
+    db.session.execute(StopRequest.__table__.insert(), [
+        {'drive_id': drive_id, 'street_name': f'Street {drive_id}-{i}', 'created_at': datetime(2026, 1, 1),
+         'latitude': None if i % 2 else lat, 'longitude': None if i % 2 else lon}
+        for i, (lat, lon) in enumerate(points)
+    ])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--budget-ms', type=float, default=200)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    db.create_all()
+    db.session.execute(User.__table__.insert(), [{'id': 1, 'username': 'bench', 'password': 'x', 'role': 'driver'}])
+    db.session.execute(Driver.__table__.insert(), [{'id': 1, 'status': 'active'}])
+    db.session.commit()
+
+    rng = random.Random(args.seed)
+    budget = args.budget_ms / 1000
+    print(f'numpy={"yes" if route_optimizer.numpy_or_none() is not None else "no"}  2-opt budget {args.budget_ms:.0f} ms')
+    print(f'{"stops":>6} {"request km":>11} {"greedy km":>10} {"greedy ms":>10} '
+          f'{"2-opt km":>9} {"2-opt ms":>9} {"passes":>7} {"done":>5} {"end-to-end ms":>14}')
+    for drive_id, n in enumerate(args.sizes, start=1):
+        points = scatter(n, rng)
+        lats = [DEPOT[0]] + [p[0] for p in points]
+        lons = [DEPOT[1]] + [p[1] for p in points]
+
+        t0 = time.perf_counter()
+        dist = route_optimizer.distance_matrix(lats, lons)
+        greedy = route_optimizer.nearest_neighbour(dist)
+        greedy_ms = (time.perf_counter() - t0) * 1000
+        request_km = route_optimizer.path_length(dist, list(range(n + 1)))
+
+        _, stats = route_optimizer.optimize_path(lats, lons, budget)
+
+        seed(drive_id, points)
+        t0 = time.perf_counter()
+        result = optimize_drive(drive_id, time_budget=budget)
+        end_to_end_ms = (time.perf_counter() - t0) * 1000
+        assert len(result['stops']) == n and not result['unlocated']
+
+        print(f'{n:>6} {request_km:>11.1f} {route_optimizer.path_length(dist, greedy):>10.1f} {greedy_ms:>10.2f} '
+              f'{stats["length_km"]:>9.1f} {stats["elapsed_ms"]:>9.2f} {stats["passes"]:>7} '
+              f'{"yes" if stats["completed"] else "no":>5} {end_to_end_ms:>14.2f}')
+
+
+if __name__ == '__main__':
+    main()
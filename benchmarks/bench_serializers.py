@@ -0,0 +1,97 @@
+"""Per-object cost of App.serializers.serialize against the reflective
+_serialize_obj it replaced in App/views/api.py, over drives loaded from a
+seeded in-memory SQLite database.
+
+Usage (from the repo root):
+
+    python benchmarks/bench_serializers.py --drives 10000
+"""
+import argparse
+import inspect
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from App.main import create_app
+from App.database import db
+from App.models import User, Driver, Drive
+from App.serializers import serialize
+
+
+def legacy_serialize_obj(obj):
+    """Verbatim copy of the old App.views.api._serialize_obj, kept here as the baseline."""
+    if obj is None:
+        return None
+    if isinstance(obj, (str, int, float, bool)):
+        return obj
+    if isinstance(obj, dict):
+        return {k: legacy_serialize_obj(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, set)):
+        return [legacy_serialize_obj(v) for v in obj]
+    to_dict = getattr(obj, "to_dict", None)
+    if callable(to_dict):
+        return to_dict()
+    d = {}
+    for k, v in getattr(obj, "__dict__", {}).items():
+        if k.startswith("_sa_") or k.startswith("_"):
+            continue
+        if inspect.isroutine(v):
+            continue
+        try:
+            _ = v.__class__
+        except Exception:
+            pass
+        d[k] = legacy_serialize_obj(v)
+    if not d:
+        return str(obj)
+    return d
+
+
+def seed(n):
+    db.create_all()
+    db.session.execute(User.__table__.insert(), [{'id': 1, 'username': 'bench', 'password': 'x', 'role': 'driver'}])
+    db.session.execute(Driver.__table__.insert(), [{'id': 1, 'status': 'active'}])
+    start = datetime(2026, 1, 1)
+    db.session.execute(Drive.__table__.insert(), [
+        {'driver_id': 1, 'datetime': start + timedelta(minutes=i), 'current_location': f'Stop {i % 50}'}
+        for i in range(n)
+    ])
+    db.session.commit()
+
+
+def timeit(fn, drives, repeat):
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(drives)
+        runs.append(time.perf_counter() - t0)
+    return statistics.median(runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--drives', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args()
+
+    create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    seed(args.drives)
+    drives = db.session.scalars(db.select(Drive)).all()
+
+    results = [
+        ('legacy _serialize_obj', timeit(legacy_serialize_obj, drives, args.repeat)),
+        ('compiled serialize', timeit(serialize, drives, args.repeat)),
+    ]
+    baseline = results[0][1]
+    print(f'{len(drives)} drives, median of {args.repeat} runs')
+    for name, seconds in results:
+        per_object = seconds / len(drives) * 1e6
+        print(f'  {name:<24} {seconds * 1000:8.2f} ms total  {per_object:6.2f} us/object  {baseline / seconds:5.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Concurrent stop-request writes against one SQLite file from several worker
+processes, with the default engine and with the production SQLite profile
+(WAL, synchronous=NORMAL, busy_timeout, cache_size, mmap_size; see
+App/database.py). Each worker loops over create_stop_request, the resident
+write path, for a fixed duration; failures are mostly "database is locked".
+
+Usage (from the repo root):
+
+    python benchmarks/bench_sqlite_concurrency.py --workers 4 --seconds 5
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+MODES = {
+    'default': {},
+    'production': {'DB_ENGINE_MODE': 'production'},
+}
+
+
+def _app(uri, mode):
+    from App.main import create_app
+    return create_app(dict(MODES[mode], SQLALCHEMY_DATABASE_URI=uri, NOTIFICATIONS_ASYNC=False,
+                           CACHE_BACKEND='null'))
+
+
+def seed(uri, mode, workers):
+    from App.database import db
+    from App.controllers import create_driver, create_drive, create_resident
+    _app(uri, mode)
+    db.create_all()
+    driver = create_driver('bench_driver', 'x', status='active')
+    drive = create_drive(driver.id, current_location='Depot')
+    residents = [create_resident(f'bench_res{i}', 'x', name=f'R{i}', street='Main St').id for i in range(workers)]
+    drive_id = drive.id
+    db.session.remove()
+    return drive_id, residents
+
+
+def worker(uri, mode, drive_id, resident_id, seconds, start_at, results):
+    from App.controllers import create_stop_request
+    _app(uri, mode)
+    ok = failed = 0
+    latencies = []
+    while time.time() < start_at:
+        time.sleep(0.001)
+    deadline = start_at + seconds
+    while time.time() < deadline:
+        t0 = time.perf_counter()
+        stop = create_stop_request(resident_id, drive_id, None)
+        latencies.append(time.perf_counter() - t0)
+        if stop is None:
+            failed += 1
+        else:
+            ok += 1
+    results.put((ok, failed, latencies))
+
+
+def run(mode, workers, seconds):
+    directory = tempfile.mkdtemp(prefix='bench-sqlite-')
+    uri = f"sqlite:///{os.path.join(directory, f'{mode}.db')}"
+    drive_id, residents = seed(uri, mode, workers)
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    start_at = time.time() + 3.0  # give every process time to import and start
+    procs = [ctx.Process(target=worker, args=(uri, mode, drive_id, rid, seconds, start_at, results))
+             for rid in residents]
+    for p in procs:
+        p.start()
+    outcomes = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    ok = sum(o[0] for o in outcomes)
+    failed = sum(o[1] for o in outcomes)
+    latencies = sorted(l for o in outcomes for l in o[2])
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+    return {
+        'mode': mode, 'writes_per_sec': ok / seconds, 'ok': ok, 'failed': failed,
+        'median_ms': statistics.median(latencies) * 1000 if latencies else 0.0, 'p95_ms': p95 * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['default', 'production'])
+    args = parser.parse_args()
+
+    print(f'{args.workers} worker processes, {args.seconds:.0f} s per mode')
+    print(f'  {"mode":<11} {"writes/s":>9} {"ok":>7} {"failed":>7} {"median ms":>10} {"p95 ms":>8}')
+    for mode in args.modes:
+        r = run(mode, args.workers, args.seconds)
+        print(f'  {r["mode"]:<11} {r["writes_per_sec"]:>9.1f} {r["ok"]:>7} {r["failed"]:>7} '
+              f'{r["median_ms"]:>10.2f} {r["p95_ms"]:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Startup cost: `-X importtime` breakdown, `flask --help` and time-to-first-request.
+
+Each measurement runs in a fresh interpreter, so it includes Python's own start-up:
+
+- import:        `import wsgi` (what gunicorn and every `flask` command pay first)
+- cli-help:      `flask --app wsgi --help` (builds the CLI app to list commands)
+- first-request: import wsgi, build the server app, answer GET /health
+
+Medians are checked against the budget in startup_budget.json (milliseconds), and
+`import wsgi` must not load any of its `lazy_modules`. Exits 1 when over budget, so
+it can gate CI; pass --write-budget to record the current medians plus --headroom.
+
+Usage (from the repo root):
+
+    python benchmarks/bench_startup.py --runs 5 --top 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_budget.json')
+
+FIRST_REQUEST = (
+    "import wsgi\n"
+    "response = wsgi.app.test_client().get('/health')\n"
+    "assert response.status_code == 200, response.status_code\n"
+)
+LOADED_MODULES = "import sys, wsgi; print(' '.join(sorted(sys.modules)))"
+
+
+def run(args, env):
+    started = time.perf_counter()
+    subprocess.run(args, cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    return (time.perf_counter() - started) * 1000
+
+
+def median_ms(args, env, runs):
+    run(args, env)  # warm the bytecode and OS file caches
+    return statistics.median(run(args, env) for _ in range(runs))
+
+
+def import_breakdown(env):
+    """Self time (ms) per top-level package and cumulative time of `import wsgi`, from -X importtime."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import wsgi'], cwd=ROOT, env=env,
+                            check=True, capture_output=True, text=True)
+    per_package = defaultdict(float)
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        per_package[package] += int(self_us) / 1000
+        if name.strip() == 'wsgi':
+            total = int(cumulative_us) / 1000
+    return total, sorted(per_package.items(), key=lambda item: -item[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Timed runs per measurement (median reported)')
+    parser.add_argument('--top', type=int, default=15, help='Packages shown in the import breakdown')
+    parser.add_argument('--budget', default=BUDGET_PATH, help='Budget file')
+    parser.add_argument('--write-budget', action='store_true', help='Record current medians (+ headroom) as the budget')
+    parser.add_argument('--headroom', type=float, default=0.5, help='Fraction added on top of medians by --write-budget')
+    args = parser.parse_args()
+
+    with open(args.budget) as f:
+        budget = json.load(f)
+
+    workdir = tempfile.mkdtemp(prefix='bench-startup-')
+    env = dict(os.environ, FLASK_SQLALCHEMY_DATABASE_URI=f'sqlite:///{os.path.join(workdir, "bench.db")}')
+    env.pop('PYTHONPROFILEIMPORTTIME', None)
+
+    total, packages = import_breakdown(env)
+    print(f'import wsgi: {total:.1f} ms cumulative (-X importtime, one run)')
+    for package, ms in packages[:args.top]:
+        print(f'  {package:<28} {ms:8.1f} ms')
+
+    loaded = set(subprocess.run([sys.executable, '-c', LOADED_MODULES], cwd=ROOT, env=env, check=True,
+                                capture_output=True, text=True).stdout.split())
+    eager = sorted(name for name in budget['lazy_modules'] if name in loaded)
+
+    medians = {
+        'import': median_ms([sys.executable, '-c', 'import wsgi'], env, args.runs),
+        'cli-help': median_ms([sys.executable, '-m', 'flask', '--app', 'wsgi', '--help'], env, args.runs),
+        'first-request': median_ms([sys.executable, '-c', FIRST_REQUEST], env, args.runs),
+    }
+
+    print(f'\n{"measurement":<16}{"median ms":>12}{"budget ms":>12}')
+    over = []
+    for name, ms in medians.items():
+        limit = budget['ms'].get(name)
+        flag = ''
+        if limit is not None and ms > limit:
+            over.append(name)
+            flag = '  OVER'
+        print(f'{name:<16}{ms:12.1f}{limit if limit is not None else "-":>12}{flag}')
+    if eager:
+        print(f'\nimport wsgi loaded modules that should load lazily: {", ".join(eager)}')
+
+    if args.write_budget:
+        budget['ms'] = {name: round(ms * (1 + args.headroom)) for name, ms in medians.items()}
+        with open(args.budget, 'w') as f:
+            json.dump(budget, f, indent=2)
+            f.write('\n')
+        print(f'\nbudget written to {args.budget}')
+        return 0
+    return 1 if over or eager else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
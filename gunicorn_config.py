@@ -1,5 +1,6 @@
 # gunicorn_config.py
 import multiprocessing
+import os
 
 # The socket to bind.
 # "0.0.0.0" to bind to all interfaces. 8000 is the port number.
@@ -11,6 +12,13 @@ workers = 4
 # Use the 'gevent' worker type for async performance.
 worker_class = 'gevent'
 
+# Greenlets per worker; the database pool is sized from this (see App/database.py)
+worker_connections = 100
+
+# Green psycopg2, pre-pinged pool sized to the greenlet concurrency
+os.environ.setdefault('FLASK_DB_ENGINE_MODE', 'production')
+os.environ.setdefault('FLASK_DB_GREENLET_CONCURRENCY', str(worker_connections))
+
 # Log level
 loglevel = 'info'
 
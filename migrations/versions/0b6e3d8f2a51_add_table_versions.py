@@ -0,0 +1,33 @@
+"""add per-table write counters for conditional GETs
+
+Revision ID: 0b6e3d8f2a51
+Revises: f4d27b9c6e18
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b6e3d8f2a51'
+down_revision = 'f4d27b9c6e18'
+branch_labels = None
+depends_on = None
+
+TABLES = ('user', 'driver', 'resident', 'drive', 'stop_request', 'drive_recurrence',
+          'transport_event', 'notification', 'street_location')
+
+
+def upgrade():
+    table_version = op.create_table(
+        'table_version',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    op.bulk_insert(table_version, [{'name': name, 'version': 0} for name in TABLES])
+
+
+def downgrade():
+    op.drop_table('table_version')
@@ -0,0 +1,37 @@
+"""add indexes for inbox, schedule and street lookups
+
+Revision ID: 3c1f9a2d7b10
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1f9a2d7b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns) - kept in sync with the models' __table_args__
+INDEXES = [
+    ('ix_stop_request_requestee_id_created_at', 'stop_request', ['requestee_id', 'created_at']),
+    ('ix_stop_request_drive_id', 'stop_request', ['drive_id']),
+    ('ix_drive_driver_id_datetime', 'drive', ['driver_id', 'datetime']),
+    ('ix_stop_request_street_name_created_at', 'stop_request', ['street_name', 'created_at']),
+]
+
+
+def upgrade():
+    # Tables are created by `flask init` (db.create_all), which on a fresh database
+    # already creates these indexes from the models, hence if_not_exists.
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
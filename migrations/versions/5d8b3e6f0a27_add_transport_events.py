@@ -0,0 +1,31 @@
+"""add transport_event log for the SSE stream
+
+Revision ID: 5d8b3e6f0a27
+Revises: e2a9c4f1d836
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d8b3e6f0a27'
+down_revision = 'e2a9c4f1d836'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'transport_event',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('type', sa.String(length=40), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade():
+    op.drop_table('transport_event')
@@ -0,0 +1,38 @@
+"""add resident notifications
+
+Revision ID: 9a4c7e2b5f13
+Revises: 5d8b3e6f0a27
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4c7e2b5f13'
+down_revision = '5d8b3e6f0a27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'notification',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('resident_id', sa.Integer(), nullable=False),
+        sa.Column('drive_id', sa.Integer(), nullable=True),
+        sa.Column('kind', sa.String(length=40), nullable=False),
+        sa.Column('message', sa.String(length=255), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('read_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['resident_id'], ['resident.id']),
+        sa.ForeignKeyConstraint(['drive_id'], ['drive.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_notification_resident_id_id', 'notification', ['resident_id', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_notification_resident_id_id', table_name='notification')
+    op.drop_table('notification')
@@ -0,0 +1,29 @@
+"""add user.role discriminator for polymorphic loading
+
+Revision ID: b7e4d2a91c55
+Revises: 3c1f9a2d7b10
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e4d2a91c55'
+down_revision = '3c1f9a2d7b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.add_column(sa.Column('role', sa.String(length=20), nullable=False, server_default='user'))
+    # backfill from the joined subclass tables
+    op.execute('UPDATE "user" SET role = \'driver\' WHERE id IN (SELECT id FROM driver)')
+    op.execute('UPDATE "user" SET role = \'resident\' WHERE id IN (SELECT id FROM resident)')
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('role')
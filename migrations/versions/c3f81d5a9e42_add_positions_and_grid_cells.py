@@ -0,0 +1,36 @@
+"""add optional lat/lon and grid cell index to drives and stop requests
+
+Revision ID: c3f81d5a9e42
+Revises: 9a4c7e2b5f13
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f81d5a9e42'
+down_revision = '9a4c7e2b5f13'
+branch_labels = None
+depends_on = None
+
+TABLES = ('drive', 'stop_request')
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+            batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+            batch_op.add_column(sa.Column('grid_cell', sa.BigInteger(), nullable=True))
+            batch_op.create_index(f'ix_{table}_grid_cell', ['grid_cell'])
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_index(f'ix_{table}_grid_cell')
+            batch_op.drop_column('grid_cell')
+            batch_op.drop_column('longitude')
+            batch_op.drop_column('latitude')
@@ -0,0 +1,47 @@
+"""add drive_recurrence and link materialized drives to their occurrence
+
+Revision ID: e2a9c4f1d836
+Revises: b7e4d2a91c55
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a9c4f1d836'
+down_revision = 'b7e4d2a91c55'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'drive_recurrence',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('driver_id', sa.Integer(), nullable=False),
+        sa.Column('weekdays', sa.Integer(), nullable=False),
+        sa.Column('time_of_day', sa.Time(), nullable=False),
+        sa.Column('current_location', sa.String(length=120), nullable=True),
+        sa.Column('starts_on', sa.Date(), nullable=False),
+        sa.Column('ends_on', sa.Date(), nullable=True),
+        sa.ForeignKeyConstraint(['driver_id'], ['driver.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_drive_recurrence_driver_id', 'drive_recurrence', ['driver_id'])
+    with op.batch_alter_table('drive') as batch_op:
+        batch_op.add_column(sa.Column('recurrence_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('occurrence', sa.DateTime(), nullable=True))
+        batch_op.create_foreign_key('fk_drive_recurrence_id', 'drive_recurrence', ['recurrence_id'], ['id'])
+        batch_op.create_unique_constraint('uq_drive_recurrence_id_occurrence', ['recurrence_id', 'occurrence'])
+
+
+def downgrade():
+    with op.batch_alter_table('drive') as batch_op:
+        batch_op.drop_constraint('uq_drive_recurrence_id_occurrence', type_='unique')
+        batch_op.drop_constraint('fk_drive_recurrence_id', type_='foreignkey')
+        batch_op.drop_column('occurrence')
+        batch_op.drop_column('recurrence_id')
+    op.drop_index('ix_drive_recurrence_driver_id', table_name='drive_recurrence')
+    op.drop_table('drive_recurrence')
@@ -0,0 +1,34 @@
+"""add stop visiting sequence and street location lookup table
+
+Revision ID: f4d27b9c6e18
+Revises: c3f81d5a9e42
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4d27b9c6e18'
+down_revision = 'c3f81d5a9e42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('stop_request') as batch_op:
+        batch_op.add_column(sa.Column('sequence', sa.Integer(), nullable=True))
+    op.create_table(
+        'street_location',
+        sa.Column('name', sa.String(length=120), nullable=False),
+        sa.Column('latitude', sa.Float(), nullable=False),
+        sa.Column('longitude', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+
+def downgrade():
+    op.drop_table('street_location')
+    with op.batch_alter_table('stop_request') as batch_op:
+        batch_op.drop_column('sequence')
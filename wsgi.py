@@ -1,8 +1,6 @@
 import click, sys
 from flask import Flask
 from flask.cli import with_appcontext, AppGroup
-from flask_jwt_extended import JWTManager
-import json
 
 from App.views import views
 '''from App.views.transport import transport_views
@@ -23,53 +21,40 @@ from App.controllers import (
     create_stop_request,
     create_drive,
     get_driver_schedule,
+    create_recurrence,
+    optimize_drive,
+    set_street_location,
     get_resident_inbox,
     print_all_data,
+    bulk_import,
 )
 from App.controllers.initialize import initialize as initialize_controller
+from App.controllers.driver import TooManyStops
 from App.controllers.admin import print_users, print_drivers, print_drives, print_residents, print_stop_requests
 
 
 # This commands file allow you to create convenient CLI commands for testing controllers
 
-app = create_app()
-migrate = get_migrate(app)
+# `flask` commands that serve the app get every extension; the rest skip them
+SERVING_COMMANDS = ('run', 'shell', 'routes')
 
-jwt = JWTManager(app)
 
-@jwt.user_identity_loader
-def user_identity_lookup(user):
-    if isinstance(user, dict):
-        return json.dumps(user)
-        #return user  # Already in correct form
-
-    role = "user"
-    if isinstance(user, Driver):
-        role = "driver"
-    elif isinstance(user, Resident):
-        role = "resident"
-
-    return json.dumps({"id": user.id, "role": role})
-
-@jwt.user_lookup_loader
-def user_lookup_callback(_jwt_header, jwt_data):
-    identity = json.loads(jwt_data["sub"])
-    user_id = identity.get("id")
-    role = identity.get("role")
-
-    if role == "driver":
-        return db.session.get(Driver, user_id)
-    elif role == "resident":
-        return db.session.get(Resident, user_id)
+def __getattr__(name):
+    """Build `app` on first access, for gunicorn (wsgi:app) or the flask CLI."""
+    if name != 'app':
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    global app
+    ctx = click.get_current_context(silent=True)
+    if ctx is None or ctx.info_name in SERVING_COMMANDS:
+        app = create_app()
     else:
-        return db.session.get(User, user_id)
-############
-if __name__ == "__main__":
-    app.run(debug=True)
+        app = create_cli_app()
+    return app
 
 
 # This command creates and initializes the database
-@app.cli.command("init", help="Creates and initializes the database")
+@click.command("init", help="Creates and initializes the database")
+@with_appcontext
 def init():
     initialize_controller()
     print('database intialized')
@@ -102,7 +87,6 @@ def list_user_command(format):
     else:
         print(get_all_users_json())
 
-app.cli.add_command(user_cli) # add the group to the cli
 
 '''
 Resident & Driver Commands Grouped under 'transport'
@@ -123,7 +107,7 @@ def create_driver_command(status):
 
 @transport_cli.command('create-stop', help='Create a stop request for an existing drive and resident')
 @click.argument('resident_id', type=int)
-@click.argument('drive_id', type=int)
+@click.argument('drive_id')
 @click.option('--street', default=None, help='Optional street name override; defaults to resident.street')
 def create_stop_command(resident_id, drive_id, street):
     sr = create_stop_request(resident_id, drive_id, street)
@@ -143,26 +127,86 @@ def create_drive_command(driver_id, when, location):
     else:
         print('Driver not found or error')
 
+@transport_cli.command('create-recurrence', help='Create a recurring drive, e.g. weekdays 08:00')
+@click.argument('driver_id', type=int)
+@click.argument('weekdays')
+@click.argument('at')
+@click.option('--location', default=None, help='Current location string (optional)')
+@click.option('--starts-on', default=None, help='First date (YYYY-MM-DD), defaults to today')
+@click.option('--ends-on', default=None, help='Last date (YYYY-MM-DD), optional')
+def create_recurrence_command(driver_id, weekdays, at, location, starts_on, ends_on):
+    rule = create_recurrence(driver_id, weekdays, at, current_location=location, starts_on=starts_on, ends_on=ends_on)
+    if rule:
+        print(f'Recurrence created: {rule.get_json()}')
+    else:
+        print('Driver not found')
+
 @transport_cli.command('driver-schedule', help='Show driver schedule (drives)')
 @click.argument('driver_id', type=int)
-def driver_schedule_command(driver_id):
-    schedule = get_driver_schedule(driver_id)
+@click.option('--start', default=None, help='Window start (ISO datetime)')
+@click.option('--end', default=None, help='Window end (ISO datetime)')
+def driver_schedule_command(driver_id, start, end):
+    schedule = get_driver_schedule(driver_id, start=start, end=end)
     if not schedule:
         print('No schedule or driver not found')
         return
     for d in schedule:
-        print(f'Drive id={d.id} datetime={d.datetime} stops={[s.id for s in d.stops]}')
+        ref = f'id={d.id}' if d.id is not None else f'key={d.key}'
+        print(f'Drive {ref} datetime={d.datetime} stops={[s.id for s in d.stops]}')
+
+@transport_cli.command('add-street', help='Add or move a street in the local geocoding table')
+@click.argument('name')
+@click.argument('lat', type=float)
+@click.argument('lon', type=float)
+def add_street_command(name, lat, lon):
+    street = set_street_location(name, lat, lon)
+    print(f'Street saved: {street.get_json()}')
+
+@transport_cli.command('optimize-drive', help="Order a drive's stops into a short route and save the sequence")
+@click.argument('drive_id', type=int)
+@click.option('--budget-ms', default=200, show_default=True, help='Time budget for the 2-opt improvement (max 250)')
+def optimize_drive_command(drive_id, budget_ms):
+    try:
+        result = optimize_drive(drive_id, time_budget=budget_ms / 1000)
+    except TooManyStops as e:
+        print(e)
+        return
+    if result is None:
+        print('Drive not found')
+        return
+    print(f'Drive {drive_id} route: {result["stops"]}')
+    print(f'length={result["length_km"]} km (nearest neighbour {result["greedy_km"]} km) '
+          f'passes={result["passes"]} completed={result["completed"]} elapsed={result["elapsed_ms"]} ms')
+    if result['unlocated']:
+        print(f'Unlocated stops (kept at the end): {result["unlocated"]}')
 
 @transport_cli.command('resident-inbox', help='Show resident inbox of stop requests')
 @click.argument('resident_id', type=int)
 @click.option('--street', default=None, help='Optional street name filter')
 def resident_inbox_command(resident_id, street):
     inbox = get_resident_inbox(resident_id, street)
-    if not inbox:
+    if not inbox or not inbox['items']:
         print('No stop requests or resident not found')
         return
-    for sr in inbox:
-        print(f'StopRequest id={sr.id} street="{sr.street_name}" resident_id={sr.requestee_id} created_at={sr.created_at}')
+    for sr in inbox['items']:
+        print(f'StopRequest id={sr["id"]} street="{sr["street_name"]}" resident_id={sr["requestee_id"]} created_at={sr["created_at"]}')
+
+@transport_cli.command('bulk-import', help='Bulk load drivers, residents, drives and stop requests from CSV/NDJSON files')
+@click.option('--drivers', type=click.Path(exists=True, dir_okay=False),
+              help='username,password|password_hash,status (password_hash rows skip hashing)')
+@click.option('--residents', type=click.Path(exists=True, dir_okay=False),
+              help='username,password|password_hash,name,street (password_hash rows skip hashing)')
+@click.option('--drives', type=click.Path(exists=True, dir_okay=False), help='ref,driver|driver_id,datetime,current_location')
+@click.option('--stops', type=click.Path(exists=True, dir_okay=False), help='resident|resident_id,drive_ref|drive_id,street,created_at')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows per executemany batch and commit')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default=None, help='Input format (default: from file extension)')
+def bulk_import_command(drivers, residents, drives, stops, batch_size, fmt):
+    sources = {'drivers': drivers, 'residents': residents, 'drives': drives, 'stop_requests': stops}
+    def progress(table, stats):
+        print(f'  {table}: {stats["rows"]} rows ({stats["rows_per_sec"]:.0f} rows/s)', end='\r')
+    for stats in bulk_import(sources, batch_size=batch_size, fmt=fmt, on_batch=progress):
+        print(f'{stats["table"]}: {stats["rows"]} rows, {stats["skipped"]} skipped '
+              f'in {stats["seconds"]:.1f}s ({stats["rows_per_sec"]:.0f} rows/s)')
 
 @transport_cli.command('list-all-data', help='Pretty-print all data (users, drivers, drives, residents, stop requests)')
 def list_all_data_command():
@@ -189,7 +233,6 @@ def print_residents_command():
 def print_stop_requests_command():
     print_stop_requests()
 
-app.cli.add_command(transport_cli)
 
 '''
 Test Commands
@@ -212,6 +255,16 @@ def user_tests_command(type):
         sys.exit(pytest.main(["-k", "UserIntegrationTests"]))
     else:
         sys.exit(pytest.main(["-k", "App"]))
-    
 
-app.cli.add_command(test)
\ No newline at end of file
+
+def create_cli_app():
+    """App for CLI commands: no admin, uploads or CORS, plus the commands below and Flask-Migrate."""
+    app = create_app(extensions=())
+    for command in (init, user_cli, transport_cli, test):
+        app.cli.add_command(command)
+    get_migrate(app)
+    return app
+
+
+if __name__ == "__main__":
+    create_app().run(debug=True)